@@ -7,7 +7,6 @@ import sys
 import os
 import logging
 from datetime import datetime
-import MetaTrader5 as mt5
 
 # Add the project directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -87,19 +86,10 @@ def test_price_validator():
         if validation.error_message:
             print(f"   ❌ Error: {validation.error_message}")
 
-def test_enhanced_trade_executor():
+def test_enhanced_trade_executor(executor):
     """Test the enhanced trade executor with price validation"""
     print("\n🚀 Testing Enhanced Trade Executor...")
     
-    executor = TradeExecutor()
-    
-    # Connect to MT5
-    if not executor.connect():
-        print("❌ Failed to connect to MT5")
-        return
-    
-    print("✅ Connected to MT5")
-    
     # Create test signals
     test_signals = [
         TradingSignal(
@@ -186,16 +176,10 @@ def test_enhanced_trade_executor():
         else:
             print(f"   ❌ Order validation failed: {validation.error_message}")
 
-def test_symbol_info_debugging():
+def test_symbol_info_debugging(executor):
     """Test the symbol info debugging for retcode 10030 troubleshooting"""
     print("\n🔧 Testing Symbol Info Debugging...")
     
-    executor = TradeExecutor()
-    
-    if not executor.connect():
-        print("❌ Failed to connect to MT5")
-        return
-    
     # Test symbols that commonly have retcode 10030 issues
     problem_symbols = ['US30', 'NAS100', 'XAUUSD', 'GBPUSD']
     
@@ -209,16 +193,19 @@ def main():
     print("🧪 DYNAMIC PRICE VALIDATION SYSTEM - LOCAL TESTS")
     print("=" * 60)
     
-    # Initialize MT5
-    if not mt5.initialize():
-        print("❌ Failed to initialize MT5")
+    # One MT5 session shared by all tests (connect() initializes MT5)
+    executor = TradeExecutor()
+    if not executor.connect():
+        print("❌ Failed to connect to MT5")
         return
     
+    print("✅ Connected to MT5")
+    
     try:
         # Run tests
         test_price_validator()
-        test_enhanced_trade_executor()
-        test_symbol_info_debugging()
+        test_enhanced_trade_executor(executor)
+        test_symbol_info_debugging(executor)
         
         print("\n" + "=" * 60)
         print("✅ ALL TESTS COMPLETED")
@@ -229,7 +216,7 @@ def main():
         traceback.print_exc()
     
     finally:
-        mt5.shutdown()
+        executor.disconnect()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
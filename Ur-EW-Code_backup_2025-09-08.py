@@ -1,33 +1,47 @@
 import math
 import os
+import sys
 import argparse
-from enum import Enum
-from dataclasses import dataclass
-from typing import List, Tuple, Dict, Optional
+from enum import IntEnum
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import List, Tuple, Dict, Optional, NamedTuple, Sequence
 import csv
+import hashlib
+import re
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.backends.backend_pdf import PdfPages
-from matplotlib.colors import TwoSlopeNorm
-import yfinance as yf
-
-from sklearn.model_selection import TimeSeriesSplit
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.calibration import CalibratedClassifierCV, calibration_curve
-from sklearn.metrics import roc_curve, auc, precision_recall_curve, average_precision_score
-from sklearn.inspection import permutation_importance
-
-plt.style.use('seaborn-v0_8-darkgrid')
+# matplotlib / yfinance / sklearn werden erst in den Funktionen importiert, die sie brauchen
+# (schnellerer Start, reine CSV-Backtests ohne Plot/ML laden sie nie)
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # numba optional - Kernels laufen dann als normales Python
+    HAS_NUMBA = False
+    prange = range
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+# __slots__-Dataclasses (ohne Instanz-__dict__), sofern der Interpreter es unterstützt
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+def _setup_plot_style():
+    import matplotlib.pyplot as plt
+    plt.style.use('seaborn-v0_8-darkgrid')
+    return plt
 
 # --------------------------------------------------------------------------------------
 # Konfiguration (wird in main() mit CLI-Parametern überschrieben)
 # --------------------------------------------------------------------------------------
 PROFILE = "aggressive"  # "balanced" | "aggressive"
 
-PROFILES = {
+PROFILES = MappingProxyType({
     "balanced": dict(
         SYMBOL="QQQ",                     # wird in main() überschrieben, Default Nasdaq-ETF
         DAILY_PERIOD="10y",
@@ -216,56 +230,144 @@ PROFILES = {
         WAVE_LABEL_GAP_DAYS=60,
         MAX_PORTFOLIO_DD=-1e9
     ),
-}
+})
 
 # Wird in main() gesetzt (damit wir Symbol/Profil einfach überschreiben können)
-CFG: Dict = {}
+@dataclass(frozen=True, **_SLOTS)
+class Config:
+    # Pflichtfelder (in allen Profilen vorhanden)
+    SYMBOL: str
+    DAILY_PERIOD: str
+    H1_PERIOD: str
+    M30_PERIOD: str
+    START_CAPITAL: float
+    RISK_PER_TRADE: float
+    ATR_PERIOD: int
+    ATR_MULT_BUFFER: float
+    PRIMARY_ZZ_PCT: float
+    PRIMARY_ZZ_ATR_MULT: float
+    PRIMARY_MIN_IMP_ATR: float
+    H1_ZZ_PCT: float
+    H1_ZZ_ATR_MULT: float
+    H1_MIN_IMP_ATR: float
+    ENTRY_ZONE_W3: Tuple[float, float]
+    ENTRY_ZONE_W5: Tuple[float, float]
+    ENTRY_ZONE_C: Tuple[float, float]
+    ENTRY_WINDOW_H1: int
+    ENTRY_WINDOW_M30: int
+    MAX_HOLD_H1: int
+    MAX_HOLD_M30: int
+    TP1: float
+    TP2: float
+    EMA_FAST: int
+    EMA_SLOW: int
+    USE_EMA_TREND: bool
+    REQUIRE_PRICE_ABOVE_EMA_FAST: bool
+    USE_DAILY_EMA: bool
+    ATR_PCT_MIN: float
+    ATR_PCT_MAX: float
+    REQUIRE_CONFIRM: bool
+    CONFIRM_BARS_H1: int
+    CONFIRM_BARS_M30: int
+    CONFIRM_RULES: Tuple[str, str]
+    ALLOW_TOUCH_IF_NO_CONFIRM: bool
+    USE_ML: bool
+    TRAIN_FRAC: float
+    CALIBRATE_PROBS: bool
+    SIZE_BY_PROB: bool
+    PROB_SIZE_MIN: float
+    PROB_SIZE_MAX: float
+    ML_MIN_PASS_RATE: float
+    ML_MIN_PASS_RATE_TEST: float
+    USE_W5: bool
+    SIZE_SHORT_FACTOR: float
+    SHOW_INTERMEDIATE: bool
+    LABEL_GAP_DAYS: int
+    PLOT_TRADE_SAMPLE: int
+    EQUITY_LOG_THRESHOLD: float
+    WAVE_MIN_PCT: float
+    WAVE_MIN_DURATION_DAYS: int
+    WAVE_LABEL_GAP_DAYS: int
+    MAX_PORTFOLIO_DD: float
+    # Optionale Profilfelder (Defaults = bisherige CFG.get-Fallbacks; None = Profilwert fehlt)
+    DYNAMIC_DD_RISK: bool = False
+    DD_RISK_STEPS: Sequence[Tuple[float, float]] = ()
+    USE_VOL_TARGET: bool = False
+    TARGET_ANNUAL_VOL: float = 0.25
+    VOL_WINDOW_TRADES: int = 40
+    RISK_PER_TRADE_MIN: Optional[float] = None
+    RISK_PER_TRADE_MAX: Optional[float] = None
+    MAX_DRAWDOWN_STOP: float = -1e9
+    OPTIMIZE_ML_THRESHOLD: bool = False
+    TP1_LONG: Optional[float] = None
+    TP2_LONG: Optional[float] = None
+    TP1_SHORT: Optional[float] = None
+    TP2_SHORT: Optional[float] = None
+    ATR_MULT_BUFFER_LONG: Optional[float] = None
+    ATR_MULT_BUFFER_SHORT: Optional[float] = None
+    ENTRY_ZONE_W3_LONG: Optional[Tuple[float, float]] = None
+    ENTRY_ZONE_W3_SHORT: Optional[Tuple[float, float]] = None
+    ENTRY_ZONE_W5_LONG: Optional[Tuple[float, float]] = None
+    ENTRY_ZONE_W5_SHORT: Optional[Tuple[float, float]] = None
+    ENTRY_ZONE_C_LONG: Optional[Tuple[float, float]] = None
+    ENTRY_ZONE_C_SHORT: Optional[Tuple[float, float]] = None
+    ADX_TREND_THRESHOLD: int = 25
+    USE_ADX: bool = True
+    COMMISSION_PER_TRADE: float = 0.0
+    SLIPPAGE_PCT: float = 0.0
+    # Laufzeitoptionen aus der CLI
+    _PROFILE: str = ""
+    USE_CSV: bool = False
+    REALISIEREN: bool = False
+    FEE: float = 0.0
+    SLIPPAGE: float = 0.0
+    SLOW: float = 0.0
+    MONTHLY_PAYOUT: float = 0.0
+    DEEP_CF: bool = False
+    FULL_GRID_CF: bool = False
+
+CFG: Optional[Config] = None
 RISK_FREE_RATE = 2.0  # % p.a.
+# Speicher-Dtype für OHLC- und Indikatorspalten: float32 reicht für die ~6 signifikanten Stellen der Quelldaten
+# und halbiert Speicher/Bandbreite; Kernel rechnen intern weiter in float64
+PRICE_DTYPE = np.float32
 
 # --------------------------------------------------------------------------------------
 # Data & Indicators
 # --------------------------------------------------------------------------------------
+# Präfix-Spalten wie close_qqq / adj_close_qqq / adjclose_qqq
+_COL_PREFIX_RE = re.compile(r'^(open|high|low|close|volume|adj|adjclose)_')
+
+def _base_col_name(c: str, sym_lower: str) -> str:
+    # yfinance Format: qqq_close -> close
+    if sym_lower in c and c.endswith('_close'):
+        return 'close'
+    m = _COL_PREFIX_RE.match(c)
+    if m:
+        return 'adj_close' if m.group(1) in ('adj', 'adjclose') else m.group(1)
+    return c
+
+def _tz_naive(series: pd.Series) -> pd.Series:
+    # Nach Dtype verzweigen statt try/except: tz-aware -> lokale Wandzeit ohne TZ (wie tz_localize(None)), naiv bleibt
+    # Einheit einmalig auf datetime64[ns] festlegen -> spätere Array-Sichten/Lookups ohne erneuten Cast
+    series = pd.to_datetime(series, errors='coerce')
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    return series.astype("datetime64[ns]")
+
 def _normalize_yf_df(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
     if df is None or df.empty:
         return pd.DataFrame()
     # Flatten MultiIndex
     if isinstance(df.columns, pd.MultiIndex):
         df.columns = ['_'.join([str(x) for x in tup if x and x!='-']).strip() for tup in df.columns]
-    # Normalize names
-    df.columns = [str(c).strip().lower().replace('\ufeff','') for c in df.columns]
-    # Ersetze Leerzeichen durch Unterstrich für robustere Erkennung
-    df.columns = [c.replace(' ', '_') for c in df.columns]
+    # Normalize names (Leerzeichen -> Unterstrich für robustere Erkennung)
+    df.columns = [str(c).strip().lower().replace('\ufeff','').replace(' ', '_') for c in df.columns]
+    # open_xxx, adj_close_xxx, xxx_close etc. in einem Schritt auf Basisnamen reduzieren;
+    # doppelte Basisspalten (mehrere Symbole) -> erste behalten
     sym_lower = str(symbol).lower()
-    # Dynamisches Mapping: open_xxx, close_xxx etc. auf Basisnamen reduzieren
-    mapped_cols = {}
-    for c in df.columns:
-        base = c
-        if '_' in c:
-            parts = c.split('_')
-            # Fälle wie close_qqq, open_qqq
-            if parts[0] in {'open','high','low','close','volume'}:
-                base = parts[0]
-            # adj_close_qqq oder adjclose_qqq
-            elif (parts[0] in {'adj','adjclose','adjclose'} or (parts[0]=='adj' and parts[1]=='close')):
-                base = 'adj_close'
-            elif parts[0]=='adj' and len(parts)>1 and parts[1] in {'close','cls'}:
-                base='adj_close'
-        # Falls yfinance Format: qqq_close -> letzte Komponente ist relevant
-        if sym_lower in c and c.endswith('_close'):
-            base = 'close'
-        mapped_cols[c] = base
-    # Anwenden des Mappings (nur wenn keine Kollision mit existierendem Namen anderer Spalte ohne Mapping)
-    new_cols = []
-    counts = {}
-    for c in df.columns:
-        b = mapped_cols.get(c,c)
-        counts[b] = counts.get(b,0)+1
-        if counts[b]>1 and b in {'open','high','low','close','volume','adj_close'}:
-            # eindeutiger machen
-            new_cols.append(f"{b}_{counts[b]}")
-        else:
-            new_cols.append(b)
-    df.columns = new_cols
+    df.columns = [_base_col_name(c, sym_lower) for c in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
     # Fallback: erste Spalte mit 'close' im Namen nehmen
     if 'close' not in df.columns:
         cand = [c for c in df.columns if 'close' in c]
@@ -284,7 +386,10 @@ def _normalize_yf_df(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
         df = df.rename(columns={'adj_close':'close'})
     # Date inference
     if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        try:
+            df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        except ValueError:  # gemischte UTC-Offsets (z.B. Sommerzeit-Export) -> Offset abschneiden, lokale Wandzeit behalten
+            df['date'] = pd.to_datetime(df['date'].astype(str).str.replace(r'(Z|[+-]\d{2}:?\d{2})$', '', regex=True), errors='coerce')
     elif 'timestamp' in df.columns:
         df['date'] = pd.to_datetime(df['timestamp'], unit='ms', errors='coerce')
     else:
@@ -293,83 +398,43 @@ def _normalize_yf_df(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
     keep_cols = ['date'] + [c for c in ['open','high','low','close','volume'] if c in df.columns]
     df = df[keep_cols].copy()
     # Dates tz-naiv erzwingen (verhindert spätere Vergleichsfehler)
-    try:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['date'] = df['date'].dt.tz_localize(None)
-    except Exception:
-        try:
-            df['date'] = df['date'].dt.tz_convert(None)
-        except Exception:
-            pass
+    df['date'] = _tz_naive(df['date'])
     for c in ['open','high','low','close','volume']:
         if c in df.columns:
             try:
                 df[c] = pd.to_numeric(df[c], errors='coerce')
+                if c != 'volume':
+                    df[c] = df[c].astype(PRICE_DTYPE)
             except Exception:
                 pass
     if 'close' not in df.columns:
         raise ValueError("CSV/DF enthält keine 'close'-Spalte! Prüfe Datei.")
     df = df.dropna(subset=['date','close']).drop_duplicates(subset=['date']).sort_values('date')
     return df.reset_index(drop=True)
-    # Wenn DataFrame leer ist, sofort zurückgeben
-    if df is None or df.empty or len(df.columns) == 0:
-        return pd.DataFrame()
-    # Versuche, alle numerischen Spalten zu konvertieren (nur falls vorhanden)
-    for c in ["open", "high", "low", "close"]:
-        if c in df.columns:
-            col = df[c]
-            # Nur konvertieren, wenn es eine Series ist und 1D
-            if isinstance(col, pd.Series) and col.ndim == 1 and not col.empty:
-                try:
-                    df[c] = pd.to_numeric(col, errors='coerce')
-                except Exception:
-                    pass
-    # Spaltennamen normalisieren: trim, lower, unsichtbare Zeichen entfernen
-    df.columns = [str(c).strip().lower().replace('\ufeff','').replace('"','').replace("'","") for c in df.columns]
-    # Falls alles in einer Spalte: versuche, die erste Zeile als Header zu nehmen
-    if len(df.columns) == 1 and ',' in df.columns[0]:
-        df = df[df.columns[0]].str.split(',', expand=True)
-        df.columns = [str(c).strip().lower() for c in df.iloc[0]]
-        df = df.drop(df.index[0]).reset_index(drop=True)
-    # Nochmals Spaltennamen normalisieren
-    df.columns = [str(c).strip().lower().replace('\ufeff','').replace('"','').replace("'","") for c in df.columns]
-    # RADIKALER FALLBACK: Wenn immer noch keine 'close'-Spalte, prüfe, ob die erste Zeile die Header ist
-    if 'close' not in df.columns:
-        # Prüfe, ob die erste Zeile wie ein Header aussieht (z.B. 'timestamp', 'open', ...)
-        first_row = [str(x).strip().lower() for x in df.iloc[0].values]
-        if 'close' in first_row:
-            df.columns = first_row
-            df = df.drop(df.index[0]).reset_index(drop=True)
-        # Nochmals normalisieren
-        df.columns = [str(c).strip().lower().replace('\ufeff','').replace('"','').replace("'","") for c in df.columns]
-    # Wenn immer noch nicht: explizite Fehlermeldung
-    if 'close' not in df.columns:
-        raise ValueError("CSV/DF enthält keine 'close'-Spalte! Prüfe die Datei und Spaltennamen.")
-    # Timestamp/Date konvertieren
-    if 'timestamp' in df.columns:
-        df['date'] = pd.to_datetime(df['timestamp'], unit='ms', errors='coerce')
-    elif 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    elif df.index.name in ['date','timestamp']:
-        df['date'] = pd.to_datetime(df.index, errors='coerce')
-    else:
-        # Fallback: versuche, die erste Spalte als Datum zu interpretieren
-        try:
-            df['date'] = pd.to_datetime(df.iloc[:,0], errors='coerce')
-        except Exception:
-            pass
-    return df
+
 def robust_read_csv(path):
     # Versuche, das Trennzeichen automatisch zu erkennen
     with open(path, 'r', encoding='utf-8-sig') as f:
-        sample = f.read(2048)
+        sample = f.read(1024)
         sniffer = csv.Sniffer()
         try:
             dialect = sniffer.sniff(sample)
             sep = dialect.delimiter
         except Exception:
             sep = ','
-    df = pd.read_csv(path, sep=sep, engine='python')
+    try:
+        # Arrow-Parser (multithreaded); numpy-Dtypes behalten, damit die Normalisierung unverändert bleibt
+        import pyarrow as pa
+        import pyarrow.csv as pac
+        popts = pac.ParseOptions(delimiter=sep)
+        # Datums-/Zeitspalten als Text lesen: Arrow würde Offsets (z.B. -05:00) nach UTC umrechnen,
+        # _normalize_yf_df/_tz_naive sollen aber wie beim pandas-Parser die lokale Wandzeit behalten
+        with pac.open_csv(path, parse_options=popts) as reader:
+            as_text = {f.name: pa.string() for f in reader.schema
+                       if pa.types.is_timestamp(f.type) or pa.types.is_date(f.type) or pa.types.is_time(f.type)}
+        df = pac.read_csv(path, parse_options=popts, convert_options=pac.ConvertOptions(column_types=as_text)).to_pandas()
+    except Exception:  # pyarrow fehlt oder Datei für Arrow nicht parsebar -> langsamer pandas-Parser
+        df = pd.read_csv(path, sep=sep, engine='python')
     # Wenn alles in einer Spalte steht, splitte manuell
     if len(df.columns) == 1 and sep in df.columns[0]:
         df = pd.read_csv(path, sep=sep, engine='python')
@@ -380,14 +445,30 @@ def robust_read_csv(path):
         df = df.drop(df.index[0]).reset_index(drop=True)
     return df
 
-def _make_tz_naive(series: pd.Series) -> pd.Series:
-    try:
-        return series.dt.tz_localize(None)
-    except Exception:
+# Bei jeder Änderung an robust_read_csv/_normalize_yf_df erhöhen -> alte Parquet-Cache-Einträge werden ignoriert
+_NORMALIZE_VERSION = 2
+
+# robust_read_csv + _normalize_yf_df mit Parquet-Cache (Schlüssel: Pfad, mtime, Größe, Symbol, Normalisierungs-Version, PRICE_DTYPE)
+def read_csv_normalized(path: str, symbol: str) -> pd.DataFrame:
+    if not path or not os.path.exists(path):
+        return pd.DataFrame()
+    st = os.stat(path)
+    key = hashlib.md5(f"{os.path.abspath(path)}|{st.st_mtime}|{st.st_size}|{symbol}|v{_NORMALIZE_VERSION}|{np.dtype(PRICE_DTYPE).name}".encode()).hexdigest()
+    cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", f"{key}.parquet")
+    if os.path.exists(cache_path):
         try:
-            return series.dt.tz_convert(None)
-        except Exception:
-            return series
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"[WARN] CSV-Cache {os.path.basename(cache_path)} nicht lesbar: {e}")
+    raw = robust_read_csv(path)
+    df = _normalize_yf_df(raw, symbol) if not raw.empty else pd.DataFrame()
+    if not df.empty:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            df.to_parquet(cache_path, compression="zstd")
+        except Exception as e:  # z.B. weder pyarrow noch fastparquet installiert -> ohne Cache
+            print(f"[WARN] CSV-Cache nicht geschrieben: {e}")
+    return df
 
 def _merge_history(symbol:str, cur:pd.DataFrame, hist_path:str) -> pd.DataFrame:
     if cur is None or cur.empty:
@@ -395,14 +476,13 @@ def _merge_history(symbol:str, cur:pd.DataFrame, hist_path:str) -> pd.DataFrame:
     if not os.path.exists(hist_path):
         return cur
     try:
-        raw = robust_read_csv(hist_path)
-        old = _normalize_yf_df(raw, symbol)
+        old = read_csv_normalized(hist_path, symbol)
         if not old.empty:
             # Zeitzonen vereinheitlichen
             if 'date' in old.columns:
-                old['date'] = _make_tz_naive(pd.to_datetime(old['date'], errors='coerce'))
+                old['date'] = _tz_naive(old['date'])
             if 'date' in cur.columns:
-                cur['date'] = _make_tz_naive(pd.to_datetime(cur['date'], errors='coerce'))
+                cur['date'] = _tz_naive(cur['date'])
             merged = pd.concat([old, cur], ignore_index=True)
             merged = merged.dropna(subset=['date']).drop_duplicates(subset=['date']).sort_values('date').reset_index(drop=True)
             return merged
@@ -410,12 +490,27 @@ def _merge_history(symbol:str, cur:pd.DataFrame, hist_path:str) -> pd.DataFrame:
         print(f"[WARN] Merge {os.path.basename(hist_path)}: {e}")
     return cur
 
+def _list_data_files(base: str) -> Dict[str, str]:
+    # Einmaliger Verzeichnis-Scan (Basis + 'daten'): normcase(Pfad) -> Pfad, ersetzt os.path.exists je Kandidat
+    files = {}
+    for folder in (base, os.path.join(base, 'daten')):
+        if os.path.isdir(folder or os.curdir):
+            for fn in os.listdir(folder or os.curdir):
+                p = os.path.join(folder, fn)
+                files[os.path.normcase(p)] = p
+    return files
+
+def _eurusd_m30_files(files: Dict[str, str]) -> List[str]:
+    return [p for p in files.values()
+            if os.path.basename(p).lower().startswith('eurusd-m30-bid-') and p.lower().endswith('.csv')]
+
 def load_data():
-    sym = CFG["SYMBOL"]
-    print(f"[{CFG['_PROFILE']}] Lade {sym}: Daily={CFG['DAILY_PERIOD']} | 1H={CFG['H1_PERIOD']} | 30m={CFG['M30_PERIOD']}")
-    if CFG.get("USE_CSV", False):
+    sym = CFG.SYMBOL
+    print(f"[{CFG._PROFILE}] Lade {sym}: Daily={CFG.DAILY_PERIOD} | 1H={CFG.H1_PERIOD} | 30m={CFG.M30_PERIOD}")
+    if CFG.USE_CSV:
         print("[CSV] Lade Kursdaten aus CSV...")
         base = os.path.dirname(__file__)
+        files = _list_data_files(base)
         sym_sanit = sym.replace('=','_').replace('^','')
         # Kandidatenlisten (verschiedene Namensschemata und Ordner)
         def _candidates(prefix: str):
@@ -443,23 +538,16 @@ def load_data():
             daily_candidates = [os.path.join(base, "daten", "eurusd-d1-bid-1988-01-15-2025-09-07.csv")] + _candidates("daily")
             h1_candidates    = [os.path.join(base, "daten", "eurusd-h1-bid-2003-05-04T21-2025-09-07.csv")] + _candidates("h1")
             # M30 Pattern-Suche ergänzend zu Standard-Kandidaten
-            m30_candidates = []
-            for folder in [base, os.path.join(base, 'daten')]:
-                if os.path.isdir(folder):
-                    for fn in os.listdir(folder):
-                        low = fn.lower()
-                        if low.startswith('eurusd-m30-bid-') and low.endswith('.csv'):
-                            m30_candidates.append(os.path.join(folder, fn))
-            m30_candidates += _candidates("m30")
+            m30_candidates = _eurusd_m30_files(files) + _candidates("m30")
         else:
             daily_candidates = _candidates("daily")
             h1_candidates    = _candidates("h1")
             m30_candidates   = _candidates("m30")
         def _select(label, candidates):
-            existing = [p for p in candidates if os.path.exists(p)]
+            existing = [p for p in candidates if os.path.normcase(p) in files]
             print(f"[CSV-TRY] {label} Kandidaten (erste 8 gezeigt):")
             for p in candidates[:8]:
-                print(f"   - {p} {'(OK)' if os.path.exists(p) else ''}")
+                print(f"   - {p} {'(OK)' if os.path.normcase(p) in files else ''}")
             return existing[0] if existing else candidates[0]
         daily_path = _select('Daily', daily_candidates)
         h1_path    = _select('H1', h1_candidates)
@@ -475,18 +563,14 @@ def load_data():
         _pinfo('Daily', daily_path)
         _pinfo('H1', h1_path)
         _pinfo('M30', m30_path)
-        # Einlesen nur wenn vorhanden
-        daily = robust_read_csv(daily_path) if os.path.exists(daily_path) else pd.DataFrame()
-        h1    = robust_read_csv(h1_path)    if os.path.exists(h1_path)    else pd.DataFrame()
-        m30   = robust_read_csv(m30_path)   if os.path.exists(m30_path)   else pd.DataFrame()
-        print(f"[CSV-RAW] daily shape={daily.shape} | h1 shape={h1.shape} | m30 shape={m30.shape}")
-        daily = _normalize_yf_df(daily, sym) if not daily.empty else pd.DataFrame()
-        h1    = _normalize_yf_df(h1, sym)    if not h1.empty    else pd.DataFrame()
-        m30   = _normalize_yf_df(m30, sym)   if not m30.empty   else pd.DataFrame()
+        # Einlesen nur wenn vorhanden (normalisiert, aus Parquet-Cache falls CSV unverändert); reines I/O -> parallel
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            daily, h1, m30 = ex.map(lambda p: read_csv_normalized(p, sym), (daily_path, h1_path, m30_path))
         print(f"[CSV-NORM] daily shape={daily.shape} | h1 shape={h1.shape} | m30 shape={m30.shape}")
         # Helper für Fallbacks
         def _yf(period, interval, _sym=sym):
             try:
+                import yfinance as yf
                 raw = yf.download(_sym, period=period, interval=interval, auto_adjust=True, group_by="column", progress=False)
                 return _normalize_yf_df(raw, _sym)
             except Exception as e:
@@ -494,10 +578,10 @@ def load_data():
                 return pd.DataFrame()
         if daily.empty:
             print("[FALLBACK] daily CSV fehlt/leer -> lade von yfinance")
-            daily = _yf(CFG['DAILY_PERIOD'], '1d')
+            daily = _yf(CFG.DAILY_PERIOD, '1d')
         if h1.empty:
             print("[FALLBACK] h1 CSV fehlt/leer -> lade von yfinance")
-            h1 = _yf(CFG['H1_PERIOD'], '1h')
+            h1 = _yf(CFG.H1_PERIOD, '1h')
         if m30.empty:
             print("[INFO] Keine m30 Daten (CSV leer/fehlend). Verwende nur 1H für Entries.")
         daily, h1, m30 = add_all_indicators(daily, h1, m30)
@@ -513,10 +597,12 @@ def load_data():
             return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
         return daily, h1, m30
     else:
-        # Erst yfinance ziehen (begrenzter Zeitraum)
-        d = yf.download(sym, period=CFG["DAILY_PERIOD"], interval="1d",  auto_adjust=True, group_by="column", progress=False)
-        h = yf.download(sym, period=CFG["H1_PERIOD"],   interval="1h",  auto_adjust=True, group_by="column", progress=False)
-        m = yf.download(sym, period=CFG["M30_PERIOD"],  interval="30m", auto_adjust=True, group_by="column", progress=False)
+        # Erst yfinance ziehen (begrenzter Zeitraum); die drei Downloads laufen parallel (netzwerkgebunden)
+        import yfinance as yf
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            futs = [ex.submit(yf.download, sym, period=period, interval=interval, auto_adjust=True, group_by="column", progress=False)
+                    for period, interval in ((CFG.DAILY_PERIOD, "1d"), (CFG.H1_PERIOD, "1h"), (CFG.M30_PERIOD, "30m"))]
+            d, h, m = (f.result() for f in futs)
         d = _normalize_yf_df(d, sym)
         h = _normalize_yf_df(h, sym)
         m = _normalize_yf_df(m, sym)
@@ -526,12 +612,7 @@ def load_data():
             d = _merge_history(sym, d, os.path.join(base, "daten", "eurusd-d1-bid-1988-01-15-2025-09-07.csv"))
             h = _merge_history(sym, h, os.path.join(base, "daten", "eurusd-h1-bid-2003-05-04T21-2025-09-07.csv"))
             # M30: flexible Pattern-Suche (weil Datei evtl. im Unterordner 'daten' oder Root liegt)
-            m30_candidates = []
-            for folder in [base, os.path.join(base, 'daten')]:
-                if os.path.isdir(folder):
-                    for fn in os.listdir(folder):
-                        if fn.lower().startswith('eurusd-m30-bid-') and fn.lower().endswith('.csv'):
-                            m30_candidates.append(os.path.join(folder, fn))
+            m30_candidates = _eurusd_m30_files(_list_data_files(base))
             if m30_candidates:
                 # Älteste Datei (frühestes Datum im Dateinamen heuristisch über Länge / sort) zuerst
                 m30_candidates.sort()
@@ -542,19 +623,55 @@ def load_data():
         # Einheitlich TZ-naiv (Sicherheitsnetz gegen Mischformen)
         for df_ref in (d,h,m):
             if not df_ref.empty and 'date' in df_ref.columns:
-                try:
-                    df_ref['date'] = pd.to_datetime(df_ref['date'], errors='coerce').dt.tz_localize(None)
-                except Exception:
-                    try:
-                        df_ref['date'] = pd.to_datetime(df_ref['date'], errors='coerce').dt.tz_convert(None)
-                    except Exception:
-                        pass
+                df_ref['date'] = _tz_naive(df_ref['date'])
         # Debug-Spanne
         for nm,df in [("Daily",d),("H1",h),("M30",m)]:
             if not df.empty:
                 print(f"[SPAN] {nm}: {df['date'].iloc[0].date()} -> {df['date'].iloc[-1].date()} ({len(df)} Zeilen)")
         return d, h, m
 
+def _true_range(high:np.ndarray, low:np.ndarray, close:np.ndarray)->np.ndarray:
+    # fmax ignoriert NaN wie pandas max(axis=1) -> erste Zeile = high-low
+    # In-place über Slices (kein prev-Array): Spitzenbedarf zwei Arrays statt sechs
+    tr=np.subtract(high, low); np.abs(tr, out=tr)
+    tmp=np.subtract(high[1:], close[:-1]); np.abs(tmp, out=tmp); np.fmax(tr[1:], tmp, out=tr[1:])
+    np.subtract(low[1:], close[:-1], out=tmp); np.abs(tmp, out=tmp); np.fmax(tr[1:], tmp, out=tr[1:])
+    return tr
+
+@njit(cache=True)
+def _ema_kernel(x:np.ndarray, com:float)->np.ndarray:
+    # Rekursion wie pandas ewm(com=..., adjust=False).mean() inkl. NaN-Behandlung (bitgleich)
+    alpha=1.0/(1.0+com); old_f=1.0-alpha; new_wt=alpha
+    n=x.shape[0]; y=np.empty(n)
+    w=x[0]; nobs=0 if np.isnan(w) else 1; old_wt=1.0
+    y[0]=w if nobs>0 else np.nan
+    for i in range(1,n):
+        cur=x[i]; obs=not np.isnan(cur)
+        if obs: nobs+=1
+        if not np.isnan(w):
+            old_wt*=old_f
+            if com==1.0: new_wt=1.0-old_wt
+            if obs:
+                if w!=cur:
+                    w=(old_wt*w + new_wt*cur)/(old_wt + new_wt)
+                old_wt=1.0
+        elif obs:
+            w=cur
+        y[i]=w if nobs>0 else np.nan
+    return y
+
+def _ema(x:pd.Series, span:Optional[float]=None, alpha:Optional[float]=None)->pd.Series:
+    # com wie pandas aus span/alpha ableiten, damit Ergebnisse identisch zu ewm(...) bleiben
+    com=(span-1)/2 if span is not None else (1-alpha)/alpha
+    if not HAS_NUMBA or x.empty:
+        return x.ewm(com=com, adjust=False).mean()
+    return pd.Series(_ema_kernel(x.to_numpy(dtype=float), float(com)), index=x.index)
+
+# LRU-Memo für add_indicators: Schlüssel = (Inhalts-Hash high/low/close, Parameter), Wert = nur die Indikatorspalten
+_IND_CACHE: "OrderedDict[tuple, Dict[str,np.ndarray]]" = OrderedDict()
+_IND_CACHE_SIZE = 8
+_IND_COLS = ("ATR", "ATR_PCT", "EMA_FAST", "EMA_SLOW", "RSI")
+
 def add_indicators(df: pd.DataFrame):
     if df.empty:
         return df
@@ -577,22 +694,37 @@ def add_indicators(df: pd.DataFrame):
             df["low"] = df["Low"]
         else:
             df["low"] = df["close"]
+    atr_n, ema_f, ema_s = CFG.ATR_PERIOD, CFG.EMA_FAST, CFG.EMA_SLOW
     # Now calculate indicators robustly
-    high = pd.to_numeric(df["high"], errors="coerce")
-    low = pd.to_numeric(df["low"], errors="coerce")
-    close = pd.to_numeric(df["close"], errors="coerce")
-    prev = close.shift(1)
-    tr = pd.concat([(high - low).abs(), (high - prev).abs(), (low - prev).abs()], axis=1).max(axis=1)
-    df["ATR"] = tr.rolling(CFG.get("ATR_PERIOD", 14), min_periods=1).mean()
-    df["ATR_PCT"] = (df["ATR"] / close) * 100.0
-    df["EMA_FAST"] = close.ewm(span=CFG.get("EMA_FAST", 21), adjust=False).mean()
-    df["EMA_SLOW"] = close.ewm(span=CFG.get("EMA_SLOW", 55), adjust=False).mean()
-    # RSI (Feature)
-    delta = close.diff().fillna(0.0)
-    up = delta.clip(lower=0).rolling(14).mean()
-    down = (-delta.clip(upper=0)).rolling(14).mean()
-    rs = up / (down + 1e-12)
-    df["RSI"] = 100 - (100 / (1 + rs))
+    # Rechnen in float64, Ablage der Indikatorspalten als PRICE_DTYPE
+    high = pd.to_numeric(df["high"], errors="coerce").astype(float)
+    low = pd.to_numeric(df["low"], errors="coerce").astype(float)
+    close = pd.to_numeric(df["close"], errors="coerce").astype(float)
+    h = hashlib.blake2b(digest_size=16)
+    for a in (high, low, close):
+        h.update(np.ascontiguousarray(a.to_numpy()).tobytes())
+    key = (h.digest(), len(df), atr_n, ema_f, ema_s)
+    if key in _IND_CACHE:
+        # Treffer: Spalten in den übergebenen Frame schreiben (Aufrufer nutzen den Rückgabewert nicht zwingend)
+        _IND_CACHE.move_to_end(key)
+        for c, v in _IND_CACHE[key].items():
+            df[c] = v.copy()
+        return df
+    tr = _true_range(high.to_numpy(), low.to_numpy(), close.to_numpy())
+    atr = pd.Series(tr, index=df.index).rolling(atr_n, min_periods=1).mean()
+    df["ATR"] = atr.astype(PRICE_DTYPE)
+    df["ATR_PCT"] = ((atr / close) * 100.0).astype(PRICE_DTYPE)
+    df["EMA_FAST"] = _ema(close, span=ema_f).astype(PRICE_DTYPE)
+    df["EMA_SLOW"] = _ema(close, span=ema_s).astype(PRICE_DTYPE)
+    # RSI(14) (Feature) mit Wilder-Glättung
+    c = close.to_numpy()
+    delta = np.diff(c, prepend=c[:1]); delta[np.isnan(delta)] = 0.0
+    up = _ema(pd.Series(np.maximum(delta, 0.0), index=df.index), alpha=1.0/14).to_numpy()
+    down = _ema(pd.Series(np.maximum(-delta, 0.0), index=df.index), alpha=1.0/14).to_numpy()
+    df["RSI"] = (100.0 - 100.0 / (1.0 + up / (down + 1e-12))).astype(PRICE_DTYPE)
+    _IND_CACHE[key] = {c: df[c].to_numpy(copy=True) for c in _IND_COLS}
+    if len(_IND_CACHE) > _IND_CACHE_SIZE:
+        _IND_CACHE.popitem(last=False)
     return df
 
 def add_all_indicators(daily: pd.DataFrame, h1: pd.DataFrame, m30: pd.DataFrame):
@@ -602,120 +734,200 @@ def add_all_indicators(daily: pd.DataFrame, h1: pd.DataFrame, m30: pd.DataFrame)
     return daily, h1, m30
 
 # Einfacher ADX(14)-Berechner (Fallback, falls pandas_ta nicht verfügbar)
+@njit(cache=True)
+def _fmax(a:float, b:float)->float:
+    # wie np.fmax: NaN-Operand wird ignoriert
+    if np.isnan(a): return b
+    if np.isnan(b): return a
+    return a if a>=b else b
+
+@njit(cache=True)
+def _adx_kernel(h:np.ndarray, l:np.ndarray, c:np.ndarray, com:float)->np.ndarray:
+    # Ein Durchlauf für TR/+DM/-DM, dann Wilder-Glättung (ewm adjust=False) über _ema_kernel
+    n=h.shape[0]; tr=np.empty(n); pdm=np.zeros(n); mdm=np.zeros(n); dx=np.empty(n)
+    tr[0]=abs(h[0]-l[0])
+    for i in range(1,n):
+        tr[i]=_fmax(_fmax(abs(h[i]-l[i]), abs(h[i]-c[i-1])), abs(l[i]-c[i-1]))
+        up=h[i]-h[i-1]; down=l[i-1]-l[i]
+        if up>down and up>0: pdm[i]=up
+        if down>up and down>0: mdm[i]=down
+    atr=_ema_kernel(tr, com); ps=_ema_kernel(pdm, com); ms=_ema_kernel(mdm, com)
+    for i in range(n):
+        plus_di=100.0*(ps[i]/(atr[i]+1e-12)); minus_di=100.0*(ms[i]/(atr[i]+1e-12))
+        dx[i]=100.0*(abs(plus_di-minus_di)/(abs(plus_di+minus_di)+1e-12))
+    return _ema_kernel(dx, com)
+
 def compute_adx(df: pd.DataFrame, n: int = 14, out_col: str = "ADX_14"):
     if df.empty or not {"high","low","close"}.issubset(df.columns):
         return
-    high = df["high"].astype(float)
-    low = df["low"].astype(float)
-    close = df["close"].astype(float)
-    prev_high = high.shift(1)
-    prev_low = low.shift(1)
-    prev_close = close.shift(1)
-    up = high - prev_high
-    down = prev_low - low
-    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
-    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
-    tr = pd.concat([(high - low).abs(), (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
-    atr = tr.ewm(alpha=1.0/n, adjust=False).mean()
-    plus_di = 100.0 * (pd.Series(plus_dm, index=df.index).ewm(alpha=1.0/n, adjust=False).mean() / (atr + 1e-12))
-    minus_di = 100.0 * (pd.Series(minus_dm, index=df.index).ewm(alpha=1.0/n, adjust=False).mean() / (atr + 1e-12))
-    dx = 100.0 * ((plus_di - minus_di).abs() / ((plus_di + minus_di).abs() + 1e-12))
-    adx = dx.ewm(alpha=1.0/n, adjust=False).mean()
-    df[out_col] = adx
+    alpha = 1.0/n
+    df[out_col] = _adx_kernel(df["high"].to_numpy(dtype=float), df["low"].to_numpy(dtype=float),
+                              df["close"].to_numpy(dtype=float), float((1-alpha)/alpha)).astype(PRICE_DTYPE)
 
 # --------------------------------------------------------------------------------------
 # Elliott Engines
 # --------------------------------------------------------------------------------------
-class Dir(Enum):
-    UP=1; DOWN=2
+class Dir(IntEnum):
+    # IntEnum: Vergleiche sind reine int-Vergleiche, Wert = Richtungsvorzeichen (auch in den njit-Kerneln)
+    UP=1; DOWN=-1
 
-@dataclass
-class Pivot:
+class Pivot(NamedTuple):
     idx:int; price:float; kind:str  # 'H'/'L'
 
 @dataclass
-class Impulse:
-    direction:Dir; points:List[Pivot]  # [p0..p5]
+class Pivots:
+    # Struct-of-Arrays: idx int64, price float64, kind int8 (1='H', 0='L')
+    idx:np.ndarray; price:np.ndarray; kind:np.ndarray
+
+    @classmethod
+    def empty(cls)->"Pivots":
+        return cls(np.empty(0, np.int64), np.empty(0, np.float64), np.empty(0, np.int8))
+
+    def __len__(self)->int:
+        return self.idx.shape[0]
+
+    def __getitem__(self, i:int)->Pivot:
+        return Pivot(int(self.idx[i]), float(self.price[i]), 'H' if self.kind[i] else 'L')
+
+    def views(self, start:int=0, end:Optional[int]=None)->List[Pivot]:
+        # Bulk-Konvertierung per tolist() statt Skalar-Indexierung je Feld
+        s=slice(start, end)
+        return [Pivot(i, p, 'H' if k else 'L') for i,p,k in zip(self.idx[s].tolist(), self.price[s].tolist(), self.kind[s].tolist())]
+
+    def __iter__(self):
+        return iter(self.views())
+
+@dataclass
+class _Wave:
+    direction:Dir; pivots:Pivots; start:int; end:int  # pivots[start:end]
+
+    @property
+    def points(self)->List[Pivot]:
+        return self.pivots.views(self.start, self.end)
+
+    @property
+    def prices(self)->List[float]:
+        return self.pivots.price[self.start:self.end].tolist()
+
+    @property
+    def idxs(self)->List[int]:
+        return self.pivots.idx[self.start:self.end].tolist()
 
 @dataclass
-class ABC:
-    direction:Dir; points:List[Pivot]  # [A0,A1,B1,C1]
+class Impulse(_Wave):
+    pass  # points: [p0..p5]
+
+@dataclass
+class ABC(_Wave):
+    pass  # points: [A0,A1,B1,C1]
+
+@njit(cache=True)
+def _zigzag_loop(close:np.ndarray, atr_thr:np.ndarray, zz_pct:float):
+    # Richtung als int: 0=None, 1=UP, 2=DOWN; kind: 1='H', 0='L'
+    # atr_thr = ATR*zz_atr_mult je Bar (NaN = kein ATR); Basis für zz_pct bleibt der letzte Pivot
+    n=close.shape[0]
+    idx=np.empty(n, np.int64); price=np.empty(n, np.float64); kind=np.empty(n, np.int8); m=0
+    last=close[0]; hi=last; lo=last; hi_i=0; lo_i=0; direction=0
+    for i in range(1,n):
+        p=close[i]
+        thr=last*zz_pct
+        if atr_thr[i]>thr: thr=atr_thr[i]
+        if direction!=2:
+            up=p>hi; hi=p if up else hi; hi_i=i if up else hi_i  # select statt Sprung (cmov)
+            if hi-p>=thr:
+                idx[m]=hi_i; price[m]=hi; kind[m]=1; m+=1; last=hi; lo=p; lo_i=i; direction=2
+        if direction!=1:
+            dn=p<lo; lo=p if dn else lo; lo_i=i if dn else lo_i
+            if p-lo>=thr:
+                idx[m]=lo_i; price[m]=lo; kind[m]=0; m+=1; last=lo; hi=p; hi_i=i; direction=1
+    return idx[:m], price[:m], kind[:m]
+
+@njit(cache=True)
+def _dedupe_pivots(price:np.ndarray, kind:np.ndarray):
+    # Aufeinanderfolgende Pivots gleicher Art -> extremeren behalten (bei Gleichstand den späteren)
+    n=kind.shape[0]; keep=np.empty(n, np.int64); m=0
+    for j in range(n):
+        if m==0 or kind[keep[m-1]]!=kind[j]:
+            keep[m]=j; m+=1
+        elif (kind[j]==1 and price[j]>=price[keep[m-1]]) or (kind[j]==0 and price[j]<=price[keep[m-1]]):
+            keep[m-1]=j
+    return keep[:m]
+
+@njit(cache=True)
+def _alternating(kind:np.ndarray, i:int, k:int, first:int)->bool:
+    for j in range(k):
+        if kind[i+j]!=(first if j%2==0 else 1-first): return False
+    return True
+
+@njit(cache=True)
+def _impulse_scan(pidx:np.ndarray, price:np.ndarray, kind:np.ndarray, atr:np.ndarray, min_imp:float):
+    # Rückgabe: Start-Pivot und Richtung (Dir-Werte: 1=UP, -1=DOWN) je Impuls
+    n=kind.shape[0]; n_atr=atr.shape[0]
+    starts=np.empty(n, np.int64); dirs=np.empty(n, np.int8); m=0; i=0
+    while i<=n-6:
+        # Muster über kind[i] bestimmen: LHLHLH (UP) bzw. HLHLHL (DOWN), ein Alternanz-Check je Fenster
+        if not _alternating(kind, i, 6, kind[i]): i+=1; continue
+        p0=price[i]; p1=price[i+1]; p2=price[i+2]; p3=price[i+3]; p4=price[i+4]
+        if kind[i]==0:
+            w1=p1-p0; w3=p3-p2
+            if p2<=p0 or w1<=0 or w3<0.6*w1: i+=1; continue
+            if p4<=p1*0.98: i+=1; continue
+            atr_b=atr[min(pidx[i+3], n_atr-1)] if n_atr>0 else np.nan
+            if atr_b>0 and (w3/atr_b)<min_imp: i+=1; continue
+            starts[m]=i; dirs[m]=1; m+=1; i+=3
+        else:
+            w1=p0-p1; w3=p2-p3
+            if p2>=p0 or w1<=0 or w3<0.6*w1: i+=1; continue
+            if p4>=p1*1.02: i+=1; continue
+            atr_b=atr[min(pidx[i+3], n_atr-1)] if n_atr>0 else np.nan
+            if atr_b>0 and (abs(w3)/atr_b)<min_imp: i+=1; continue
+            starts[m]=i; dirs[m]=-1; m+=1; i+=3
+    return starts[:m], dirs[:m]
+
+@njit(cache=True)
+def _abc_scan(price:np.ndarray, kind:np.ndarray):
+    # Rückgabe: Start-Pivot und Richtung (Dir-Werte: 1=UP, -1=DOWN) je ABC
+    n=kind.shape[0]
+    starts=np.empty(n, np.int64); dirs=np.empty(n, np.int8); m=0; i=0
+    while i<=n-4:
+        # HLHL (DOWN) bzw. LHLH (UP)
+        if not _alternating(kind, i, 4, kind[i]): i+=1; continue
+        q0=price[i]; q1=price[i+1]; q2=price[i+2]; q3=price[i+3]
+        if kind[i]==1:
+            A=q0-q1; B=q2-q1
+            if A<=0 or not (0.3<=B/A<=0.86) or not (q3<q1): i+=1; continue
+            starts[m]=i; dirs[m]=-1; m+=1; i+=2
+        else:
+            A=q1-q0; B=q1-q2
+            if A<=0 or not (0.3<=B/A<=0.86) or not (q3>q1): i+=1; continue
+            starts[m]=i; dirs[m]=1; m+=1; i+=2
+    return starts[:m], dirs[:m]
 
 class ElliottEngine:
     def __init__(self, zz_pct:float, zz_atr_mult:float, min_impulse_atr:float):
         self.zz_pct = zz_pct; self.zz_atr_mult = zz_atr_mult; self.min_imp = min_impulse_atr
 
-    @staticmethod
-    def _thr(base:float, atr:float, pct:float, atr_mult:float)->float:
-        if pd.isna(atr): return base*pct
-        return max(base*pct, atr*atr_mult)
-
-    def zigzag(self, close:np.ndarray, atr:np.ndarray)->List[Pivot]:
-        piv=[]
-        if len(close)<3: return piv
-        last=close[0]; hi=last; lo=last; hi_i=0; lo_i=0; direction=None
-        for i in range(1,len(close)):
-            p=close[i]
-            thr=self._thr(last, atr[i] if atr is not None and i<len(atr) else np.nan, self.zz_pct, self.zz_atr_mult)
-            if direction in (None, Dir.UP):
-                if p>hi: hi=p; hi_i=i
-                if hi-p>=thr:
-                    piv.append(Pivot(hi_i,float(hi),'H')); last=hi; lo=p; lo_i=i; direction=Dir.DOWN
-            if direction in (None, Dir.DOWN):
-                if p<lo: lo=p; lo_i=i
-                if p-lo>=thr:
-                    piv.append(Pivot(lo_i,float(lo),'L')); last=lo; hi=p; hi_i=i; direction=Dir.UP
-        piv.sort(key=lambda x:x.idx)
-        cleaned=[]
-        for p in piv:
-            if not cleaned or cleaned[-1].kind!=p.kind:
-                cleaned.append(p)
-            else:
-                if (p.kind=='H' and p.price>=cleaned[-1].price) or (p.kind=='L' and p.price<=cleaned[-1].price):
-                    cleaned[-1]=p
-        return cleaned
-
-    def detect_impulses(self, piv:List[Pivot], close:np.ndarray, atr:np.ndarray)->List[Impulse]:
-        res=[]; i=0
-        while i<=len(piv)-6:
-            s=piv[i:i+6]; kinds=''.join(p.kind for p in s)
-            if kinds=='LHLHLH':
-                p0,p1,p2,p3,p4,p5=s
-                w1=p1.price-p0.price; w3=p3.price-p2.price
-                if p2.price<=p0.price or w1<=0 or w3<0.6*w1: i+=1; continue
-                if p4.price<=p1.price*0.98: i+=1; continue
-                atr_b=atr[min(p3.idx, len(atr)-1)]
-                if atr_b>0 and (w3/atr_b)<self.min_imp: i+=1; continue
-                res.append(Impulse(Dir.UP,[p0,p1,p2,p3,p4,p5])); i+=3
-            elif kinds=='HLHLHL':
-                p0,p1,p2,p3,p4,p5=s
-                w1=p0.price-p1.price; w3=p2.price-p3.price
-                if p2.price>=p0.price or w1<=0 or w3<0.6*w1: i+=1; continue
-                if p4.price>=p1.price*1.02: i+=1; continue
-                atr_b=atr[min(p3.idx, len(atr)-1)]
-                if atr_b>0 and (abs(w3)/atr_b)<self.min_imp: i+=1; continue
-                res.append(Impulse(Dir.DOWN,[p0,p1,p2,p3,p4,p5])); i+=3
-            else:
-                i+=1
-        return res
-
-    def detect_abcs(self, piv:List[Pivot])->List[ABC]:
-        out=[]; i=0
-        while i<=len(piv)-4:
-            s=piv[i:i+4]; kinds=''.join(p.kind for p in s)
-            if kinds=='HLHL':
-                h0,l1,h1,l2=s
-                A=h0.price-l1.price; B=h1.price-l1.price
-                if A<=0 or not (0.3<=B/A<=0.86) or not (l2.price<l1.price): i+=1; continue
-                out.append(ABC(Dir.DOWN,[h0,l1,h1,l2])); i+=2
-            elif kinds=='LHLH':
-                l0,h1,l1,h2=s
-                A=h1.price-l0.price; B=h1.price-l1.price
-                if A<=0 or not (0.3<=B/A<=0.86) or not (h2.price>h1.price): i+=1; continue
-                out.append(ABC(Dir.UP,[l0,h1,l1,h2])); i+=2
-            else:
-                i+=1
-        return out
+    def zigzag(self, close:np.ndarray, atr:np.ndarray)->Pivots:
+        if len(close)<3: return Pivots.empty()
+        close=np.asarray(close, dtype=np.float64)
+        atr_thr=np.full(close.shape[0], np.nan)
+        if atr is not None:
+            atr=np.asarray(atr, dtype=np.float64)[:close.shape[0]]
+            atr_thr[:atr.shape[0]]=atr*self.zz_atr_mult
+        idx,price,kind=_zigzag_loop(close, atr_thr, float(self.zz_pct))
+        order=np.argsort(idx, kind='stable')
+        idx,price,kind=idx[order],price[order],kind[order]
+        keep=_dedupe_pivots(price, kind)
+        return Pivots(idx[keep], price[keep], kind[keep])
+
+    def detect_impulses(self, piv:Pivots, close:np.ndarray, atr:np.ndarray)->List[Impulse]:
+        atr=np.asarray(atr, dtype=np.float64)
+        starts,dirs=_impulse_scan(piv.idx, piv.price, piv.kind, atr, float(self.min_imp))
+        return [Impulse(Dir.UP if d==1 else Dir.DOWN, piv, i, i+6) for i,d in zip(starts.tolist(), dirs.tolist())]
+
+    def detect_abcs(self, piv:Pivots)->List[ABC]:
+        starts,dirs=_abc_scan(piv.price, piv.kind)
+        return [ABC(Dir.UP if d==1 else Dir.DOWN, piv, i, i+4) for i,d in zip(starts.tolist(), dirs.tolist())]
 
     @staticmethod
     def fib_zone(A:float,B:float,d:Dir,zone:Tuple[float,float])->Tuple[float,float]:
@@ -744,7 +956,7 @@ class SimTrade:
     entry:float; exit:float; per_share:float; risk_per_share:float
     setup:str; direction:str; time_in:pd.Timestamp; time_out:pd.Timestamp
     stop:float; tp1:float; tp2:float; mae_r:float; mfe_r:float
-    features:Dict; label:int
+    features:np.ndarray; label:int  # Reihenfolge wie FEATURE_COLUMNS
 
 @dataclass
 class Trade:
@@ -754,86 +966,138 @@ class Trade:
     stop:float; tp1:float; tp2:float; mae_r:float; mfe_r:float
     prob:Optional[float]=None; risk_per_share:Optional[float]=None
 
+@dataclass
+class EquityCurve:
+    # Struct-of-Arrays je H1-Bar: date datetime64[ns], capital/dd float64 (dd in %)
+    date:np.ndarray; capital:np.ndarray; dd:np.ndarray
+
+    @classmethod
+    def empty(cls)->"EquityCurve":
+        return cls(np.empty(0, "datetime64[ns]"), np.empty(0, np.float64), np.empty(0, np.float64))
+
+    def __len__(self)->int:
+        return self.capital.shape[0]
+
 # --------------------------------------------------------------------------------------
 # Filters/Sim
 # --------------------------------------------------------------------------------------
 def ema_trend_ok(r:pd.Series,d:Dir)->bool:
-    if not CFG["USE_EMA_TREND"]: return True
-    if CFG.get("REQUIRE_PRICE_ABOVE_EMA_FAST", True):
+    if not CFG.USE_EMA_TREND: return True
+    if CFG.REQUIRE_PRICE_ABOVE_EMA_FAST:
         return (r["EMA_FAST"]>r["EMA_SLOW"] and r["close"]>r["EMA_FAST"]) if d==Dir.UP else (r["EMA_FAST"]<r["EMA_SLOW"] and r["close"]<r["EMA_FAST"])
     else:
         return (r["EMA_FAST"]>r["EMA_SLOW"]) if d==Dir.UP else (r["EMA_FAST"]<r["EMA_SLOW"])
 
-def daily_trend_ok(daily:pd.DataFrame, ts:pd.Timestamp, d:Dir)->bool:
-    if not CFG["USE_DAILY_EMA"]: return True
-    idx=daily[daily["date"]<=pd.Timestamp(ts)].index
-    if len(idx)==0: return True
-    r=daily.loc[idx.max()]
-    return (r["EMA_FAST"]>r["EMA_SLOW"]) if d==Dir.UP else (r["EMA_FAST"]<r["EMA_SLOW"])
+def _bar_pos(dates:np.ndarray, ts, side:str="left")->int:
+    # Binärsuche auf sortierten datetime64[ns]-Arrays; Timestamps direkt über asm8, ohne neuen Timestamp
+    t = ts.asm8 if isinstance(ts, pd.Timestamp) else np.datetime64(ts, "ns")
+    return int(np.searchsorted(dates, t, side=side))
+
+def daily_trend_ok(daily_arr:Dict[str,np.ndarray], ts:pd.Timestamp, d:Dir)->bool:
+    # daily_arr = _tf_arrays(daily) (z.B. Backtester._daily_arr): zwei Array-Zugriffe statt Zeilen-Series
+    if not CFG.USE_DAILY_EMA: return True
+    j=_bar_pos(daily_arr["date"], ts, "right")-1
+    if j<0: return True
+    ef, es = daily_arr["EMA_FAST"][j], daily_arr["EMA_SLOW"][j]
+    return bool(ef>es) if d==Dir.UP else bool(ef<es)
 
 def vol_ok(r:pd.Series)->bool:
-    p=float(r["ATR_PCT"]); return CFG["ATR_PCT_MIN"]<=p<=CFG["ATR_PCT_MAX"]
+    p=float(r["ATR_PCT"]); return CFG.ATR_PCT_MIN<=p<=CFG.ATR_PCT_MAX
+
+# Vektorisierte Gegenstücke: Pass/Fail je Bar hängt nur an den Bar-Spalten -> einmal pro TF berechnen
+def ema_trend_mask(a:Dict[str,np.ndarray], d:Dir)->np.ndarray:
+    ef, es, c = a["EMA_FAST"], a["EMA_SLOW"], a["close"]
+    if not CFG.USE_EMA_TREND: return np.ones(len(c), dtype=bool)
+    m = (ef>es) if d==Dir.UP else (ef<es)
+    if CFG.REQUIRE_PRICE_ABOVE_EMA_FAST:
+        m &= (c>ef) if d==Dir.UP else (c<ef)
+    return m
+
+def vol_mask(a:Dict[str,np.ndarray])->np.ndarray:
+    p=a["ATR_PCT"]; return (p>=CFG.ATR_PCT_MIN) & (p<=CFG.ATR_PCT_MAX)
 
 def df_for_tf(h1:pd.DataFrame, m30:pd.DataFrame, tf:str)->pd.DataFrame:
     return m30 if tf=="30m" else h1
 
 def idx_from_time(df:pd.DataFrame, ts:pd.Timestamp)->Optional[int]:
-    i=df[df["date"]>=pd.Timestamp(ts)].index
-    return i.min() if len(i)>0 else None
-
-def first_touch(df:pd.DataFrame, start_ts:pd.Timestamp, zone:Tuple[float,float], window:int)->Optional[int]:
-    start_i=idx_from_time(df,start_ts)
-    if start_i is None: return None
-    zl,zh=zone; end_i=min(start_i+window, len(df)-1)
-    for i in range(start_i,end_i+1):
-        lo=float(df.iloc[i]["low"]); hi=float(df.iloc[i]["high"]); cl=float(df.iloc[i]["close"])
-        if (lo<=zh and hi>=zl) or (zl<=cl<=zh): return i
-    return None
-
-def confirm_idx(df:pd.DataFrame, touch_i:int, d:Dir, bars:int, allow_touch:bool)->Optional[int]:
-    if not CFG["REQUIRE_CONFIRM"]: return touch_i
-    end=min(touch_i+bars, len(df)-1)
-    prev_hi=float(df.iloc[max(0,touch_i-1)]["high"]); prev_lo=float(df.iloc[max(0,touch_i-1)]["low"])
+    # Daten sind nach "date" sortiert -> Binärsuche statt Bool-Maske über alle Bars
+    pos=int(df["date"].searchsorted(ts, side="left"))
+    return df.index[pos] if pos<len(df) else None
+
+def first_touch(arr:Dict[str,np.ndarray], start_i:int, zone:Tuple[float,float], window:int)->Optional[int]:
+    zl,zh=zone; sl=slice(start_i, min(start_i+window, arr["close"].shape[0]-1)+1)
+    lo=arr["low"][sl]; hi=arr["high"][sl]; cl=arr["close"][sl]
+    mask=((lo<=zh) & (hi>=zl)) | ((cl>=zl) & (cl<=zh))
+    if mask.size==0: return None
+    j=int(mask.argmax())  # erster Treffer
+    return int(start_i)+j if mask[j] else None
+
+def confirm_idx(arr:Dict[str,np.ndarray], touch_i:int, d:Dir, bars:int, allow_touch:bool)->Optional[int]:
+    if not CFG.REQUIRE_CONFIRM: return touch_i
+    high=arr["high"]; low=arr["low"]; close=arr["close"]; ema_f=arr["EMA_FAST"]; ema_s=arr["EMA_SLOW"]
+    end=min(touch_i+bars, close.shape[0]-1)
+    prev_hi=high[max(0,touch_i-1)]; prev_lo=low[max(0,touch_i-1)]
     for i in range(touch_i,end+1):
-        r=df.iloc[i]; op=float(r["open"]); cl=float(r["close"]); ef=float(r["EMA_FAST"]); es=float(r["EMA_SLOW"])
-        if "break_prev_extreme" in CFG["CONFIRM_RULES"]:
+        cl=close[i]; ef=ema_f[i]; es=ema_s[i]
+        if "break_prev_extreme" in CFG.CONFIRM_RULES:
             if d==Dir.UP and cl>prev_hi: return i
             if d==Dir.DOWN and cl<prev_lo: return i
-        if "ema_fast_cross" in CFG["CONFIRM_RULES"]:
+        if "ema_fast_cross" in CFG.CONFIRM_RULES:
             if d==Dir.UP and cl>ef and ef>es: return i
             if d==Dir.DOWN and cl<ef and ef<es: return i
     return end if allow_touch else None
 
-def simulate(df:pd.DataFrame, entry_i:int, entry:float, d:Dir, stop:float, tp1:float, tp2:float, max_bars:int)->Tuple[int,float,float,float,float]:
-    pos=1.0; realized=0.0; end=min(entry_i+max_bars, len(df)-1)
-    R=abs(entry-stop); extreme=entry; mae=0.0; mfe=0.0
+@njit(cache=True)
+def _simulate_nb(low:np.ndarray, high:np.ndarray, close:np.ndarray, entry_i:int, entry:float, d:int,
+                 stop:float, tp1:float, tp2:float, max_bars:int):
+    # Vergleiche statt max()/min(), damit NaN-Verhalten exakt dem Python-Builtin entspricht (erstes Argument gewinnt)
+    # Eine Schleife für beide Richtungen: Preise mit sg=+1/-1 multipliziert (exakt, nur Vorzeichenwechsel),
+    # günstige Seite = high (Long) bzw. low (Short), ungünstige Seite umgekehrt
+    sg=1.0 if d>0 else -1.0  # d = Dir-Wert (+1/-1)
+    fav=high if d>0 else low; adv=low if d>0 else high
+    entry_s=sg*entry; stop_s=sg*stop; tp1_s=sg*tp1; tp2_s=sg*tp2
+    pos=1.0; realized=0.0; end=min(entry_i+max_bars, close.shape[0]-1)
+    R=abs(entry-stop); extreme=entry_s; mae=0.0; mfe=0.0
     for i in range(entry_i+1,end+1):
-        r=df.iloc[i]; lo=float(r["low"]); hi=float(r["high"])
-        if d==Dir.UP:
-            extreme=max(extreme,hi); mae=min(mae,(lo-entry)/R); mfe=max(mfe,(hi-entry)/R)
-            if pos==1.0 and (extreme-entry)>=R: stop=max(stop,entry)  # BE nach +1R
-            if pos==1.0 and hi>=tp1:
-                realized+=(tp1-entry)*0.5; pos=0.5; stop=entry
-            if lo<=stop:
-                realized+=(stop-entry)*pos; return i, stop, realized, mae, mfe
-            if pos==0.5 and hi>=tp2:
-                realized+=(tp2-entry)*0.5; return i, tp2, realized, mae, mfe
-        else:
-            extreme=min(extreme,lo); mae=min(mae,(entry-float(r["high"]))/R); mfe=max(mfe,(entry-lo)/R)
-            if pos==1.0 and (entry-extreme)>=R: stop=min(stop,entry)
-            if pos==1.0 and lo<=tp1:
-                realized+=(entry-tp1)*0.5; pos=0.5; stop=entry
-            if float(r["high"])>=stop:
-                realized+=(entry-stop)*pos; return i, stop, realized, mae, mfe
-            if pos==0.5 and lo<=tp2:
-                realized+=(entry-tp2)*0.5; return i, tp2, realized, mae, mfe
-    last=float(df.iloc[end]["close"])
-    if d==Dir.UP:
-        realized+=(last-entry)*pos; mfe=max(mfe,(last-entry)/R)
-    else:
-        realized+=(entry-last)*pos; mfe=max(mfe,(entry-last)/R)
+        f=sg*fav[i]; a=sg*adv[i]
+        if f>extreme: extreme=f
+        x=(a-entry_s)/R
+        if x<mae: mae=x
+        x=(f-entry_s)/R
+        if x>mfe: mfe=x
+        if pos==1.0 and (extreme-entry_s)>=R and entry_s>stop_s: stop_s=entry_s  # BE nach +1R
+        if pos==1.0 and f>=tp1_s:
+            realized+=(tp1_s-entry_s)*0.5; pos=0.5; stop_s=entry_s
+        if a<=stop_s:
+            realized+=(stop_s-entry_s)*pos; return i, sg*stop_s, realized, mae, mfe
+        if pos==0.5 and f>=tp2_s:
+            realized+=(tp2_s-entry_s)*0.5; return i, tp2, realized, mae, mfe
+    last=close[end]
+    realized+=(sg*last-entry_s)*pos; x=(sg*last-entry_s)/R
+    if x>mfe: mfe=x
     return end, last, realized, mae, mfe
 
+@njit(cache=True, parallel=True)
+def _simulate_batch(low:np.ndarray, high:np.ndarray, close:np.ndarray, entry_i:np.ndarray, entry:np.ndarray, d:np.ndarray,
+                    stop:np.ndarray, tp1:np.ndarray, tp2:np.ndarray, max_bars:np.ndarray):
+    # Trades sind unabhängig -> prange über alle Kandidaten eines Timeframes (numba parallel, ohne GIL)
+    n=entry_i.shape[0]
+    x_idx=np.empty(n, np.int64); x_price=np.empty(n); ps=np.empty(n); mae=np.empty(n); mfe=np.empty(n)
+    for k in prange(n):
+        x_idx[k], x_price[k], ps[k], mae[k], mfe[k] = _simulate_nb(low, high, close, entry_i[k], entry[k], d[k],
+                                                                   stop[k], tp1[k], tp2[k], max_bars[k])
+    return x_idx, x_price, ps, mae, mfe
+
+def _tf_arrays(df:pd.DataFrame)->Dict[str,np.ndarray]:
+    # float64-Arrays je Spalte (einmal pro Timeframe statt df.iloc[i][col] je Bar)
+    a={c: df[c].to_numpy(np.float64) for c in ("open","high","low","close","EMA_FAST","EMA_SLOW","ATR","ATR_PCT","ADX_14") if c in df.columns}
+    if "date" in df.columns: a["date"]=df["date"].to_numpy("datetime64[ns]")
+    return a
+
+def simulate(df:pd.DataFrame, entry_i:int, entry:float, d:Dir, stop:float, tp1:float, tp2:float, max_bars:int)->Tuple[int,float,float,float,float]:
+    a=_tf_arrays(df)
+    return _simulate_nb(a["low"], a["high"], a["close"], entry_i, entry, int(d), stop, tp1, tp2, max_bars)
+
 # --------------------------------------------------------------------------------------
 # Features (ML)
 # --------------------------------------------------------------------------------------
@@ -843,35 +1107,71 @@ FEATURE_COLUMNS = [
     "zone_width_pct","dist_to_zone_center_pct",
     "rsi","hour_sin","hour_cos","dow_sin","dow_cos"
 ]
-
-def build_features(df: pd.DataFrame, entry_idx: int, d: Dir, setup: str, zone: Tuple[float,float]) -> Dict:
-    r = df.iloc[entry_idx]
-    close = float(r["close"])
-    ef = float(r["EMA_FAST"]); es = float(r["EMA_SLOW"])
-    atr_pct = float(r.get("ATR_PCT", 0.0))
-    rsi = float(r.get("RSI", 50.0))
+# Feature-Vektoren als float32 in FEATURE_COLUMNS-Reihenfolge (Baum-Modelle rechnen intern ohnehin in float32)
+FEATURE_DTYPE = np.float32
+
+def _cyclic_lookup(x:np.ndarray, period:float)->Tuple[np.ndarray,np.ndarray]:
+    # sin/cos nur je eindeutigem Wert (Stunden/Wochentage: wenige Dutzend) via math, dann per Index verteilen
+    uniq, inv = np.unique(x, return_inverse=True)
+    sin_t = np.array([math.sin(2*math.pi*v/period) for v in uniq.tolist()], dtype=np.float64)
+    cos_t = np.array([math.cos(2*math.pi*v/period) for v in uniq.tolist()], dtype=np.float64)
+    return sin_t[inv], cos_t[inv]
+
+def _feature_arrays(df:pd.DataFrame)->Dict[str,np.ndarray]:
+    # Bar-abhängige Feature-Rohwerte einmal pro Timeframe; build_features liest nur noch per Index
+    n=len(df); dates=df["date"].dt
+    fa={c: df[c].to_numpy(np.float64) for c in ("close","EMA_FAST","EMA_SLOW")}
+    fa["atr_pct"]=df["ATR_PCT"].to_numpy(np.float64) if "ATR_PCT" in df.columns else np.zeros(n)
+    rsi=df["RSI"].to_numpy(np.float64) if "RSI" in df.columns else np.full(n, 50.0)
+    fa["rsi"]=np.where(np.isnan(rsi), 50.0, rsi)
+    hour=dates.hour.to_numpy(np.int64) + dates.minute.to_numpy(np.int64)/60.0
+    fa["hour_sin"], fa["hour_cos"] = _cyclic_lookup(hour, 24.0)
+    fa["dow_sin"], fa["dow_cos"] = _cyclic_lookup(dates.weekday.to_numpy(np.int64), 7.0)
+    return fa
+
+def build_features(fa: Dict[str,np.ndarray], entry_idx: int, d: Dir, setup: str, zone: Tuple[float,float]) -> np.ndarray:
+    # fa = _feature_arrays(df) des Entry-Timeframes
+    i = entry_idx
+    close = float(fa["close"][i])
+    ef = float(fa["EMA_FAST"][i]); es = float(fa["EMA_SLOW"][i])
     ema_fast_slow_pct = (ef - es) / close if close else 0.0
     price_above_ema_fast = (close - ef) / close if close else 0.0
     zl, zh = zone
     zone_width_pct = abs(zh - zl) / close if close else 0.0
     dist_to_zone_center_pct = abs(close - (zl + zh) / 2) / close if close else 0.0
-    ts = pd.Timestamp(r["date"]); hour = ts.hour + ts.minute/60.0; dow = ts.weekday()
-    hour_sin = math.sin(2*math.pi*hour/24.0); hour_cos = math.cos(2*math.pi*hour/24.0)
-    dow_sin = math.sin(2*math.pi*dow/7.0);     dow_cos = math.cos(2*math.pi*dow/7.0)
-    return {
-        "dir_up": 1.0 if d == Dir.UP else 0.0,
-        "setup_W3": 1.0 if setup == "W3" else 0.0,
-        "setup_W5": 1.0 if setup == "W5" else 0.0,
-        "setup_C": 1.0 if setup == "C" else 0.0,
-        "atr_pct": atr_pct,
-        "ema_fast_slow_pct": ema_fast_slow_pct,
-        "price_above_ema_fast": price_above_ema_fast,
-        "zone_width_pct": zone_width_pct,
-        "dist_to_zone_center_pct": dist_to_zone_center_pct,
-        "rsi": rsi if not np.isnan(rsi) else 50.0,
-        "hour_sin": hour_sin, "hour_cos": hour_cos,
-        "dow_sin": dow_sin, "dow_cos": dow_cos
-    }
+    return np.array([
+        1.0 if d == Dir.UP else 0.0,                    # dir_up
+        1.0 if setup == "W3" else 0.0,                  # setup_W3
+        1.0 if setup == "W5" else 0.0,                  # setup_W5
+        1.0 if setup == "C" else 0.0,                   # setup_C
+        fa["atr_pct"][i],
+        ema_fast_slow_pct,
+        price_above_ema_fast,
+        zone_width_pct,
+        dist_to_zone_center_pct,
+        fa["rsi"][i],
+        fa["hour_sin"][i], fa["hour_cos"][i],
+        fa["dow_sin"][i], fa["dow_cos"][i],
+    ], dtype=FEATURE_DTYPE)
+
+def kelly_fraction(p_win, r_win, r_loss)->np.ndarray:
+    # Vereinfachte Kelly-Quote aus Trefferquote und R-Avg Gew/Verl; verzweigungsfrei, skalar oder je Szenario elementweise
+    p_win=np.asarray(p_win, dtype=float); r_win=np.asarray(r_win, dtype=float); r_loss=np.asarray(r_loss, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        k=np.where((r_loss>0)&(r_win>0), p_win-(1-p_win)/np.maximum(r_win/r_loss, 1e-9), 0.0)
+    return np.where(np.isfinite(k), k, 0.0)
+
+@njit(cache=True)
+def _cf_compound(per_share:np.ndarray, rps:np.ndarray, risk:float, cap0:float)->float:
+    # Counterfactual-Kapitalpfad: Positionsgröße je Trade aus aktuellem Kapital (int, mind. 1 Stück), Kapital zinseszinslich fortschreiben
+    cap=cap0
+    for i in range(per_share.shape[0]):
+        r=rps[i]
+        if r<1e-9: r=1e-9
+        size=risk*cap/r
+        if not size>1.0: size=1.0  # wie max(1,size): NaN -> 1
+        cap+=per_share[i]*np.floor(size)  # ganze Stück wie int(); float-floor statt int64, damit auch riesige Größen nicht überlaufen
+    return cap
 
 # --------------------------------------------------------------------------------------
 # Backtester (inkl. ML mit Mindest-Pass-Rate)
@@ -881,8 +1181,8 @@ class Backtester:
         self.daily = daily
         self.h1 = h1
         self.m30 = m30
-        self.primary_engine = ElliottEngine(CFG["PRIMARY_ZZ_PCT"], CFG["PRIMARY_ZZ_ATR_MULT"], CFG["PRIMARY_MIN_IMP_ATR"])
-        self.h1_engine = ElliottEngine(CFG["H1_ZZ_PCT"], CFG["H1_ZZ_ATR_MULT"], CFG["H1_MIN_IMP_ATR"])
+        self.primary_engine = ElliottEngine(CFG.PRIMARY_ZZ_PCT, CFG.PRIMARY_ZZ_ATR_MULT, CFG.PRIMARY_MIN_IMP_ATR)
+        self.h1_engine = ElliottEngine(CFG.H1_ZZ_PCT, CFG.H1_ZZ_ATR_MULT, CFG.H1_MIN_IMP_ATR)
         self.prim_imp: List[Impulse] = []
         self.prim_abc: List[ABC] = []
         self.impulses: List[Impulse] = []
@@ -890,9 +1190,15 @@ class Backtester:
         self.setups: List[Setup] = []
         self.sim_trades: List[SimTrade] = []
         self.trades: List[Trade] = []
-        self.equity: List[Dict] = []
+        self.equity: EquityCurve = EquityCurve.empty()
         self.model = None
+        self._proba_cache: Dict[bytes,float] = {}; self._proba_model = None
+        self._sim_probs_cache: Optional[tuple] = None
         self.threshold = 0.5
+        self._arr = {"1h": _tf_arrays(h1), "30m": _tf_arrays(m30)}
+        self._daily_arr = _tf_arrays(daily)
+        self._feat = {tf: _feature_arrays(x) for tf, x in (("1h", h1), ("30m", m30))}
+        self._m30_span = (m30["date"].iloc[0], m30["date"].iloc[-1]) if not m30.empty else None
         self.telemetry = dict(setups=0, filtered_daily=0, filtered_ema=0, filtered_vol=0, filtered_volatility=0, filtered_regime=0, no_touch=0, no_confirm=0, accepted=0)
 
     # ---------- Struktur ----------
@@ -905,141 +1211,211 @@ class Backtester:
         self.abcs     = self.h1_engine.detect_abcs(piv_h)
 
     def _preferred_tf(self, start_time:pd.Timestamp)->str:
-        if not self.m30.empty and self.m30["date"].iloc[0] <= start_time <= self.m30["date"].iloc[-1]:
+        if self._m30_span is not None and self._m30_span[0] <= start_time <= self._m30_span[1]:
             return "30m"
         return "1h"
 
     def build_setups(self):
         self.setups.clear()
+        # DatetimeArray statt Series: dates[i] liefert den Timestamp ohne .iloc-Overhead
+        eng=self.h1_engine; dates=self.h1["date"].array
+        zw3=CFG.ENTRY_ZONE_W3; zw5=CFG.ENTRY_ZONE_W5; zwc=CFG.ENTRY_ZONE_C; tp1=CFG.TP1; tp2=CFG.TP2; use_w5=CFG.USE_W5
         for imp in self.impulses:
-            p0,p1,p2,p3,p4,p5 = imp.points
+            pr=imp.prices; ix=imp.idxs; d=imp.direction  # [p0..p5] direkt aus den Pivot-Arrays
             # Symmetrische Zonen/TPs wie im Original
-            z3 = self.h1_engine.fib_zone(p0.price,p1.price,imp.direction,CFG["ENTRY_ZONE_W3"])
-            t3 = self.h1.iloc[p2.idx+1]["date"]; tf3=self._preferred_tf(t3)
-            tp1_3=self.h1_engine.fib_ext(p0.price,p1.price,imp.direction,CFG["TP1"])
-            tp2_3=self.h1_engine.fib_ext(p0.price,p1.price,imp.direction,CFG["TP2"])
-            self.setups.append(Setup("W3", imp.direction, t3, tf3, z3, p0.price, tp1_3, tp2_3, dict(src="impulse")))
-            if CFG["USE_W5"]:
-                z5=self.h1_engine.fib_zone(p2.price,p3.price,imp.direction,CFG["ENTRY_ZONE_W5"])
-                t5=self.h1.iloc[p4.idx+1]["date"]; tf5=self._preferred_tf(t5)
-                tp1_5=self.h1_engine.fib_ext(p2.price,p3.price,imp.direction,CFG["TP1"])
-                tp2_5=self.h1_engine.fib_ext(p2.price,p3.price,imp.direction,CFG["TP2"])
-                self.setups.append(Setup("W5", imp.direction, t5, tf5, z5, p2.price, tp1_5, tp2_5, dict(src="impulse")))
+            z3 = eng.fib_zone(pr[0],pr[1],d,zw3)
+            t3 = dates[ix[2]+1]; tf3=self._preferred_tf(t3)
+            tp1_3=eng.fib_ext(pr[0],pr[1],d,tp1)
+            tp2_3=eng.fib_ext(pr[0],pr[1],d,tp2)
+            self.setups.append(Setup("W3", d, t3, tf3, z3, pr[0], tp1_3, tp2_3, dict(src="impulse")))
+            if use_w5:
+                z5=eng.fib_zone(pr[2],pr[3],d,zw5)
+                t5=dates[ix[4]+1]; tf5=self._preferred_tf(t5)
+                tp1_5=eng.fib_ext(pr[2],pr[3],d,tp1)
+                tp2_5=eng.fib_ext(pr[2],pr[3],d,tp2)
+                self.setups.append(Setup("W5", d, t5, tf5, z5, pr[2], tp1_5, tp2_5, dict(src="impulse")))
         for abc in self.abcs:
-            a0,a1,b1,c1 = abc.points
-            zc=self.h1_engine.fib_zone(a0.price,a1.price,abc.direction,CFG["ENTRY_ZONE_C"])
-            tc=self.h1.iloc[b1.idx+1]["date"]; tfc=self._preferred_tf(tc)
-            tp1_c=self.h1_engine.fib_ext(a0.price,a1.price,abc.direction,CFG["TP1"])
-            tp2_c=self.h1_engine.fib_ext(a0.price,a1.price,abc.direction,CFG["TP2"])
-            self.setups.append(Setup("C", abc.direction, tc, tfc, zc, b1.price, tp1_c, tp2_c, dict(src="abc")))
+            pr=abc.prices; ix=abc.idxs; d=abc.direction  # [A0,A1,B1,C1]
+            zc=eng.fib_zone(pr[0],pr[1],d,zwc)
+            tc=dates[ix[2]+1]; tfc=self._preferred_tf(tc)
+            tp1_c=eng.fib_ext(pr[0],pr[1],d,tp1)
+            tp2_c=eng.fib_ext(pr[0],pr[1],d,tp2)
+            self.setups.append(Setup("C", d, tc, tfc, zc, pr[2], tp1_c, tp2_c, dict(src="abc")))
         self.setups.sort(key=lambda s:s.start_time)
         self.telemetry["setups"]=len(self.setups)
 
     # ---------- Simulation ----------
     def simulate_all(self):
         self.sim_trades.clear()
-        for sp in self.setups:
+        # Config einmal lokal binden (statt Attribut-Lookups je Setup)
+        use_adx=CFG.USE_ADX; adx_thr=CFG.ADX_TREND_THRESHOLD
+        buffer_mult=CFG.ATR_MULT_BUFFER; allow_touch=CFG.ALLOW_TOUCH_IF_NO_CONFIRM
+        win_tf={"30m": CFG.ENTRY_WINDOW_M30, "1h": CFG.ENTRY_WINDOW_H1}
+        bars_tf={"30m": CFG.CONFIRM_BARS_M30, "1h": CFG.CONFIRM_BARS_H1}
+        hold_tf={"30m": CFG.MAX_HOLD_M30, "1h": CFG.MAX_HOLD_H1}
+        ema_ok={(tf, d): ema_trend_mask(a, d) for tf, a in self._arr.items() if "close" in a for d in (Dir.UP, Dir.DOWN)}
+        vol_ok_tf={tf: vol_mask(a) for tf, a in self._arr.items() if "close" in a}
+        # Gates (ADX-Regime, Startbar, EMA, Vol) für alle Setups vektorisiert vorab auswerten;
+        # Reihenfolge/Telemetrie wie bisher: jedes Setup zählt nur beim ersten verfehlten Gate
+        n=len(self.setups)
+        st=np.array([sp.start_time for sp in self.setups], dtype="datetime64[ns]")
+        up=np.array([sp.direction==Dir.UP for sp in self.setups], dtype=bool)
+        is30=np.array([sp.entry_tf=="30m" for sp in self.setups], dtype=bool)
+        keep=np.ones(n, dtype=bool); start_all=np.zeros(n, dtype=np.int64)
+        da=self._daily_arr
+        if use_adx and n and "ADX_14" in da and len(da["ADX_14"]):
             # Regime-Filter (ADX) als erstes Gate
-            if CFG.get("USE_ADX", True):
-                try:
-                    didx=self.daily[self.daily["date"]<=pd.Timestamp(sp.start_time)].index
-                    if len(didx)>0 and "ADX_14" in self.daily.columns:
-                        cur_adx=float(self.daily.loc[didx.max(), "ADX_14"])
-                        if not np.isnan(cur_adx) and cur_adx < CFG.get("ADX_TREND_THRESHOLD",25):
-                            self.telemetry["filtered_regime"] = self.telemetry.get("filtered_regime",0)+1
-                            continue
-                except Exception:
-                    pass
-            df = df_for_tf(self.h1, self.m30, sp.entry_tf)
-            if df.empty: continue
-            start_i = idx_from_time(df, sp.start_time)
-            if start_i is None: self.telemetry["no_touch"]+=1; continue
-            if not ema_trend_ok(df.loc[start_i], sp.direction):
-                self.telemetry["filtered_ema"]+=1; continue
-            if not vol_ok(df.loc[start_i]):
-                self.telemetry["filtered_vol"]+=1; continue
-
-            win = CFG["ENTRY_WINDOW_M30"] if sp.entry_tf=="30m" else CFG["ENTRY_WINDOW_H1"]
-            t_idx = first_touch(df, sp.start_time, sp.zone, win)
+            dpos=np.searchsorted(da["date"], st, side="right")
+            cur_adx=np.where(dpos>0, da["ADX_14"][np.maximum(dpos-1, 0)], np.nan)
+            regime=cur_adx < adx_thr  # NaN -> kein Filter
+            self.telemetry["filtered_regime"]+=int(regime.sum()); keep&=~regime
+        for tf, sel in (("30m", is30), ("1h", ~is30)):
+            sel=sel & keep
+            if not sel.any(): continue
+            if df_for_tf(self.h1, self.m30, tf).empty: keep[sel]=False; continue
+            a=self._arr[tf]; nb=len(a["close"])
+            si=np.searchsorted(a["date"], st[sel], side="left"); start_all[sel]=si
+            gate=np.zeros(n, dtype=np.int8)  # 0 ok, 1 no_touch, 2 ema, 3 vol
+            g=np.where(si>=nb, 1, 0); sc=np.minimum(si, max(nb-1, 0))
+            ema=np.where(up[sel], ema_ok[tf, Dir.UP][sc], ema_ok[tf, Dir.DOWN][sc])
+            g=np.where((g==0) & ~ema, 2, g)
+            g=np.where((g==0) & ~vol_ok_tf[tf][sc], 3, g)
+            gate[sel]=g
+            self.telemetry["no_touch"]+=int((gate==1).sum())
+            self.telemetry["filtered_ema"]+=int((gate==2).sum())
+            self.telemetry["filtered_vol"]+=int((gate==3).sum())
+            keep&=gate==0
+
+        # Touch/Bestätigung je Setup, dann alle Kandidaten eines Timeframes in einem Batch simulieren
+        cand=[]  # (setup, tf, e_idx, entry, stop, rps) in Setup-Reihenfolge
+        for k in np.flatnonzero(keep).tolist():
+            sp=self.setups[k]; start_i=int(start_all[k])
+            tf = "30m" if sp.entry_tf=="30m" else "1h"
+            arr = self._arr[tf]
+
+            t_idx = first_touch(arr, start_i, sp.zone, win_tf[tf])
             if t_idx is None: self.telemetry["no_touch"]+=1; continue
-            bars = CFG["CONFIRM_BARS_M30"] if sp.entry_tf=="30m" else CFG["CONFIRM_BARS_H1"]
-            e_idx = confirm_idx(df, t_idx, sp.direction, bars, CFG["ALLOW_TOUCH_IF_NO_CONFIRM"])
+            e_idx = confirm_idx(arr, t_idx, sp.direction, bars_tf[tf], allow_touch)
             if e_idx is None: self.telemetry["no_confirm"]+=1; continue
 
-            atr=float(df.iloc[e_idx]["ATR"])
-            atr_mult = CFG["ATR_MULT_BUFFER"]
-            buffer=atr_mult*atr
+            atr=float(arr["ATR"][e_idx])
+            buffer=buffer_mult*atr
             stop = sp.stop_ref - buffer if sp.direction==Dir.UP else sp.stop_ref + buffer
-            entry=float(df.iloc[e_idx]["close"])
+            entry=float(arr["close"][e_idx])
             rps=abs(entry-stop)
             if rps<=1e-9: continue
-
-            max_hold=CFG["MAX_HOLD_M30"] if sp.entry_tf=="30m" else CFG["MAX_HOLD_H1"]
-            x_idx,x_price,ps,mae,mfe = simulate(df, e_idx, entry, sp.direction, stop, sp.tp1, sp.tp2, max_hold)
-            feats = build_features(df, e_idx, sp.direction, sp.setup, sp.zone)
+            cand.append((sp, tf, e_idx, entry, stop, rps))
+
+        res={}
+        for tf in ("30m", "1h"):
+            ck=[c for c in cand if c[1]==tf]
+            if not ck: continue
+            arr=self._arr[tf]
+            out=_simulate_batch(arr["low"], arr["high"], arr["close"],
+                                np.array([c[2] for c in ck], dtype=np.int64), np.array([c[3] for c in ck], dtype=np.float64),
+                                np.array([c[0].direction for c in ck], dtype=np.int8), np.array([c[4] for c in ck], dtype=np.float64),
+                                np.array([c[0].tp1 for c in ck], dtype=np.float64), np.array([c[0].tp2 for c in ck], dtype=np.float64),
+                                np.full(len(ck), hold_tf[tf], dtype=np.int64))
+            res[tf]=iter(zip(*(o.tolist() for o in out)))
+
+        tf_dates={tf: df_for_tf(self.h1, self.m30, tf)["date"].array for tf in res}
+        for sp, tf, e_idx, entry, stop, rps in cand:
+            x_idx,x_price,ps,mae,mfe = next(res[tf])
+            feats = build_features(self._feat[tf], e_idx, sp.direction, sp.setup, sp.zone)
             label = 1 if ps>0 else 0
 
             self.sim_trades.append(SimTrade(sp.entry_tf, e_idx, x_idx, entry, x_price, ps, rps,
                                             sp.setup, "LONG" if sp.direction==Dir.UP else "SHORT",
-                                            df.iloc[e_idx]["date"], df.iloc[x_idx]["date"],
+                                            tf_dates[tf][e_idx], tf_dates[tf][x_idx],
                                             stop, sp.tp1, sp.tp2, mae, mfe, feats, label))
             self.telemetry["accepted"]+=1
 
     # ---------- ML ----------
-    def _XY(self, trades:List[SimTrade])->Tuple[pd.DataFrame,np.ndarray]:
-        X=pd.DataFrame([t.features for t in trades])
-        for c in FEATURE_COLUMNS:
-            if c not in X.columns: X[c]=0.0
-        return X[FEATURE_COLUMNS], np.array([t.label for t in trades], dtype=int)
+    def _XY(self, trades:List[SimTrade])->Tuple[np.ndarray,np.ndarray]:
+        # Direkt als ndarray an sklearn (ohne DataFrame-Spaltenabgleich)
+        X=np.stack([t.features for t in trades]) if trades else np.empty((0, len(FEATURE_COLUMNS)), FEATURE_DTYPE)
+        return X, np.fromiter((t.label for t in trades), dtype=int, count=len(trades))
+
+    def _predict_proba(self, X:np.ndarray)->np.ndarray:
+        # P(Label=1) je Zeile; identische Feature-Zeilen gehen (auch über Aufrufe hinweg) nur einmal ans Modell.
+        # Cache gilt pro Modell-Instanz und wird bei neuem Modell verworfen.
+        if self._proba_model is not self.model:
+            self._proba_cache={}; self._proba_model=self.model
+        cache=self._proba_cache; keys=[r.tobytes() for r in X]
+        new:Dict[bytes,int]={}
+        for i,k in enumerate(keys):
+            if k not in cache and k not in new: new[k]=i
+        if new:
+            p=self.model.predict_proba(X[list(new.values())])[:,1]
+            cache.update(zip(new.keys(), p.tolist()))
+        return np.array([cache[k] for k in keys], dtype=np.float64)
+
+    def sim_probs(self)->Tuple[List[SimTrade],np.ndarray,np.ndarray]:
+        # (SimTrades nach time_in, Feature-Matrix, P(Label=1)) - einmal je Modell/Trade-Satz, für Counterfactual-Szenarien
+        key=(id(self.model), id(self.sim_trades), len(self.sim_trades))
+        if self._sim_probs_cache is None or self._sim_probs_cache[0]!=key:
+            sims=sorted(self.sim_trades, key=lambda t:t.time_in)
+            X,_=self._XY(sims)
+            probs=self._predict_proba(X) if self.model is not None else np.full(len(sims), np.nan)
+            self._sim_probs_cache=(key, sims, X, probs)
+        return self._sim_probs_cache[1:]
 
     def _make_calibrator(self, estimator, method, cv):
         # Nicht genutzt in der Original-Baseline
         return estimator
 
     def train_model(self, train_trades:List[SimTrade]):
+        from sklearn.ensemble import GradientBoostingClassifier
         X,y=self._XY(train_trades)
         clf=GradientBoostingClassifier(random_state=42).fit(X,y)
         self.model=clf
         self.threshold=0.5
         # Optionale Diagnose
         try:
-            probs=clf.predict_proba(X)[:,1]
+            probs=self._predict_proba(X)
             self.ml_train_pass_rate = float((probs>=self.threshold).mean())
         except Exception:
             self.ml_train_pass_rate = None
 
     def build_equity(self, train_until:pd.Timestamp):
-        self.trades.clear(); self.equity.clear()
-        cap=CFG["START_CAPITAL"]; eq_map:Dict[pd.Timestamp,float]={}
+        self.trades.clear(); self.equity=EquityCurve.empty()
+        cap=CFG.START_CAPITAL; eq_map:Dict[int,float]={}  # H1-Position -> Kapital nach Exit
+        h1_dates=self._arr["1h"]["date"]
 
         # Test-Passrate prüfen/relaxen
         oos=[t for t in self.sim_trades if t.time_in>train_until]
+        oos_probs:Optional[np.ndarray]=None
         if self.model is not None and oos:
-            Xo,_=self._XY(oos); probs=self.model.predict_proba(Xo)[:,1]
+            # Ein Batch für alle OOS-Trades (meist schon aus der Threshold-Optimierung gecacht); unten wiederverwendet
+            Xo,_=self._XY(oos); probs=oos_probs=self._predict_proba(Xo)
             raw_rate=float((probs>=self.threshold).mean())
             self.ml_test_pass_rate_raw=raw_rate
-            if raw_rate < CFG["ML_MIN_PASS_RATE_TEST"]:
-                thr_relaxed=float(np.quantile(probs, 1-CFG["ML_MIN_PASS_RATE_TEST"]))
+            if raw_rate < CFG.ML_MIN_PASS_RATE_TEST:
+                thr_relaxed=float(np.quantile(probs, 1-CFG.ML_MIN_PASS_RATE_TEST))
                 self.threshold=min(self.threshold, thr_relaxed)
 
         # --- Dynamische Risiko Hilfsfunktionen ---
         def _dd_percent(current_cap:float, highest_cap:float)->float:
             return (current_cap/highest_cap - 1.0)*100.0 if highest_cap>0 else 0.0
+        # Config einmal lokal binden; add() läuft je Trade
+        dyn_dd=CFG.DYNAMIC_DD_RISK
+        dd_steps=tuple(sorted(CFG.DD_RISK_STEPS, key=lambda x:x[0]))  # einmal sortiert statt je Trade
+        use_vol_target=CFG.USE_VOL_TARGET; target=CFG.TARGET_ANNUAL_VOL; window=CFG.VOL_WINDOW_TRADES
+        base_risk=CFG.RISK_PER_TRADE; risk_min=CFG.RISK_PER_TRADE_MIN; risk_max=CFG.RISK_PER_TRADE_MAX
+        short_factor=CFG.SIZE_SHORT_FACTOR; size_by_prob=CFG.SIZE_BY_PROB
+        prob_min=CFG.PROB_SIZE_MIN; prob_span=CFG.PROB_SIZE_MAX-CFG.PROB_SIZE_MIN
         def _risk_multiplier_for_dd(cur_dd:float)->float:
-            if not CFG.get("DYNAMIC_DD_RISK", False):
+            if not dyn_dd:
                 return 1.0
-            steps=CFG.get("DD_RISK_STEPS", [])
             mult=1.0
-            for thr,m in sorted(steps, key=lambda x:x[0]):  # thr ist negativ (z.B. -10)
+            for thr,m in dd_steps:  # thr ist negativ (z.B. -10)
                 if cur_dd <= thr:
                     mult=m
             return mult
         trade_returns=[]  # für Vol-Zielsteuerung
         def _vol_adjustment()->float:
-            if not CFG.get("USE_VOL_TARGET", False):
+            if not use_vol_target:
                 return 1.0
-            target=CFG.get("TARGET_ANNUAL_VOL", 0.25)
-            window=CFG.get("VOL_WINDOW_TRADES", 40)
             if len(trade_returns)<5:
                 return 1.0
             recent=trade_returns[-window:]
@@ -1052,31 +1428,29 @@ class Backtester:
             scale=target/ (s*4)  # heuristisch (4 ~ sqrt(approx trades/year Anteil))
             return max(0.4, min(1.6, scale))
 
-        max_stop_dd=CFG.get("MAX_DRAWDOWN_STOP", -1e9)
+        max_stop_dd=CFG.MAX_DRAWDOWN_STOP
         highest_global=cap
 
-        def add(sim:SimTrade, prob:Optional[float]):
+        def add(sim:SimTrade, prob:Optional[float], hpos:int):
             nonlocal cap
             nonlocal highest_global
-            if CFG.get("MAX_DRAWDOWN_STOP", -1e9) > -1e8:  # wurde gesetzt
+            if max_stop_dd > -1e8:  # wurde gesetzt
                 # Prüfe aktuellen Drawdown (gegen highest_global)
                 cur_dd=_dd_percent(cap, highest_global)
                 if cur_dd <= max_stop_dd:
                     return  # Trade verweigern – Hard Stop
-            # Basis-Risiko
-            base_risk=CFG["RISK_PER_TRADE"]
             # Drawdown Multiplikator
             cur_dd=_dd_percent(cap, highest_global)
             dd_mult=_risk_multiplier_for_dd(cur_dd)
             # Vol-Ziel Multiplikator
             vol_mult=_vol_adjustment()
             eff_risk=base_risk*dd_mult*vol_mult
-            eff_risk=max(CFG.get("RISK_PER_TRADE_MIN", eff_risk), min(eff_risk, CFG.get("RISK_PER_TRADE_MAX", eff_risk)))
+            eff_risk=max(eff_risk if risk_min is None else risk_min, min(eff_risk, eff_risk if risk_max is None else risk_max))
             size=(eff_risk*cap)/max(sim.risk_per_share,1e-9)
-            if sim.direction=="SHORT": size *= CFG["SIZE_SHORT_FACTOR"]
-            if prob is not None and CFG["SIZE_BY_PROB"]:
+            if sim.direction=="SHORT": size *= short_factor
+            if prob is not None and size_by_prob:
                 frac=max(0.0,(prob-self.threshold)/max(1e-6,1-self.threshold))
-                scale=CFG["PROB_SIZE_MIN"] + (CFG["PROB_SIZE_MAX"]-CFG["PROB_SIZE_MIN"])*frac
+                scale=prob_min + prob_span*frac
                 size*=scale
             size=int(max(1,size))
             pnl = (sim.per_share * size)
@@ -1084,35 +1458,41 @@ class Backtester:
             # Speichere R-Multiple für Vol-Steuerung
             trade_returns.append(sim.per_share/max(sim.risk_per_share,1e-9))
             # Exit auf nächste 1H-Zeit mappen
-            h1_after=self.h1[self.h1["date"]>=sim.time_out]
-            map_time=h1_after["date"].iloc[0] if len(h1_after) else self.h1["date"].iloc[-1]
-            eq_map[map_time]=cap
+            eq_map[hpos]=cap
             rr=sim.per_share/max(sim.risk_per_share,1e-9)
             self.trades.append(Trade(sim.entry_tf,sim.entry_idx,sim.exit_idx,sim.entry,sim.exit,pnl,size,rr,
                                      sim.setup,sim.direction,sim.time_in,sim.time_out,sim.stop,sim.tp1,sim.tp2,sim.mae_r,sim.mfe_r,
                                      prob=prob, risk_per_share=sim.risk_per_share))
             highest_global=max(highest_global, cap)
 
-        pre_ml=len([t for t in self.sim_trades if t.time_in>train_until]); post_ml=0
-        for sim in self.sim_trades:
-            if sim.time_in<=train_until:
-                add(sim, None)
+        pre_ml=len(oos); post_ml=0
+        oos_p=iter(oos_probs.tolist()) if oos_probs is not None else None
+        # Exit -> nächste 1H-Bar für alle Trades in einem searchsorted (Exit-Zeiten sind bereits datetime64[ns])
+        t_out=np.array([sim.time_out for sim in self.sim_trades], dtype="datetime64[ns]")
+        exit_pos=np.minimum(np.searchsorted(h1_dates, t_out, side="left"), len(h1_dates)-1).tolist()
+        for sim, hpos in zip(self.sim_trades, exit_pos):
+            # Reihenfolge bleibt chronologisch: pre/post-Trades werden nicht umsortiert
+            if sim.time_in<=train_until or oos_p is None:
+                add(sim, None, hpos)
             else:
-                if self.model is None:
-                    add(sim, None)
-                else:
-                    X=pd.DataFrame([sim.features])[FEATURE_COLUMNS]
-                    p=float(self.model.predict_proba(X)[0,1])
-                    if p>=self.threshold:
-                        add(sim, p); post_ml+=1
+                p=next(oos_p)
+                if p>=self.threshold:
+                    add(sim, p, hpos); post_ml+=1
         self.ml_test_pass_rate = (post_ml/max(1,pre_ml)) if pre_ml>0 else None
 
-        highest=CFG["START_CAPITAL"]; cur=CFG["START_CAPITAL"]
-        for ts in self.h1["date"]:
-            if ts in eq_map: cur=eq_map[ts]
-            highest=max(highest, cur)
-            dd=(cur - highest)/max(highest,1e-9)*100
-            self.equity.append(dict(date=ts, capital=cur, dd=dd))
+        # Kapital je H1-Bar: Exit-Stände setzen, vorwärts füllen, Drawdown gegen laufendes Hoch
+        cur=np.full(len(h1_dates), np.nan)
+        if eq_map: cur[np.fromiter(eq_map.keys(), dtype=np.int64)]=np.fromiter(eq_map.values(), dtype=float)
+        cur=pd.Series(cur).ffill().fillna(CFG.START_CAPITAL).to_numpy()
+        highest=np.maximum(np.maximum.accumulate(cur), CFG.START_CAPITAL) if len(cur) else cur
+        dd=(cur - highest)/np.maximum(highest,1e-9)*100
+        self.equity=EquityCurve(h1_dates, cur, dd)
+
+    def _train_split(self)->pd.Timestamp:
+        # Zeitpunkt des TRAIN_FRAC-Quantils der Einstiege per Quickselect (np.partition, O(N)) statt vollständiger Sortierung
+        times=np.fromiter((t.time_in.value for t in self.sim_trades), np.int64, count=len(self.sim_trades))
+        k=max(1, int(len(times)*CFG.TRAIN_FRAC))-1
+        return pd.Timestamp(int(np.partition(times, k)[k]))
 
     def run(self)->Dict:
         self.analyze_structure()
@@ -1120,35 +1500,31 @@ class Backtester:
         self.simulate_all()
         if not self.sim_trades: return {}
 
-        times=sorted([t.time_in for t in self.sim_trades])
-        split_idx=max(1, int(len(times)*CFG["TRAIN_FRAC"]))
-        train_until=times[split_idx-1]
+        train_until=self._train_split()
 
-        if CFG["USE_ML"]:
+        if CFG.USE_ML:
             train=[t for t in self.sim_trades if t.time_in<=train_until]
             if len(train)>=20:
                 self.train_model(train)
                 # Threshold Optimization (Validation = OOS until now)
-                if CFG.get("OPTIMIZE_ML_THRESHOLD", False) and self.model is not None:
+                if CFG.OPTIMIZE_ML_THRESHOLD and self.model is not None:
                     try:
                         val=[t for t in self.sim_trades if t.time_in>train_until]
                         if len(val)>=25:
-                            Xv,_=self._XY(val); probs=self.model.predict_proba(Xv)[:,1]
+                            Xv,_=self._XY(val); probs=self._predict_proba(Xv)
                             labels=np.array([t.label for t in val])
                             # Kandidaten-Thresholds (Quantile Raster)
                             qs=np.linspace(0.2,0.9,15)
-                            best_thr=self.threshold; best_score=-1e9
-                            for q in qs:
-                                thr=np.quantile(probs,q)
-                                mask=probs>=thr
-                                if mask.sum()<5: continue
-                                sel=labels[mask]
-                                win_rate=sel.mean() if len(sel)>0 else 0
-                                # Approx. Gewinn je Trade = win_rate - (1-win_rate)*(avg_loss_ratio) -> hier vereinfachen: score = win_rate - 0.5*(1-win_rate)
-                                score=win_rate - 0.5*(1-win_rate)
-                                if score>best_score:
-                                    best_score=score; best_thr=thr
-                            self.threshold=float(best_thr)
+                            thrs=np.quantile(probs,qs)
+                            # alle Kandidaten in einem Schritt: (len(qs) x N) Masken
+                            masks=probs[None,:]>=thrs[:,None]
+                            counts=masks.sum(1); wins=(masks & (labels[None,:]!=0)).sum(1)
+                            win_rate=wins/np.maximum(counts,1)
+                            # Approx. Gewinn je Trade = win_rate - (1-win_rate)*(avg_loss_ratio) -> hier vereinfachen: score = win_rate - 0.5*(1-win_rate)
+                            score=np.where(counts>=5, win_rate - 0.5*(1-win_rate), -np.inf)
+                            # argmax nimmt bei Gleichstand den ersten Kandidaten (wie zuvor ">")
+                            if np.isfinite(score).any():
+                                self.threshold=float(thrs[int(score.argmax())])
                     except Exception:
                         pass
             else:
@@ -1161,26 +1537,44 @@ class Backtester:
         print("\n--- Telemetrie ---")
         print(f"Setups gesamt: {self.telemetry['setups']} | akzeptiert bis Entry: {self.telemetry['accepted']}")
         print(f"Filter: daily={self.telemetry.get('filtered_daily',0)}, regime(ADX)={self.telemetry.get('filtered_regime',0)}, ema={self.telemetry['filtered_ema']}, vol={self.telemetry['filtered_vol']}, no_touch={self.telemetry['no_touch']}, no_confirm={self.telemetry['no_confirm']}")
-        if CFG["USE_ML"]:
+        if CFG.USE_ML:
             print(f"ML threshold: {self.threshold:.3f} | Train pass-rate: {self.ml_train_pass_rate} | Test pass-rate used: {self.ml_test_pass_rate}")
         return metrics
 
     # ---------- Metrics ----------
+    def _trades_to_arrays(self)->Dict[str,np.ndarray]:
+        # Struct-of-Arrays über self.trades: ein Durchlauf statt vieler Listen-Comprehensions in metrics()
+        tr=self.trades; n=len(tr)
+        t_in=np.array([t.time_in for t in tr], dtype="datetime64[ns]"); t_out=np.array([t.time_out for t in tr], dtype="datetime64[ns]")
+        return dict(
+            pnl=np.fromiter((t.pnl for t in tr), float, count=n),
+            rr=np.fromiter((t.rr for t in tr), float, count=n),
+            size=np.fromiter((t.size for t in tr), float, count=n),
+            long=np.fromiter((t.direction=="LONG" for t in tr), bool, count=n),
+            mae_r=np.fromiter((t.mae_r for t in tr), float, count=n),
+            mfe_r=np.fromiter((t.mfe_r for t in tr), float, count=n),
+            hold_h=(t_out-t_in).astype(np.int64)/1e9/3600.0,  # wie Timedelta.total_seconds()/3600
+        )
+
     def metrics(self)->Dict:
-        if not self.equity: return {}
-        pnl=[t.pnl for t in self.trades]
-        wins=[x for x in pnl if x>0]; losses=[x for x in pnl if x<=0]
-        start=CFG["START_CAPITAL"]; end=self.equity[-1]["capital"]
+        if not len(self.equity): return {}
+        ta=self._trades_to_arrays(); n_tr=len(self.trades)
+        pnl_arr=ta["pnl"]; rr=ta["rr"]; pnl=pnl_arr.tolist()
+        win_mask=pnl_arr>0; loss_mask=pnl_arr<=0  # NaN zählt (wie zuvor) zu keinem von beiden
+        wins=pnl_arr[win_mask]; losses=pnl_arr[loss_mask]
+        start=CFG.START_CAPITAL; end=float(self.equity.capital[-1])
         total_return=(end-start)/start*100 if start>0 else 0.0
 
         # Periodische Renditen (dezimal) aus 1H Equity (ggf. leere Schritte = 0)
-        eq=pd.DataFrame(self.equity)
-        eq["date"]=pd.to_datetime(eq["date"])
-        eq["ret"]=eq["capital"].pct_change().fillna(0.0)  # dezimal
-        rets=eq["ret"].values
+        # direkt aus den EquityCurve-Arrays (wie pct_change().fillna(0))
+        cap=self.equity.capital; eq_dates=self.equity.date
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets=np.concatenate(([0.0], cap[1:]/cap[:-1]-1.0))  # dezimal
+        rets[np.isnan(rets)]=0.0
 
         # Perioden pro Jahr dynamisch (robust bei Lücken)
-        span_years=max((eq["date"].iloc[-1]-eq["date"].iloc[0]).days/365.0, 1e-6)
+        span=pd.Timestamp(eq_dates[-1])-pd.Timestamp(eq_dates[0])  # einmal: Jahre (Perioden/CAGR) und Stunden (Exposure)
+        span_years=max(span.days/365.0, 1e-6)
         periods_per_year = len(rets)/span_years if span_years>0 else 0.0
 
         mu = float(np.mean(rets)) if len(rets) else 0.0
@@ -1198,7 +1592,7 @@ class Backtester:
         sortino = ((mu - rf_per_period)/down_sigma)*math.sqrt(periods_per_year) if down_sigma>1e-12 and periods_per_year>0 else 0.0
 
         # CAGR über Kapitalverlauf (robust)
-        years = max((pd.Timestamp(self.equity[-1]["date"]) - pd.Timestamp(self.equity[0]["date"])).days / 365.0, 1e-6)
+        years = span_years
         try:
             cagr = ((end/start)**(1/years)-1)*100 if start>0 else 0.0
             if not np.isfinite(cagr) or cagr > 1e6 or cagr < -1e6:
@@ -1207,8 +1601,8 @@ class Backtester:
             cagr = 0.0
 
         # Drawdown-Kennzahlen
-        max_dd=min(e["dd"] for e in self.equity) if self.equity else 0.0  # in %
-        dd_dec=np.array([-min(0.0, e["dd"]/100.0) for e in self.equity], dtype=float)  # positive Tiefen
+        max_dd=float(self.equity.dd.min())  # in %
+        dd_dec=-np.minimum(self.equity.dd/100.0, 0.0)  # positive Tiefen
         ulcer_index=math.sqrt(float(np.mean(dd_dec**2))) if len(dd_dec)>0 else 0.0
         upi=((cagr/100.0)-rf_ann)/ulcer_index if ulcer_index>1e-12 else 0.0
 
@@ -1218,91 +1612,94 @@ class Backtester:
         gain_to_pain = (pos_sum/abs(neg_sum)) if neg_sum!=0 else np.inf
 
         # Exposure (vereinfachte Approx: Summe Haltedauer / Gesamtdauer)
-        total_hours = (eq["date"].iloc[-1]-eq["date"].iloc[0]).total_seconds()/3600.0
-        held_hours = float(np.sum([(t.time_out - t.time_in).total_seconds()/3600.0 for t in self.trades]))
+        hold_h=ta["hold_h"]
+        total_hours = span.total_seconds()/3600.0
+        held_hours = float(np.sum(hold_h))
         exposure = min(1.0, held_hours/max(total_hours,1e-6)) if total_hours>0 else 0.0
 
         # Sonstiges
-        hit=len(wins)/len(pnl)*100 if pnl else 0.0
-        avg_win=float(np.mean(wins)) if wins else 0.0
-        avg_loss=float(np.mean(losses)) if losses else 0.0
+        hit=len(wins)/n_tr*100 if n_tr else 0.0
+        avg_win=float(wins.mean()) if wins.size else 0.0
+        avg_loss=float(losses.mean()) if losses.size else 0.0
         payoff=abs(avg_win)/abs(avg_loss) if avg_loss!=0 else np.nan
-        profit_factor=(sum(wins)/abs(sum(losses))) if losses else np.inf
+        profit_factor=(float(wins.sum())/abs(float(losses.sum()))) if losses.size else np.inf
         expectancy=(hit/100.0)*avg_win + (1-hit/100.0)*avg_loss
 
-        by_type:Dict[str,List[float]]={}; by_dir={"LONG":[], "SHORT":[]}
-        for t in self.trades:
-            by_type.setdefault(t.setup,[]).append(t.pnl)
-            by_dir[t.direction].append(t.pnl)
-        type_stats={k:dict(count=len(v),sum=float(np.sum(v)),avg=float(np.mean(v)) if v else 0.0) for k,v in by_type.items()}
-        dir_stats={k:dict(count=len(v),sum=float(np.sum(v)),avg=float(np.mean(v)) if v else 0.0) for k,v in by_dir.items()}
-        durations=[(t.time_out - t.time_in).total_seconds()/3600.0 for t in self.trades]
-        mae=[t.mae_r for t in self.trades]; mfe=[t.mfe_r for t in self.trades]
+        # Partitionen per Maske statt Listen je Typ/Richtung
+        setup_arr=np.array([t.setup for t in self.trades], dtype=object)
+        long_pnl=pnl_arr[ta["long"]]; short_pnl=pnl_arr[~ta["long"]]
+        def _part_stats(v:np.ndarray)->Dict:
+            return dict(count=int(v.size),sum=float(np.sum(v)),avg=float(v.mean()) if v.size else 0.0)
+        type_stats={k:_part_stats(pnl_arr[setup_arr==k]) for k in dict.fromkeys(setup_arr.tolist())}
+        dir_stats={"LONG":_part_stats(long_pnl), "SHORT":_part_stats(short_pnl)}
+        durations=hold_h.tolist()
+        mae=ta["mae_r"].tolist(); mfe=ta["mfe_r"].tolist()
 
         # Erweiterte Fehler-/Chance Kennzahlen
-        long_pnls=by_dir.get("LONG",[]); short_pnls=by_dir.get("SHORT",[])
-        long_wins=[x for x in long_pnls if x>0]; long_losses=[x for x in long_pnls if x<=0]
-        short_wins=[x for x in short_pnls if x>0]; short_losses=[x for x in short_pnls if x<=0]
-        winrate_long=len(long_wins)/len(long_pnls)*100 if long_pnls else 0.0
-        winrate_short=len(short_wins)/len(short_pnls)*100 if short_pnls else 0.0
-        pf_long=(sum(long_wins)/abs(sum(long_losses))) if long_losses else (np.inf if long_wins else 0.0)
-        pf_short=(sum(short_wins)/abs(sum(short_losses))) if short_losses else (np.inf if short_wins else 0.0)
+        def _side_stats(v:np.ndarray)->Tuple[float,float]:
+            w=v[v>0]; l=v[v<=0]
+            winrate=w.size/v.size*100 if v.size else 0.0
+            pf=(float(w.sum())/abs(float(l.sum()))) if l.size else (np.inf if w.size else 0.0)
+            return winrate, pf
+        winrate_long, pf_long = _side_stats(long_pnl)
+        winrate_short, pf_short = _side_stats(short_pnl)
 
         # Expectancy in R (Durchschnitts R-Multiple)
-        R_list=[t.rr for t in self.trades]
-        expectancy_R=float(np.mean(R_list)) if R_list else 0.0
+        expectancy_R=float(rr.mean()) if n_tr else 0.0
 
         # Kelly (vereinfachte Variante basierend auf R-Avg Gew/Verl)
-        avg_R_win=float(np.mean([r for r,p in zip(R_list,pnl) if p>0])) if any(p>0 for p in pnl) else 0.0
-        avg_R_loss=abs(float(np.mean([r for r,p in zip(R_list,pnl) if p<=0]))) if any(p<=0 for p in pnl) else 0.0
-        p_win=len(wins)/len(pnl) if pnl else 0.0
-        kelly = (p_win - (1-p_win)/max(avg_R_win/avg_R_loss,1e-9)) if avg_R_loss>0 and avg_R_win>0 else 0.0
-        if not np.isfinite(kelly): kelly=0.0
-        kelly_pct=kelly*100.0
-
-        avg_mae_r=float(np.mean(mae)) if mae else 0.0
-        avg_mfe_r=float(np.mean(mfe)) if mfe else 0.0
-        median_mae_r=float(np.median(mae)) if mae else 0.0
-        median_mfe_r=float(np.median(mfe)) if mfe else 0.0
-        best_trade=float(max(pnl)) if pnl else 0.0
-        worst_trade=float(min(pnl)) if pnl else 0.0
-        avg_size=float(np.mean([t.size for t in self.trades])) if self.trades else 0.0
-        pnl_std=float(np.std(pnl, ddof=1)) if len(pnl)>1 else 0.0
-        downside_deviation=float(np.std([x for x in pnl if x<0], ddof=1)) if len([x for x in pnl if x<0])>1 else 0.0
+        avg_R_win=float(rr[win_mask].mean()) if win_mask.any() else 0.0
+        avg_R_loss=abs(float(rr[loss_mask].mean())) if loss_mask.any() else 0.0
+        p_win=len(wins)/n_tr if n_tr else 0.0
+        kelly_pct=float(kelly_fraction(p_win, avg_R_win, avg_R_loss))*100.0
+
+        # MAE/MFE als ein (2,N)-Puffer: Mittel und Median je Zeile in je einer Reduktion
+        if n_tr:
+            ex=np.vstack((ta["mae_r"], ta["mfe_r"]))
+            avg_mae_r, avg_mfe_r = ex.mean(axis=1).tolist(); median_mae_r, median_mfe_r = np.median(ex, axis=1).tolist()
+        else:
+            avg_mae_r=avg_mfe_r=median_mae_r=median_mfe_r=0.0
+        best_trade=float(pnl_arr.max()) if n_tr else 0.0
+        worst_trade=float(pnl_arr.min()) if n_tr else 0.0
+        avg_size=float(ta["size"].mean()) if n_tr else 0.0
+        pnl_std=float(np.std(pnl_arr, ddof=1)) if n_tr>1 else 0.0
+        neg=pnl_arr[pnl_arr<0]
+        downside_deviation=float(np.std(neg, ddof=1)) if neg.size>1 else 0.0
         equity_curve_len=len(self.equity)
 
         # Streaks
-        signs=[1 if x>0 else -1 for x in pnl]
-        streaks=[]; cur=0; prev=None
-        for s in signs:
-            if prev is None or s==prev: cur+=1
-            else: streaks.append(prev*cur); cur=1
-            prev=s
-        if prev is not None: streaks.append(prev*cur)
-        max_win_streak=max([x for x in streaks if x>0], default=0)
-        max_loss_streak=max([abs(x) for x in streaks if x<0], default=0)
+        # Run-Length-Encoding der Vorzeichen (Gewinn=+1, sonst -1): Run-Grenzen per Vergleich mit dem Vorgänger
+        signs=np.where(win_mask, 1, -1).astype(np.int8)
+        bounds=np.flatnonzero(np.concatenate(([True], signs[1:]!=signs[:-1], [True]))) if signs.size else np.zeros(1, np.int64)
+        run_len=np.diff(bounds); run_sign=signs[bounds[:-1]]
+        max_win_streak=int(run_len[run_sign>0].max(initial=0))
+        max_loss_streak=int(run_len[run_sign<0].max(initial=0))
 
         # Monthly (wie gehabt) + Heatmap
-        eq["month"]=eq["date"].dt.to_period("M")
-        monthly=(eq.groupby("month")["ret"].apply(lambda s:(1+s).prod()-1)).reset_index()
+        # Gruppierung auf int64-Monatsschlüssel (Monate seit 1970 = Period[M]-Ordinal) statt Period-Objekten je Bar
+        ym=eq_dates.astype("datetime64[M]").astype(np.int64)
+        # Cython-Reduktion (groupby.prod) statt Lambda je Monat; prod statt log1p/expm1, damit auch Renditen <= -100% exakt bleiben
+        g=(pd.Series(1.0+rets).groupby(ym, sort=True).prod()-1.0)
+        keys=g.index.to_numpy(np.int64)
+        monthly=pd.DataFrame({"month": pd.PeriodIndex(keys.astype("datetime64[M]"), freq="M"), "ret": g.to_numpy()})
         monthly["ret_pct"]=monthly["ret"]*100.0
-        monthly["year"]=monthly["month"].dt.year
-        monthly["m"]=monthly["month"].dt.month
-        heatmap = monthly.pivot_table(index="year", columns="m", values="ret_pct", aggfunc="first").sort_index()
+        monthly["year"]=keys//12+1970
+        monthly["m"]=keys%12+1
+        heatmap = monthly.pivot(index="year", columns="m", values="ret_pct").sort_index()  # (Jahr, Monat) ist nach dem groupby eindeutig
 
         # Trades/Jahr
-        trades_per_year = len(self.trades)/years if years>0 else 0.0
+        trades_per_year = n_tr/years if years>0 else 0.0
 
         out=dict(
-            total_return=total_return,cagr=cagr,trades=len(self.trades),hit=hit,avg_win=avg_win,avg_loss=avg_loss,
+            total_return=total_return,cagr=cagr,trades=n_tr,hit=hit,avg_win=avg_win,avg_loss=avg_loss,
             payoff=payoff,profit_factor=profit_factor,expectancy=expectancy,
             vol=vol_pct,sharpe=sharpe,sortino=sortino,max_dd=max_dd,calmar=(cagr/abs(max_dd) if max_dd<0 else 0.0),
-            pnl=pnl,returns_r=[t.rr for t in self.trades],equity=self.equity,trades_list=self.trades,
+            pnl=pnl,returns_r=rr.tolist(),equity=self.equity,trades_list=self.trades,
             type_stats=type_stats,dir_stats=dir_stats,durations=durations,mae=mae,mfe=mfe,monthly=monthly,
             periods_per_year=periods_per_year, rf_per_period=rf_per_period, ulcer_index=ulcer_index, upi=upi,
             gain_to_pain=gain_to_pain, trades_per_year=trades_per_year, exposure=exposure,
-            max_win_streak=max_win_streak, max_loss_streak=max_loss_streak, avg_R=float(np.mean([t.rr for t in self.trades])) if self.trades else 0.0,
-            median_hold_hours=float(np.median(durations)) if durations else 0.0, avg_hold_hours=float(np.mean(durations)) if durations else 0.0,
+            max_win_streak=max_win_streak, max_loss_streak=max_loss_streak, avg_R=expectancy_R,
+            median_hold_hours=float(np.median(hold_h)) if n_tr else 0.0, avg_hold_hours=float(hold_h.mean()) if n_tr else 0.0,
             heatmap=heatmap
         )
 
@@ -1322,18 +1719,21 @@ class Backtester:
 
         # ML‑Diagnostik
         if self.model is not None and self.sim_trades:
-            times=sorted([t.time_in for t in self.sim_trades]); split_idx=max(1,int(len(times)*CFG["TRAIN_FRAC"])); split_time=times[split_idx-1]
+            split_time=self._train_split()
             te=[t for t in self.sim_trades if t.time_in>split_time]
             if len(te)>=5:
+                from sklearn.calibration import calibration_curve
+                from sklearn.inspection import permutation_importance
+                from sklearn.metrics import roc_curve, auc, precision_recall_curve, average_precision_score
                 Xte,_=self._XY(te); yte=np.array([t.label for t in te],dtype=int)
-                prob_te=self.model.predict_proba(Xte)[:,1]
+                prob_te=self._predict_proba(Xte)
                 fpr,tpr,_=roc_curve(yte,prob_te); rc,pr,_=precision_recall_curve(yte,prob_te)
                 out["ml_auc"]=auc(fpr,tpr); out["ml_ap"]=average_precision_score(yte,prob_te)
                 pt,pp=calibration_curve(yte,prob_te, n_bins=min(10,len(yte)))
                 out["ml_calib"]=(pt,pp); out["ml_roc"]=(fpr,tpr); out["ml_pr"]=(rc,pr)
                 try:
                     pi=permutation_importance(self.model,Xte,yte,n_repeats=10,random_state=42)
-                    out["ml_perm_importance"]=(list(Xte.columns), list(pi.importances_mean))
+                    out["ml_perm_importance"]=(list(FEATURE_COLUMNS), list(pi.importances_mean))
                 except Exception:
                     pass
                 out["ml_threshold"]=self.threshold
@@ -1342,28 +1742,96 @@ class Backtester:
 # --------------------------------------------------------------------------------------
 # Reporting
 # --------------------------------------------------------------------------------------
+@njit(cache=True)
+def _waves_ok(i0:np.ndarray, i1:np.ndarray, close:np.ndarray, date_ns:np.ndarray, min_pct:float, min_dur_days:float)->np.ndarray:
+    # Struktur-Chart-Filter je Welle (Start-/End-Bar i0/i1, i0<0 = zu wenige Punkte): Mindest-% Bewegung UND Mindestdauer
+    n=close.shape[0]; out=np.zeros(i0.shape[0], np.bool_)
+    for k in range(i0.shape[0]):
+        a=i0[k]; b=i1[k]
+        if a<0 or a>=n or b>=n: continue
+        p0=close[a]; p1=close[b]
+        if p0==0 or np.isnan(p0) or np.isnan(p1): continue
+        dur=(date_ns[b]-date_ns[a])//86400000000000  # ganze Tage (abgerundet wie Timedelta.days)
+        out[k]=abs(p1-p0)/p0>=min_pct and dur>=min_dur_days
+    return out
+
+def _fmt_pf(v)->str:
+    return f"{v:.2f}" if np.isfinite(v) else 'inf'
+
+# Kennzahlen-Seite im PDF: (Label, metrics-Key, Format-String oder Callable, Default; None = Key muss vorhanden sein)
+KPI_TABLE = (
+    ("Total Return", "total_return", "{:.2f}%", None),
+    ("CAGR", "cagr", "{:.2f}%", None),
+    ("Winrate", "hit", "{:.2f}%", None),
+    ("Profit Factor", "profit_factor", "{:.2f}", None),
+    ("Expectancy", "expectancy", "${:.2f}", None),
+    ("Sharpe Ratio", "sharpe", "{:.2f}", None),
+    ("Sortino Ratio", "sortino", "{:.2f}", None),
+    ("UPI (Ulcer Perf. Index)", "upi", "{:.2f}", None),
+    ("Ulcer Index", "ulcer_index", "{:.2f}", float('nan')),
+    ("Gain-to-Pain", "gain_to_pain", "{:.2f}", None),
+    ("Max Drawdown", "max_dd", "{:.2f}%", None),
+    ("Calmar Ratio", "calmar", "{:.2f}", None),
+    ("Volatility (ann.)", "vol", "{:.2f}%", None),
+    ("Skewness (P&L)", "skewness", "{:.2f}", float('nan')),
+    ("Kurtosis (P&L)", "kurtosis", "{:.2f}", float('nan')),
+    ("Payoff Ratio", "payoff", "{:.2f}", float('nan')),
+    ("Avg. Win", "avg_win", "${:.2f}", float('nan')),
+    ("Avg. Loss", "avg_loss", "${:.2f}", float('nan')),
+    ("Trades", "trades", "{}", None),
+    ("Avg. Trade Duration (h)", "avg_hold_hours", "{:.2f}", None),
+    ("Median Trade Duration (h)", "median_hold_hours", "{:.2f}", None),
+    ("Avg. R-Multiple", "avg_R", "{:.2f}", None),
+    ("Exposure", "exposure", "{:.2%}", None),
+    ("Trades/Jahr", "trades_per_year", "{:.2f}", None),
+    ("Max Win Streak", "max_win_streak", "{}", None),
+    ("Max Loss Streak", "max_loss_streak", "{}", None),
+    ("Winrate Long", "winrate_long", "{:.2f}%", 0),
+    ("Winrate Short", "winrate_short", "{:.2f}%", 0),
+    ("PF Long", "pf_long", _fmt_pf, 0),
+    ("PF Short", "pf_short", _fmt_pf, 0),
+    ("Expectancy (R)", "expectancy_R", "{:.2f}", 0),
+    ("Avg R Win", "avg_R_win", "{:.2f}", 0),
+    ("Avg R Loss", "avg_R_loss", lambda v: f"{-v:.2f}", 0),
+    ("Kelly %", "kelly_pct", "{:.2f}%", 0),
+    ("Avg MAE (R)", "avg_mae_r", "{:.2f}", 0),
+    ("Avg MFE (R)", "avg_mfe_r", "{:.2f}", 0),
+    ("Median MAE (R)", "median_mae_r", "{:.2f}", 0),
+    ("Median MFE (R)", "median_mfe_r", "{:.2f}", 0),
+    ("Best Trade $", "best_trade", "{:.2f}", 0),
+    ("Worst Trade $", "worst_trade", "{:.2f}", 0),
+    ("Avg Size", "avg_size", "{:.1f}", 0),
+    ("PnL Std", "pnl_std", "{:.2f}", 0),
+    ("Downside Dev", "downside_deviation", "{:.2f}", 0),
+    ("Equity Points", "equity_curve_len", "{}", 0),
+)
+# einmal beim Laden spezialisiert: Format-Strings -> gebundenes str.format, damit je Zeile nur noch ein Aufruf bleibt
+_KPI_ROWS = tuple((label, key, fmt if callable(fmt) else fmt.format, default) for label, key, fmt, default in KPI_TABLE)
+
 def plot_report(daily:pd.DataFrame, h1:pd.DataFrame, bt:Backtester, metrics:Dict, pdf_path:str):
+    plt = _setup_plot_style()
+    import matplotlib.dates as mdates
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.colors import TwoSlopeNorm
 
     with PdfPages(pdf_path) as pdf:
         # Seite 1: Equity & Drawdown (verbesserte Skalierung)
         fig, axes = plt.subplots(2, 1, figsize=(14, 9), constrained_layout=True)
         eq = metrics["equity"]
-        dates = [pd.Timestamp(e["date"]) for e in eq]
-        caps = [e["capital"] for e in eq]
-        dds = [e["dd"] for e in eq]
+        dates, caps, dds = eq.date, eq.capital, eq.dd
         # Equity Curve
         axes[0].plot(dates, caps, color="#FF5252", lw=1.6, label=f'Final: ${int(caps[-1]):,}')
-        axes[0].axhline(CFG["START_CAPITAL"], color="gray", ls="--", label="Initial")
+        axes[0].axhline(CFG.START_CAPITAL, color="gray", ls="--", label="Initial")
         axes[0].legend()
         axes[0].grid(True, alpha=.3)
         axes[0].set_title("Equity Curve")
         # Verbesserte Y-Skalierung & optional log
-        y_min, y_max = float(min(caps)), float(max(caps))
+        y_min, y_max = float(caps.min()), float(caps.max())
         y_range = max(1.0, y_max - y_min)
         margin = 0.04 * y_range
         axes[0].set_ylim(y_min - margin, y_max + margin)
         ratio = (y_max - y_min) / max(y_min, 1.0)
-        if ratio > CFG.get("EQUITY_LOG_THRESHOLD", 5.0):
+        if ratio > CFG.EQUITY_LOG_THRESHOLD:
             axes[0].set_yscale('log')
         # Kompaktere Zahlenformatierung
         import matplotlib.ticker as mticker
@@ -1379,7 +1847,7 @@ def plot_report(daily:pd.DataFrame, h1:pd.DataFrame, bt:Backtester, metrics:Dict
         axes[1].set_title("Drawdown")
         axes[1].grid(True, alpha=.3)
         # Improved y-scaling for drawdown
-        dd_min, dd_max = min(dds), max(dds)
+        dd_min, dd_max = float(dds.min()), float(dds.max())
         axes[1].set_ylim(dd_min - 0.05 * abs(dd_min), 5)
         # X-axis formatting
         for ax in axes:
@@ -1390,73 +1858,24 @@ def plot_report(daily:pd.DataFrame, h1:pd.DataFrame, bt:Backtester, metrics:Dict
         plt.close(fig)
 
         # Seite 2: Ausführliche Kennzahlen-Tabelle (mit neuen KPIs)
-        import matplotlib.table as tbl
-        from scipy.stats import skew, kurtosis
         fig, ax = plt.subplots(figsize=(15, 10))
         ax.axis('off')
         # Calculate additional KPIs
-        pnl = metrics.get('pnl', [])
-        returns = metrics.get('returns_r', [])
-        skewness = skew(pnl) if len(pnl) > 2 else float('nan')
-        kurt = kurtosis(pnl) if len(pnl) > 2 else float('nan')
-        ulcer = metrics.get('ulcer_index', float('nan'))
-        payoff = metrics.get('payoff', float('nan'))
-        avg_win = metrics.get('avg_win', float('nan'))
-        avg_loss = metrics.get('avg_loss', float('nan'))
-        # Add more KPIs as needed
-        stats = [
-            ["Total Return", f"{metrics['total_return']:.2f}%"],
-            ["CAGR", f"{metrics['cagr']:.2f}%"],
-            ["Winrate", f"{metrics['hit']:.2f}%"],
-            ["Profit Factor", f"{metrics['profit_factor']:.2f}"],
-            ["Expectancy", f"${metrics['expectancy']:.2f}"],
-            ["Sharpe Ratio", f"{metrics['sharpe']:.2f}"],
-            ["Sortino Ratio", f"{metrics['sortino']:.2f}"],
-            ["UPI (Ulcer Perf. Index)", f"{metrics['upi']:.2f}"],
-            ["Ulcer Index", f"{ulcer:.2f}"],
-            ["Gain-to-Pain", f"{metrics['gain_to_pain']:.2f}"],
-            ["Max Drawdown", f"{metrics['max_dd']:.2f}%"],
-            ["Calmar Ratio", f"{metrics['calmar']:.2f}"],
-            ["Volatility (ann.)", f"{metrics['vol']:.2f}%"],
-            ["Skewness (P&L)", f"{skewness:.2f}"],
-            ["Kurtosis (P&L)", f"{kurt:.2f}"],
-            ["Payoff Ratio", f"{payoff:.2f}"],
-            ["Avg. Win", f"${avg_win:.2f}"],
-            ["Avg. Loss", f"${avg_loss:.2f}"],
-            ["Trades", f"{metrics['trades']}"],
-            ["Avg. Trade Duration (h)", f"{metrics['avg_hold_hours']:.2f}"],
-            ["Median Trade Duration (h)", f"{metrics['median_hold_hours']:.2f}"],
-            ["Avg. R-Multiple", f"{metrics['avg_R']:.2f}"],
-            ["Exposure", f"{metrics['exposure']:.2%}"],
-            ["Trades/Jahr", f"{metrics['trades_per_year']:.2f}"],
-            ["Max Win Streak", f"{metrics['max_win_streak']}"],
-            ["Max Loss Streak", f"{metrics['max_loss_streak']}"],
-            ["Winrate Long", f"{metrics.get('winrate_long',0):.2f}%"],
-            ["Winrate Short", f"{metrics.get('winrate_short',0):.2f}%"],
-            ["PF Long", f"{metrics.get('pf_long',0):.2f}" if np.isfinite(metrics.get('pf_long',0)) else 'inf'],
-            ["PF Short", f"{metrics.get('pf_short',0):.2f}" if np.isfinite(metrics.get('pf_short',0)) else 'inf'],
-            ["Expectancy (R)", f"{metrics.get('expectancy_R',0):.2f}"],
-            ["Avg R Win", f"{metrics.get('avg_R_win',0):.2f}"],
-            ["Avg R Loss", f"{-metrics.get('avg_R_loss',0):.2f}"],
-            ["Kelly %", f"{metrics.get('kelly_pct',0):.2f}%"],
-            ["Avg MAE (R)", f"{metrics.get('avg_mae_r',0):.2f}"],
-            ["Avg MFE (R)", f"{metrics.get('avg_mfe_r',0):.2f}"],
-            ["Median MAE (R)", f"{metrics.get('median_mae_r',0):.2f}"],
-            ["Median MFE (R)", f"{metrics.get('median_mfe_r',0):.2f}"],
-            ["Best Trade $", f"{metrics.get('best_trade',0):.2f}"],
-            ["Worst Trade $", f"{metrics.get('worst_trade',0):.2f}"],
-            ["Avg Size", f"{metrics.get('avg_size',0):.1f}"],
-            ["PnL Std", f"{metrics.get('pnl_std',0):.2f}"],
-            ["Downside Dev", f"{metrics.get('downside_deviation',0):.2f}"],
-            ["Equity Points", f"{metrics.get('equity_curve_len',0)}"],
-        ]
-        table = tbl.Table(ax, bbox=[0, 0, 1, 1])
-        for i, (k, v) in enumerate(stats):
-            table.add_cell(i, 0, 0.4, 0.04, text=k, loc='left', facecolor='#f5f5f5')
-            table.add_cell(i, 1, 0.6, 0.04, text=v, loc='left')
+        pnl = np.asarray(metrics.get('pnl', []), dtype=float)
+        # Schiefe/Wölbung als zentrale Momente (wie scipy-Default: biased, Fisher) - ohne scipy-Import
+        skewness = kurt = float('nan')
+        if pnl.size > 2:
+            dev = pnl - pnl.mean(); dev2 = dev*dev; m2 = dev2.mean()
+            if m2 > (np.finfo(float).eps*abs(pnl.mean()))**2:  # konstante P&L -> nan (wie scipy)
+                skewness = float((dev2*dev).mean()/m2**1.5); kurt = float((dev2*dev2).mean()/m2**2 - 3.0)
+        # Zeilen aus der modulweiten KPI_TABLE-Spezifikation; eine ax.table-Erzeugung statt add_cell je Zelle
+        vals = dict(metrics, skewness=skewness, kurtosis=kurt)
+        rows = []
+        for label, key, fmt, default in _KPI_ROWS:
+            rows.append([label, fmt(vals[key] if default is None else vals.get(key, default))])
+        table = ax.table(cellText=rows, cellColours=[['#f5f5f5', 'w']]*len(rows), colWidths=[0.4, 0.6], cellLoc='left', bbox=[0, 0, 1, 1])
         table.auto_set_font_size(False)
         table.set_fontsize(12)
-        ax.add_table(table)
         ax.set_title("Kennzahlen (ausführlich, erweitert)", fontsize=16)
         pdf.savefig(fig)
         plt.close(fig)
@@ -1481,51 +1900,49 @@ def plot_report(daily:pd.DataFrame, h1:pd.DataFrame, bt:Backtester, metrics:Dict
         ax.plot(daily["date"], daily["close"], color="#1e88e5", lw=1.0, alpha=0.6, label="Price (Daily)")
 
         # Filter: Mindest-% Bewegung UND Mindestdauer
-        min_pct = CFG.get("WAVE_MIN_PCT", 0.08)
-        min_dur = CFG.get("WAVE_MIN_DURATION_DAYS", 40)
-        def _wave_ok(points):
-            if len(points)<2: return False
-            i0, i1 = points[0].idx, points[-1].idx
-            if i0>=len(daily) or i1>=len(daily): return False
-            p0, p1 = daily.iloc[i0]["close"], daily.iloc[i1]["close"]
-            if p0==0 or pd.isna(p0) or pd.isna(p1): return False
-            move = abs(p1-p0)/p0
-            dur = (daily.iloc[i1]["date"] - daily.iloc[i0]["date"]).days
-            return move >= min_pct and dur >= min_dur
-
-        prim_imp_filtered = [w for w in bt.prim_imp if _wave_ok(w.points)] if getattr(bt,'prim_imp',None) else []
-        prim_abc_filtered = [w for w in bt.prim_abc if _wave_ok(w.points)] if getattr(bt,'prim_abc',None) else []
+        min_pct = CFG.WAVE_MIN_PCT
+        min_dur = CFG.WAVE_MIN_DURATION_DAYS
+        d_close = daily["close"].to_numpy(np.float64)
+        d_ns = daily["date"].to_numpy("datetime64[ns]").astype(np.int64)
+        def _filter_waves(waves):
+            if not waves: return []
+            i0=np.array([w.pivots.idx[w.start] if w.end-w.start>=2 else -1 for w in waves], dtype=np.int64)
+            i1=np.array([w.pivots.idx[w.end-1] for w in waves], dtype=np.int64)
+            ok=_waves_ok(i0, i1, d_close, d_ns, float(min_pct), float(min_dur))
+            return [w for w,k in zip(waves, ok.tolist()) if k]
+
+        prim_imp_filtered = _filter_waves(getattr(bt,'prim_imp',None))
+        prim_abc_filtered = _filter_waves(getattr(bt,'prim_abc',None))
 
         # Plot-Funktion mit größeren Label-Abständen
         def _plot_degree(df, imps, abcs, color_imp, color_abc, lw, gap_days):
-            label_gap = pd.Timedelta(days=CFG.get("WAVE_LABEL_GAP_DAYS", 60))
-            last_label_time=None
+            label_gap = pd.Timedelta(days=CFG.WAVE_LABEL_GAP_DAYS).to_timedelta64()
+            # datetime64-Block einmal: Linien-x je Welle per Fancy-Index, Label-Zeiten ohne Timestamp-Boxing je Punkt
+            last_label_time=None; dates=df["date"].to_numpy("datetime64[ns]")
             if imps:
                 for imp in imps:
-                    xs=[df.iloc[p.idx]["date"] for p in imp.points]; ys=[p.price for p in imp.points]
+                    xs=dates[[p.idx for p in imp.points]]; ys=[p.price for p in imp.points]
                     ax.plot(xs,ys,color=color_imp,lw=lw,alpha=0.95)
                     # Nur Start, Mitte (3), Ende labeln
                     key_indices=[0,2,len(imp.points)-1]
                     names=["1","3","(end)"]
                     for ki,name in zip(key_indices,names):
-                        t=df.iloc[imp.points[ki].idx]["date"]; y=imp.points[ki].price
+                        t=dates[imp.points[ki].idx]; y=imp.points[ki].price
                         if (last_label_time is None) or (t-last_label_time)>=label_gap:
                             ax.text(t,y,name,fontsize=10,bbox=dict(boxstyle="round,pad=0.2",fc="white",ec=color_imp,alpha=0.85),color=color_imp)
                             last_label_time=t
             if abcs:
                 for pat in abcs:
-                    xs=[df.iloc[p.idx]["date"] for p in pat.points]; ys=[p.price for p in pat.points]
+                    xs=dates[[p.idx for p in pat.points]]; ys=[p.price for p in pat.points]
                     ax.plot(xs,ys,color=color_abc,lw=lw,alpha=0.95,ls='--')
                     key_pts=[(0,'A'),(1,'B'),(-1,'C')]
-                    for idx_name in key_pts:
-                        idx,name=idx_name
-                        real_idx = pat.points[idx].idx if idx>=0 else pat.points[idx].idx
-                        t=df.iloc[real_idx]["date"]; y=pat.points[idx].price
+                    for idx,name in key_pts:
+                        t=dates[pat.points[idx].idx]; y=pat.points[idx].price
                         if (last_label_time is None) or (t-last_label_time)>=label_gap:
                             ax.text(t,y,name,fontsize=10,bbox=dict(boxstyle="round,pad=0.2",fc="white",ec=color_abc,alpha=0.85),color=color_abc)
                             last_label_time=t
 
-        _plot_degree(daily, prim_imp_filtered, prim_abc_filtered, "#8E24AA", "#FB8C00", 1.8, CFG.get("WAVE_LABEL_GAP_DAYS",60))
+        _plot_degree(daily, prim_imp_filtered, prim_abc_filtered, "#8E24AA", "#FB8C00", 1.8, CFG.WAVE_LABEL_GAP_DAYS)
 
         ax.set_title("Elliott Structure – Primary (gefiltert)")
         ax.legend(loc="upper left"); ax.grid(True,alpha=.3)
@@ -1540,19 +1957,18 @@ def plot_report(daily:pd.DataFrame, h1:pd.DataFrame, bt:Backtester, metrics:Dict
             months = [1,2,3,4,5,6,7,8,9,10,11,12]
             # Reindex, um alle Monate zu zeigen
             hm_plot = hm.reindex(columns=months)
-            norm = TwoSlopeNorm(vmin=min(-20, np.nanmin(hm_plot.values) if np.isfinite(np.nanmin(hm_plot.values)) else -10),
-                                vcenter=0, vmax=max(20, np.nanmax(hm_plot.values) if np.isfinite(np.nanmax(hm_plot.values)) else 10))
-            im=ax.imshow(hm_plot.values, aspect="auto", cmap="RdYlGn", norm=norm)
+            hm_vals = hm_plot.to_numpy(dtype=float)
+            lo, hi = np.nanmin(hm_vals), np.nanmax(hm_vals)
+            norm = TwoSlopeNorm(vmin=min(-20, lo if np.isfinite(lo) else -10), vcenter=0, vmax=max(20, hi if np.isfinite(hi) else 10))
+            im=ax.imshow(hm_vals, aspect="auto", cmap="RdYlGn", norm=norm)
             # Ticks
             ax.set_yticks(range(len(hm_plot.index))); ax.set_yticklabels(hm_plot.index)
             ax.set_xticks(range(12)); ax.set_xticklabels(["Jan","Feb","Mär","Apr","Mai","Jun","Jul","Aug","Sep","Okt","Nov","Dez"], rotation=0)
             ax.set_title("Monatsrenditen Heatmap (%)")
-            # Zahlen annotieren
-            for i in range(hm_plot.shape[0]):
-                for j in range(hm_plot.shape[1]):
-                    val = hm_plot.values[i,j]
-                    if np.isfinite(val):
-                        ax.text(j,i,f"{val:+.1f}", ha="center", va="center", color="black", fontsize=9)
+            # Zahlen annotieren: nur belegte Zellen, Labels vorab per np.char.mod formatiert
+            fin = np.isfinite(hm_vals); ys, xs = np.nonzero(fin)
+            for x, y, lbl in zip(xs.tolist(), ys.tolist(), np.char.mod('%+.1f', hm_vals[fin]).tolist()):
+                ax.text(x, y, lbl, ha="center", va="center", color="black", fontsize=9)
             cbar=fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
             cbar.set_label("%")
             pdf.savefig(fig); plt.close(fig)
@@ -1644,7 +2060,7 @@ def main():
         base["REQUIRE_CONFIRM"] = False
     base["DEEP_CF"] = getattr(args, "deep_counterfactuals", False)
     base["FULL_GRID_CF"] = getattr(args, "full_grid_cf", False)
-    CFG = base  # global setzen
+    CFG = Config(**base)  # global setzen (unveränderlich)
 
     daily, h1, m30 = load_data()
     print("[DEBUG] daily columns nach Indikatoren:", daily.columns.tolist())
@@ -1652,7 +2068,7 @@ def main():
     print("[DEBUG] m30 columns nach Indikatoren:", m30.columns.tolist())
     # Abbruch falls keine Kern-Daten vorhanden
     if daily.empty or 'close' not in daily.columns or h1.empty or 'close' not in h1.columns:
-        print(f"[FEHLER] Keine verwertbaren Kursdaten für Symbol '{CFG['SYMBOL']}'.")
+        print(f"[FEHLER] Keine verwertbaren Kursdaten für Symbol '{CFG.SYMBOL}'.")
         print("Hinweis:")
         print("  1) Eigene CSV-Dateien anlegen (UTF-8) mit Header: date,open,high,low,close,volume")
         print("     Dateiformate akzeptiert: daily_SYMBOL.csv / h1_SYMBOL.csv / m30_SYMBOL.csv (oder daily.csv etc.)")
@@ -1687,14 +2103,14 @@ def main():
     print(f"Winrate: {metrics['hit']:.2f}% | PF: {metrics['profit_factor']:.2f} | Expectancy: ${metrics['expectancy']:.2f}")
     print(f"Vol (ann.): {metrics['vol']:.2f}% | Sharpe: {metrics['sharpe']:.2f} | Sortino: {metrics['sortino']:.2f} | UPI: {metrics['upi']:.2f} | GPR: {metrics['gain_to_pain']:.2f}")
 
-    out_csv = f"trades_perfect_{CFG['_PROFILE']}_{CFG['SYMBOL']}.csv"
+    out_csv = f"trades_perfect_{CFG._PROFILE}_{CFG.SYMBOL}.csv"
     pd.DataFrame([t.__dict__ for t in bt.trades]).to_csv(out_csv, index=False)
-    out_pdf = f"elliott_report_perfect_{CFG['_PROFILE']}_{CFG['SYMBOL']}.pdf"
+    out_pdf = f"elliott_report_perfect_{CFG._PROFILE}_{CFG.SYMBOL}.pdf"
     plot_report(daily, h1, bt, metrics, pdf_path=out_pdf)
     print(f"CSV: {out_csv} | PDF: {out_pdf}")
 
     # --- Counterfactuals / Varianten (laufen jetzt auch bei --full-grid-cf oder --deep-counterfactuals) ---
-    if getattr(args, 'counterfactuals', False) or CFG.get('FULL_GRID_CF') or CFG.get('DEEP_CF'):
+    if getattr(args, 'counterfactuals', False) or CFG.FULL_GRID_CF or CFG.DEEP_CF:
         try:
             print("\n--- Counterfactuals ---")
             # Helper
@@ -1703,55 +2119,62 @@ def main():
                 SimTrade besitzt per_share & risk_per_share; Trade nicht unbedingt.
                 Für Trade verwenden wir original pnl (keine Neuberechnung) um das echte Ergebnis zu sezieren.
                 """
-                if not trades: return dict(total=0.0,cagr=0.0,trades=0,end_cap=CFG['START_CAPITAL'])
-                cap=CFG['START_CAPITAL']; highest=cap; taken=0
+                if not trades: return dict(total=0.0,cagr=0.0,trades=0,end_cap=CFG.START_CAPITAL)
+                cap=CFG.START_CAPITAL; highest=cap; taken=0
                 first_time=getattr(trades[0],'time_in', pd.Timestamp.utcnow())
                 last_time=getattr(trades[-1],'time_out', first_time)
-                for obj in trades:
-                    if long_only and getattr(obj,'direction','')!="LONG": continue
-                    if short_only and getattr(obj,'direction','')!="SHORT": continue
-                    # SimTrade Pfad
-                    if hasattr(obj,'per_share'):
-                        rps=getattr(obj,'risk_per_share', None)
-                        if rps is None or rps<=0:
-                            try:
-                                rps=abs(obj.entry-obj.stop)
-                            except Exception:
-                                rps=1.0
-                        size=(CFG['RISK_PER_TRADE']*risk_mult*cap)/max(rps,1e-9)
-                        size=int(max(1,size))
-                        cap+=obj.per_share*size
-                        highest=max(highest,cap)
-                        taken+=1
-                        last_time=getattr(obj,'time_out', last_time)
-                    else:  # Trade Objekt
-                        cap+=getattr(obj,'pnl',0.0)
-                        highest=max(highest,cap)
-                        taken+=1
-                        first_time=min(first_time, getattr(obj,'time_in', first_time))
-                        last_time=max(last_time, getattr(obj,'time_out', last_time))
-                start=CFG['START_CAPITAL']; end=cap; total_ret=((end/start)-1)*100.0
+                if all(isinstance(obj, SimTrade) for obj in trades):
+                    # Fast-Path: nur SimTrades -> Spalten-Arrays + numba-Kernel für den Kapitalpfad
+                    sel=[obj for obj in trades if not ((long_only and obj.direction!="LONG") or (short_only and obj.direction!="SHORT"))]
+                    n=len(sel)
+                    ps=np.fromiter((obj.per_share for obj in sel), float, count=n)
+                    rps=np.fromiter((obj.risk_per_share for obj in sel), float, count=n)
+                    rps=np.where(rps<=0, np.fromiter((abs(obj.entry-obj.stop) for obj in sel), float, count=n), rps)
+                    taken=n
+                    if n: cap=_cf_compound(ps, rps, CFG.RISK_PER_TRADE*risk_mult, float(cap)); last_time=sel[-1].time_out
+                else:
+                    for obj in trades:
+                        if long_only and getattr(obj,'direction','')!="LONG": continue
+                        if short_only and getattr(obj,'direction','')!="SHORT": continue
+                        # SimTrade Pfad
+                        if hasattr(obj,'per_share'):
+                            rps=getattr(obj,'risk_per_share', None)
+                            if rps is None or rps<=0:
+                                try:
+                                    rps=abs(obj.entry-obj.stop)
+                                except Exception:
+                                    rps=1.0
+                            size=(CFG.RISK_PER_TRADE*risk_mult*cap)/max(rps,1e-9)
+                            size=int(max(1,size))
+                            cap+=obj.per_share*size
+                            highest=max(highest,cap)
+                            taken+=1
+                            last_time=getattr(obj,'time_out', last_time)
+                        else:  # Trade Objekt
+                            cap+=getattr(obj,'pnl',0.0)
+                            highest=max(highest,cap)
+                            taken+=1
+                            first_time=min(first_time, getattr(obj,'time_in', first_time))
+                            last_time=max(last_time, getattr(obj,'time_out', last_time))
+                start=CFG.START_CAPITAL; end=cap; total_ret=((end/start)-1)*100.0
                 years=(last_time - first_time).days/365.0 if (last_time>first_time) else 1.0
                 cagr=((end/start)**(1/years)-1)*100.0 if years>0 else total_ret
                 return dict(total=total_ret,cagr=cagr,trades=taken,end_cap=end)
 
-            sims_sorted=sorted(bt.sim_trades, key=lambda t:t.time_in)
+            sims_sorted, _, probs = bt.sim_probs()
             # Szenarien definieren
             scenarios=[]
             if bt.sim_trades:
-                if CFG.get('USE_ML', False):
+                if CFG.USE_ML:
                     scenarios.append(("ohne_ml", sims_sorted))
                 # Wenn Modell da: verschiedene Threshold-Quantile
                 if bt.model is not None:
-                    Xall,_=bt._XY(sims_sorted); probs=bt.model.predict_proba(Xall)[:,1]
-                    base=list(zip(sims_sorted, probs))
+                    # Szenarien als Masken auf demselben (gecachten) Prob-Array
                     for q,name in [(0.20,'top80'),(0.40,'top60'),(0.10,'top90')]:
                         thr=np.quantile(probs,q)
-                        subset=[t for t,p in base if p>=thr]
-                        scenarios.append((f"thr_{name}", subset))
+                        scenarios.append((f"thr_{name}", [sims_sorted[i] for i in np.flatnonzero(probs>=thr).tolist()]))
                     # Fixes Threshold 0.5
-                    subset=[t for t,p in base if p>=0.5]
-                    scenarios.append(("thr_fixed_0_5", subset))
+                    scenarios.append(("thr_fixed_0_5", [sims_sorted[i] for i in np.flatnonzero(probs>=0.5).tolist()]))
                     # Long-only / Short-only auf Basis original finaler Trades (mit Modellfilter)
                     final_trades=[tr for tr in bt.trades]
                     scenarios.append(("final_long_only", [t for t in final_trades if t.direction=="LONG"]))
@@ -1776,14 +2199,14 @@ def main():
                 print(f"{name}: Return {r['total']:.2f}% | CAGR {r['cagr']:.2f}% | Trades {r['trades']} | EndCap {r['end_cap']:.2f}")
             # Optional CSV Export
             if results:
-                cf_path=f"counterfactuals_{CFG['_PROFILE']}_{CFG['SYMBOL']}.csv"
+                cf_path=f"counterfactuals_{CFG._PROFILE}_{CFG.SYMBOL}.csv"
                 pd.DataFrame([dict(scenario=k, **v) for k,v in results]).to_csv(cf_path, index=False)
                 print(f"Counterfactual CSV: {cf_path}")
 
             # Deep Variants: kombinierte Filter-Toggles & Risiko-Sweeps
-            if CFG.get('DEEP_CF', False) and bt.sim_trades:
+            if CFG.DEEP_CF and bt.sim_trades:
                 print("\n--- Deep Counterfactuals (Filter Toggles) ---")
-                base_trades=sorted(bt.sim_trades, key=lambda t:t.time_in)
+                base_trades=sims_sorted
                 # Konfigurationen: (name, overrides dict)
                 variants=[
                     ("all_filters_off", dict(USE_EMA_TREND=False, USE_DAILY_EMA=False, USE_ADX=False, REQUIRE_CONFIRM=False)),
@@ -1803,12 +2226,12 @@ def main():
                 for name,r in deep_rows:
                     print(f"{name}: Return {r['total']:.2f}% | CAGR {r['cagr']:.2f}% | Trades {r['trades']} (approx)")
                 if deep_rows:
-                    deep_path=f"counterfactuals_deep_{CFG['_PROFILE']}_{CFG['SYMBOL']}.csv"
+                    deep_path=f"counterfactuals_deep_{CFG._PROFILE}_{CFG.SYMBOL}.csv"
                     pd.DataFrame([dict(scenario=k, **v) for k,v in deep_rows]).to_csv(deep_path, index=False)
                     print(f"Deep Counterfactual CSV: {deep_path}")
 
             # Vollständige Grid-Re-Simulation (teuer): verschiedene Filterkombinationen + ML an/aus + Risiko Faktoren
-            if CFG.get('FULL_GRID_CF', False):
+            if CFG.FULL_GRID_CF:
                 print("\n--- Full Grid Re-Simulation (kann dauern) ---")
                 import itertools, time
                 grid_results=[]
@@ -1824,13 +2247,11 @@ def main():
                 print(f"Varianten: {len(combos)} Kombinationen")
                 for (use_ml, ema_tr, daily_ema, adx_on, confirm_on, rmult) in combos:
                     # Neue Kopie der Konfiguration
-                    cfg_copy=CFG.copy()
-                    cfg_copy.update(dict(USE_ML=use_ml, USE_EMA_TREND=ema_tr, USE_DAILY_EMA=daily_ema, USE_ADX=adx_on, REQUIRE_CONFIRM=confirm_on))
                     # Risiko Faktor anwenden
-                    base_rpt=CFG.get('RISK_PER_TRADE',0.01)
-                    cfg_copy['RISK_PER_TRADE']=base_rpt*rmult
+                    base_rpt=CFG.RISK_PER_TRADE
+                    cfg_copy=replace(CFG, USE_ML=use_ml, USE_EMA_TREND=ema_tr, USE_DAILY_EMA=daily_ema, USE_ADX=adx_on, REQUIRE_CONFIRM=confirm_on, RISK_PER_TRADE=base_rpt*rmult)
                     # Re-Run Backtester frisch (nutzt globale CFG -> temporär überschreiben)
-                    old_cfg=CFG.copy()
+                    old_cfg=CFG
                     try:
                         globals()['CFG']=cfg_copy
                         bt2=Backtester(daily.copy(), h1.copy(), m30.copy())
@@ -1847,7 +2268,7 @@ def main():
                     finally:
                         globals()['CFG']=old_cfg
                 if grid_results:
-                    grid_path=f"counterfactuals_fullgrid_{CFG['_PROFILE']}_{CFG['SYMBOL']}.csv"
+                    grid_path=f"counterfactuals_fullgrid_{CFG._PROFILE}_{CFG.SYMBOL}.csv"
                     pd.DataFrame(grid_results).to_csv(grid_path, index=False)
                     print(f"Full Grid CSV: {grid_path} | Dauer {(time.time()-start_time):.1f}s")
         except Exception as e:
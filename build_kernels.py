@@ -0,0 +1,33 @@
+"""
+Ahead-of-time build of the trade executor numba kernels
+Produces the native trade_kernels module so the live process skips JIT compilation at startup
+
+Usage: python build_kernels.py   (requires numba; rerun after changing executor_kernels.py -
+       the executor ignores a build whose kernel_version() no longer matches)
+"""
+
+import warnings
+
+with warnings.catch_warnings():
+    # numba.pycc is pending deprecation; only this build script imports it
+    warnings.simplefilter('ignore')
+    from numba.pycc import CC
+
+import executor_kernels as K
+
+_VERSION = K.KERNEL_VERSION
+
+cc = CC('trade_kernels')
+cc.verbose = True
+
+# Kernel bodies live in executor_kernels.py - the same functions trade_executor.py JIT-compiles
+for _name, _sig in K.SIGNATURES.items():
+    cc.export(_name, _sig)(getattr(K, _name))
+
+@cc.export('kernel_version', 'i8()')
+def kernel_version():
+    """KERNEL_VERSION of the sources this module was built from"""
+    return _VERSION
+
+if __name__ == "__main__":
+    cc.compile()
@@ -232,6 +232,9 @@ class ElliottWaveTradingEngine:
                 self.signal_generator.update_active_positions(active_symbols)
                 self.logger.info(f"📊 Active positions: {sorted(list(active_symbols)) if active_symbols else 'None'}")
                 
+                # Warm broker symbol specs for the whole scan in one batch
+                self.trade_executor.price_validator.prefetch_symbols(self.config['symbols'])
+                
                 # Complete symbol scan
                 scan_start = time.time()
                 self.logger.info(f"🔄 Starting complete scan of all {len(self.config['symbols'])} symbols...")
@@ -460,7 +463,8 @@ class ElliottWaveTradingEngine:
     def _emergency_close_all_positions(self):
         """Emergency close all positions"""
         try:
-            positions = self.trade_executor.get_all_positions()
+            # Snapshot - close_position removes entries while we iterate
+            positions = self.trade_executor.snapshot_positions()
             for position_id in positions:
                 result = self.trade_executor.close_position(position_id, "Emergency stop")
                 if result.success:
@@ -539,6 +543,14 @@ def main():
     # Set configuration
     symbols_file = args.symbols_file
     
+    # Switch the console to UTF-8 once so emoji log lines are written as-is
+    # instead of going through the legacy code page on every emit
+    if hasattr(sys.stdout, 'reconfigure'):
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except (ValueError, OSError):
+            pass
+    
     print(f"🎯 Elliott Wave Trading Engine V2")
     print(f"📋 Using symbols file: {symbols_file}")
     if args.ml_threshold:
@@ -556,7 +568,7 @@ def main():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
             logging.FileHandler(f'elliott_wave_v2_{datetime.now().strftime("%Y%m%d")}.log', encoding='utf-8'),
-            logging.StreamHandler()
+            logging.StreamHandler(sys.stdout)
         ]
     )
     
@@ -0,0 +1,46 @@
+"""
+Executor Kernels - single source of the trade executor's numeric loops
+trade_executor.py JIT-compiles these functions, build_kernels.py exports the same
+functions ahead of time; KERNEL_VERSION lets the executor reject a stale AOT build
+"""
+
+import types
+import zlib
+
+import numpy as np
+
+try:
+    from numba import prange
+except ImportError:  # numba is optional - plain range then
+    prange = range
+
+def slippage_kernel(requested, executed, symbol_class, multipliers):
+    """Slippage in pips for arrays of fills"""
+    out = np.empty(requested.size)
+    for i in range(requested.size):
+        out[i] = (executed[i] - requested[i]) * multipliers[symbol_class[i]]
+    return out
+
+def update_profits(px, open_px, vol, sign, updated, out_profit):
+    """Recompute simplified profit (same formula as Position.update_current_price) for updated rows"""
+    for i in prange(px.size):
+        if updated[i]:
+            out_profit[i] = sign[i] * (px[i] - open_px[i]) * vol[i] * 100000
+
+# AOT export signatures (name -> numba signature string)
+SIGNATURES = {
+    'slippage_kernel': 'f8[:](f8[:], f8[:], i8[:], f8[:])',
+    'update_profits': 'void(f8[:], f8[:], f8[:], i1[:], b1[:], f8[:])',
+}
+
+def _code_digest(code: types.CodeType) -> bytes:
+    """Bytecode, names and constants of a function - available from .pyc-only or frozen deployments"""
+    parts = [code.co_code, repr(code.co_names).encode(), repr(code.co_varnames).encode()]
+    for const in code.co_consts:
+        parts.append(_code_digest(const) if isinstance(const, types.CodeType) else repr(const).encode())
+    return b'|'.join(parts)
+
+# Changes whenever a kernel body or signature changes (comments/line numbers do not count)
+KERNEL_VERSION = zlib.crc32(b''.join(
+    _code_digest(fn.__code__) + SIGNATURES[fn.__name__].encode() for fn in (slippage_kernel, update_profits)
+))
@@ -4,11 +4,55 @@ Real-time broker requirements validation for Elliott Wave trades
 Automatically queries MT5 for symbol specifications and validates orders
 """
 
-import MetaTrader5 as mt5
+import numpy as np
 import logging
-from typing import Dict, Tuple, Optional, NamedTuple
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, NamedTuple
 from dataclasses import dataclass
-from datetime import datetime
+
+@lru_cache(maxsize=None)
+def _get_mt5():
+    """Import MetaTrader5 on first use so SymbolInfo/ValidationResult users don't load the terminal DLL"""
+    import MetaTrader5 as mt5
+    return mt5
+
+# Known symbols resolved with a single dict lookup
+_SYMBOL_TYPE_MAP = {
+    'XAUUSD': 'METAL', 'XAGUSD': 'METAL', 'GOLD': 'METAL', 'SILVER': 'METAL',
+    'US30': 'INDEX', 'NAS100': 'INDEX', 'UK100': 'INDEX',
+    'DE40': 'INDEX', 'FR40': 'INDEX', 'AUS200': 'INDEX',
+    'EURUSD': 'MAJOR', 'GBPUSD': 'MAJOR', 'AUDUSD': 'MAJOR',
+    'USDCHF': 'MAJOR', 'USDCAD': 'MAJOR',
+    'USDJPY': 'JPY',  # JPY rule takes precedence over MAJOR
+}
+_STOCK_SUFFIXES = ('.OQ', '.N', '.P', '.DE')
+_MINOR_CCYS = frozenset({'EUR', 'GBP', 'AUD', 'USD', 'CHF', 'CAD'})
+
+# Conservative minimums per symbol type (in pips)
+_CONSERVATIVE_MINIMUMS = {
+    'STOCK': 2000, # Stocks need much larger distances (increased from 1000)
+    'JPY': 20,     # JPY pairs
+    'METAL': 50,   # Gold/Silver  
+    'INDEX': 100,  # Indices
+    'MAJOR': 15,   # Major pairs
+    'MINOR': 25,   # Minor pairs
+    'EXOTIC': 35   # Exotic pairs
+}
+
+@lru_cache(maxsize=256)
+def _classify_symbol(symbol: str) -> str:
+    """Determine symbol type (pure function of the symbol name, so cached)"""
+    symbol_type = _SYMBOL_TYPE_MAP.get(symbol)
+    if symbol_type:
+        return symbol_type
+    # Stock detection patterns
+    if any(suffix in symbol for suffix in _STOCK_SUFFIXES):
+        return 'STOCK'
+    if 'JPY' in symbol:
+        return 'JPY'
+    return 'MINOR' if any(ccy in symbol for ccy in _MINOR_CCYS) else 'EXOTIC'
 
 class SymbolInfo(NamedTuple):
     """Symbol specification from broker"""
@@ -21,6 +65,27 @@ class SymbolInfo(NamedTuple):
     min_volume: float
     max_volume: float
     volume_step: float
+    
+    # Precomputed per-symbol constants (filled in get_symbol_info)
+    pip_size: float
+    inv_pip_size: float
+    min_distance_pips: float
+    price_multiplier: float  # 10 ** digits
+
+def _calculate_pip_size(symbol: str) -> float:
+    """Price change of one pip for symbol (same rules as pip distance calculation)"""
+    if symbol.startswith('US') or symbol in ['NAS100', 'UK100', 'DE40']:
+        # Indices: 1 pip = 1 point (regardless of digits)
+        return 1.0
+    elif 'JPY' in symbol:
+        # JPY pairs: 1 pip = 0.01
+        return 0.01
+    elif symbol in ['XAUUSD', 'XAGUSD']:
+        # Metals: 1 pip = 0.1
+        return 0.1
+    else:
+        # Currency pairs (4 and 5 digit): 1 pip = 0.0001
+        return 0.0001
 
 @dataclass
 class ValidationResult:
@@ -39,20 +104,23 @@ class DynamicPriceValidator:
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self._symbol_cache: Dict[str, SymbolInfo] = {}
-        self._cache_timestamp: Dict[str, datetime] = {}
+        self._cache: Dict[str, Tuple[float, SymbolInfo]] = {}  # symbol -> (time.monotonic() of fetch, info)
         self.cache_duration_minutes = 5  # Refresh symbol info every 5 minutes
+        self._cache_ttl_seconds = self.cache_duration_minutes * 60
+        self._cache_lock = threading.Lock()
         
     def get_symbol_info(self, symbol: str, force_refresh: bool = False) -> Optional[SymbolInfo]:
         """Get real-time symbol information from MT5"""
         
         # Check cache first (unless force refresh)
-        if not force_refresh and symbol in self._symbol_cache:
-            cache_time = self._cache_timestamp.get(symbol, datetime.min)
-            if (datetime.now() - cache_time).total_seconds() < self.cache_duration_minutes * 60:
-                return self._symbol_cache[symbol]
+        if not force_refresh:
+            entry = self._cache.get(symbol)
+            if entry is not None and time.monotonic() - entry[0] < self._cache_ttl_seconds:
+                return entry[1]
         
         try:
+            mt5 = _get_mt5()
+            
             # Get fresh symbol info from MT5
             symbol_info = mt5.symbol_info(symbol)
             if symbol_info is None:
@@ -66,6 +134,7 @@ class DynamicPriceValidator:
                 current_spread = int((tick.ask - tick.bid) / symbol_info.point)
             
             # Create SymbolInfo object
+            pip_size = _calculate_pip_size(symbol)
             info = SymbolInfo(
                 symbol=symbol,
                 digits=symbol_info.digits,
@@ -75,12 +144,18 @@ class DynamicPriceValidator:
                 trade_mode=symbol_info.trade_mode,
                 min_volume=symbol_info.volume_min,
                 max_volume=symbol_info.volume_max,
-                volume_step=symbol_info.volume_step
+                volume_step=symbol_info.volume_step,
+                pip_size=pip_size,
+                inv_pip_size=1.0 / pip_size,
+                # Minimum stop distance only depends on this snapshot, compute it once
+                min_distance_pips=self._minimum_distance(symbol, symbol_info.digits,
+                                                         symbol_info.trade_stops_level, current_spread),
+                price_multiplier=float(10 ** symbol_info.digits)
             )
             
             # Cache the result
-            self._symbol_cache[symbol] = info
-            self._cache_timestamp[symbol] = datetime.now()
+            with self._cache_lock:
+                self._cache[symbol] = (time.monotonic(), info)
             
             self.logger.info(f"📊 {symbol} Info: digits={info.digits}, point={info.point}, "
                            f"spread={info.spread}, stops_level={info.stops_level}")
@@ -91,55 +166,46 @@ class DynamicPriceValidator:
             self.logger.error(f"❌ Error getting symbol info for {symbol}: {e}")
             return None
     
+    def prefetch_symbols(self, symbols: List[str]) -> int:
+        """
+        Warm the symbol cache for a whole batch of symbols
+        Still one MT5 request per uncached symbol, issued one after another on the calling thread
+        (the MT5 API is not documented as thread-safe); later lookups in the scan are cache hits
+        """
+        unique_symbols = list(dict.fromkeys(symbols))
+        if not unique_symbols:
+            return 0
+        
+        loaded = sum(1 for symbol in unique_symbols if self.get_symbol_info(symbol) is not None)
+        self.logger.debug(f"Prefetched symbol info for {loaded}/{len(unique_symbols)} symbols")
+        return loaded
+    
     def calculate_pip_distance(self, price1: float, price2: float, symbol_info: SymbolInfo) -> float:
         """Calculate pip distance using real symbol specifications"""
         
         price_diff = abs(price1 - price2)
+        pip_distance = price_diff * symbol_info.inv_pip_size
         
-        # Handle different symbol types correctly
-        if symbol_info.symbol.startswith('US') or symbol_info.symbol in ['NAS100', 'UK100', 'DE40']:
-            # Indices: 1 pip = 1 point (regardless of digits)
-            pip_distance = price_diff
-        elif 'JPY' in symbol_info.symbol:
-            # JPY pairs: usually 3 digits, 1 pip = 0.01
-            pip_distance = price_diff * 100
-        elif symbol_info.symbol in ['XAUUSD', 'XAGUSD']:
-            # Metals: usually 2-3 digits, 1 pip = 0.1
-            pip_distance = price_diff * 10
-        else:
-            # Currency pairs: handle 4-digit vs 5-digit
-            if symbol_info.digits == 5:
-                # 5-digit pairs: 1 pip = 0.0001 (10 points)
-                pip_distance = price_diff * 10000
-            else:
-                # 4-digit pairs: 1 pip = 0.0001
-                pip_distance = price_diff * 10000
-            
-        self.logger.debug(f"{symbol_info.symbol}: Price diff={price_diff:.5f}, "
-                         f"digits={symbol_info.digits}, distance={pip_distance:.1f} pips")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s: Price diff=%.5f, digits=%d, distance=%.1f pips",
+                              symbol_info.symbol, price_diff, symbol_info.digits, pip_distance)
         
         return pip_distance
     
     def get_minimum_distance(self, symbol_info: SymbolInfo) -> float:
         """Calculate minimum stop/TP distance in pips based on broker requirements"""
+        return self._minimum_distance(symbol_info.symbol, symbol_info.digits,
+                                      symbol_info.stops_level, symbol_info.spread)
+    
+    def _minimum_distance(self, symbol: str, digits: int, stops_level: int, spread: int) -> float:
+        """Minimum stop/TP distance in pips from the raw broker fields"""
         
-        # Conservative minimums per symbol type (in pips)
-        conservative_minimums = {
-            'STOCK': 2000, # Stocks need much larger distances (increased from 1000)
-            'JPY': 20,     # JPY pairs
-            'METAL': 50,   # Gold/Silver  
-            'INDEX': 100,  # Indices
-            'MAJOR': 15,   # Major pairs
-            'MINOR': 25,   # Minor pairs
-            'EXOTIC': 35   # Exotic pairs
-        }
-        
-        symbol_type = self._get_symbol_type(symbol_info.symbol)
-        conservative_min = conservative_minimums.get(symbol_type, 20)
+        symbol_type = self._get_symbol_type(symbol)
+        conservative_min = _CONSERVATIVE_MINIMUMS.get(symbol_type, 20)
         
         # Broker minimum (stops_level is usually in points, not pips)
-        broker_minimum_points = symbol_info.stops_level
-        spread_points = symbol_info.spread
+        broker_minimum_points = stops_level
+        spread_points = spread
         
         # Convert broker minimums to pips based on symbol type
         if symbol_type == 'STOCK':
@@ -153,7 +219,7 @@ class DynamicPriceValidator:
             broker_minimum_pips = max(broker_minimum_points / 10, spread_points + 20)
         else:
             # For currency pairs
-            if symbol_info.digits == 5:
+            if digits == 5:
                 # 5-digit: 10 points = 1 pip
                 broker_minimum_pips = (broker_minimum_points + spread_points + 10) / 10
             else:
@@ -162,29 +228,16 @@ class DynamicPriceValidator:
         
         final_minimum = max(broker_minimum_pips, conservative_min)
         
-        self.logger.debug(f"{symbol_info.symbol}: broker_min={broker_minimum_points}pts, "
-                         f"spread={spread_points}pts, type={symbol_type}, "
-                         f"final_min={final_minimum:.1f} pips")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s: broker_min=%spts, spread=%spts, type=%s, final_min=%.1f pips",
+                              symbol, broker_minimum_points, spread_points,
+                              symbol_type, final_minimum)
         
         return final_minimum
     
     def _get_symbol_type(self, symbol: str) -> str:
         """Determine symbol type for minimum distance calculation"""
-        # Stock detection patterns
-        if any(suffix in symbol for suffix in ['.OQ', '.N', '.P', '.DE']):
-            return 'STOCK'
-        elif 'JPY' in symbol:
-            return 'JPY'
-        elif symbol in ['XAUUSD', 'XAGUSD', 'GOLD', 'SILVER']:
-            return 'METAL'
-        elif symbol in ['US30', 'NAS100', 'UK100', 'DE40', 'FR40', 'AUS200']:
-            return 'INDEX'
-        elif symbol in ['EURUSD', 'GBPUSD', 'AUDUSD', 'USDCHF', 'USDCAD', 'USDJPY']:
-            return 'MAJOR'
-        elif any(pair in symbol for pair in ['EUR', 'GBP', 'AUD', 'USD', 'CHF', 'CAD']):
-            return 'MINOR'
-        else:
-            return 'EXOTIC'
+        return _classify_symbol(symbol)
     
     def validate_order(self, symbol: str, entry_price: float, 
                       stop_loss: float, take_profit: float) -> ValidationResult:
@@ -212,12 +265,14 @@ class DynamicPriceValidator:
         sl_distance = self.calculate_pip_distance(entry_price, stop_loss, symbol_info)
         tp_distance = self.calculate_pip_distance(entry_price, take_profit, symbol_info)
         
-        # Get minimum required distance
-        min_distance = self.get_minimum_distance(symbol_info)
+        # Get minimum required distance (precomputed with the symbol snapshot)
+        min_distance = symbol_info.min_distance_pips
         
         # Initialize adjustment variables
         adjusted_sl = stop_loss
         adjusted_tp = take_profit
+        final_sl_distance = sl_distance
+        final_tp_distance = tp_distance
         is_valid = True
         
         # Validate and adjust stop loss
@@ -225,11 +280,10 @@ class DynamicPriceValidator:
             self.logger.warning(f"🔧 {symbol}: SL too close - {sl_distance:.1f} pips, "
                               f"adjusting to {min_distance:.1f} pips")
             
-            # Adjust stop loss to minimum distance
-            adjusted_sl = self._adjust_price_by_pips(
-                entry_price, min_distance, symbol_info, 
-                is_stop_loss=True, is_long=(stop_loss < entry_price)
-            )
+            # Adjust stop loss to minimum distance (keeps it on its side of entry)
+            adjusted_sl = self.format_price(
+                self._adjust_to_min(entry_price, stop_loss, min_distance, symbol_info.pip_size), symbol_info)
+            final_sl_distance = self.calculate_pip_distance(entry_price, adjusted_sl, symbol_info)
         
         # Validate and adjust take profit
         min_tp_distance = min_distance
@@ -237,18 +291,14 @@ class DynamicPriceValidator:
             self.logger.warning(f"🔧 {symbol}: TP too close - {tp_distance:.1f} pips, "
                               f"adjusting to {min_tp_distance:.1f} pips")
             
-            # Adjust take profit to minimum distance
-            adjusted_tp = self._adjust_price_by_pips(
-                entry_price, min_tp_distance, symbol_info,
-                is_stop_loss=False, is_long=(take_profit > entry_price)
-            )
+            # Adjust take profit to minimum distance (keeps it on its side of entry)
+            adjusted_tp = self.format_price(
+                self._adjust_to_min(entry_price, take_profit, min_tp_distance, symbol_info.pip_size), symbol_info)
+            final_tp_distance = self.calculate_pip_distance(entry_price, adjusted_tp, symbol_info)
         
-        # Recalculate final distances
-        final_sl_distance = self.calculate_pip_distance(entry_price, adjusted_sl, symbol_info)
-        final_tp_distance = self.calculate_pip_distance(entry_price, adjusted_tp, symbol_info)
-        
-        self.logger.info(f"✅ {symbol}: Validation complete - "
-                        f"SL: {final_sl_distance:.1f} pips, TP: {final_tp_distance:.1f} pips")
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(f"✅ {symbol}: Validation complete - "
+                            f"SL: {final_sl_distance:.1f} pips, TP: {final_tp_distance:.1f} pips")
         
         return ValidationResult(
             is_valid=is_valid,
@@ -258,10 +308,55 @@ class DynamicPriceValidator:
             pip_distance_tp=final_tp_distance
         )
 
+    def validate_orders(self, symbol: str, entry_prices: np.ndarray,
+                        stop_losses: np.ndarray, take_profits: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Validate a batch of orders for one symbol in a single vectorized pass
+        Same adjustment rules as validate_order, results returned as parallel arrays
+        """
+        entry = np.asarray(entry_prices, dtype=np.float64)
+        sl = np.asarray(stop_losses, dtype=np.float64)
+        tp = np.asarray(take_profits, dtype=np.float64)
+        
+        symbol_info = self.get_symbol_info(symbol)
+        if not symbol_info or symbol_info.trade_mode == 0:  # Unknown or TRADE_MODE_DISABLED
+            nan = np.full(entry.shape, np.nan)
+            return {
+                'is_valid': np.zeros(entry.shape, dtype=bool),
+                'adjusted_sl': nan,
+                'adjusted_tp': nan.copy(),
+                'pip_distance_sl': nan.copy(),
+                'pip_distance_tp': nan.copy(),
+            }
+        
+        inv_pip = symbol_info.inv_pip_size
+        min_distance = symbol_info.min_distance_pips
+        min_change = min_distance * symbol_info.pip_size
+        
+        # Same rule as _adjust_to_min: levels move out on the side of entry they sit on
+        sl_bad = np.abs(entry - sl) * inv_pip < min_distance
+        tp_bad = np.abs(entry - tp) * inv_pip < min_distance
+        sl_fixed = np.round(np.where(sl > entry, entry + min_change, entry - min_change), symbol_info.digits)
+        tp_fixed = np.round(np.where(tp > entry, entry + min_change, entry - min_change), symbol_info.digits)
+        adjusted_sl = np.where(sl_bad, sl_fixed, sl)
+        adjusted_tp = np.where(tp_bad, tp_fixed, tp)
+        
+        adjusted_count = int(sl_bad.sum() + tp_bad.sum())
+        if adjusted_count:
+            self.logger.warning(f"🔧 {symbol}: {adjusted_count} SL/TP levels adjusted to {min_distance:.1f} pips")
+        
+        return {
+            'is_valid': np.ones(entry.shape, dtype=bool),
+            'adjusted_sl': adjusted_sl,
+            'adjusted_tp': adjusted_tp,
+            'pip_distance_sl': np.abs(entry - adjusted_sl) * inv_pip,
+            'pip_distance_tp': np.abs(entry - adjusted_tp) * inv_pip,
+        }
+
     def get_current_price(self, symbol: str) -> Optional[Tuple[float, float]]:
         """Get current bid/ask prices for symbol"""
         try:
-            tick = mt5.symbol_info_tick(symbol)
+            tick = _get_mt5().symbol_info_tick(symbol)
             if tick:
                 return (tick.bid, tick.ask)
             return None
@@ -271,43 +366,11 @@ class DynamicPriceValidator:
     
     def format_price(self, price: float, symbol_info: SymbolInfo) -> float:
         """Format price to correct decimal places for symbol"""
-        return round(price, symbol_info.digits)
+        multiplier = symbol_info.price_multiplier
+        return round(price * multiplier) / multiplier
     
-    def _adjust_price_by_pips(self, entry_price: float, pip_distance: float, 
-                             symbol_info: SymbolInfo, is_stop_loss: bool, is_long: bool) -> float:
-        """Adjust price by specified pip distance based on symbol type"""
-        
-        # Calculate price change based on symbol type
-        if symbol_info.symbol.startswith('US') or symbol_info.symbol in ['NAS100', 'UK100', 'DE40']:
-            # Indices: 1 pip = 1 point
-            price_change = pip_distance
-        elif 'JPY' in symbol_info.symbol:
-            # JPY pairs: 1 pip = 0.01
-            price_change = pip_distance * 0.01
-        elif symbol_info.symbol in ['XAUUSD', 'XAGUSD']:
-            # Metals: 1 pip = 0.1
-            price_change = pip_distance * 0.1
-        else:
-            # Currency pairs: 1 pip = 0.0001
-            price_change = pip_distance * 0.0001
-        
-        # Apply direction based on position type and SL/TP
-        if is_stop_loss:
-            # Stop loss is opposite direction to position
-            if is_long:
-                # Long position: SL below entry
-                adjusted_price = entry_price - price_change
-            else:
-                # Short position: SL above entry
-                adjusted_price = entry_price + price_change
-        else:
-            # Take profit is same direction as position
-            if is_long:
-                # Long position: TP above entry
-                adjusted_price = entry_price + price_change
-            else:
-                # Short position: TP below entry
-                adjusted_price = entry_price - price_change
-        
-        # Format to correct decimal places
-        return self.format_price(adjusted_price, symbol_info)
\ No newline at end of file
+    @staticmethod
+    def _adjust_to_min(entry_price: float, current_price: float, min_pips: float, pip_size: float) -> float:
+        """Move a SL/TP level out to min_pips from entry on the side it already sits on"""
+        sign = 1.0 if current_price > entry_price else -1.0
+        return entry_price + sign * min_pips * pip_size
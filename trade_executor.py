@@ -8,15 +8,137 @@ import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Mapping, Tuple
+from types import MappingProxyType
 from enum import Enum
 import logging
+import random
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import time
 
 from signal_generator import TradingSignal, SignalType
 from risk_manager import PositionSize
 from price_validator import DynamicPriceValidator, ValidationResult
+import executor_kernels
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional - kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# __slots__ dataclasses (no per-instance __dict__) where the interpreter supports it
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Slippage symbol classes -> pips per unit of price
+_SLIP_JPY, _SLIP_METAL, _SLIP_INDEX, _SLIP_FX = 0, 1, 2, 3
+_SLIPPAGE_MULTIPLIERS = np.array([100.0, 10.0, 1.0, 10000.0])
+
+def _slippage_class(symbol: str) -> int:
+    """Classify symbol for slippage pip conversion"""
+    if 'JPY' in symbol:
+        return _SLIP_JPY
+    elif symbol in ['XAUUSD']:
+        return _SLIP_METAL
+    elif symbol.startswith('US') or symbol in ['NAS100']:
+        return _SLIP_INDEX
+    else:
+        return _SLIP_FX
+
+def _jit(func, **options):
+    """njit with on-disk cache; .pyc-only/frozen deployments have no source to key the cache on"""
+    try:
+        return njit(cache=True, **options)(func)
+    except RuntimeError:
+        return njit(**options)(func)
+
+# Kernel bodies are defined once in executor_kernels.py (shared with build_kernels.py)
+_slippage_kernel = _jit(executor_kernels.slippage_kernel)
+_update_profits = _jit(executor_kernels.update_profits, parallel=True)
+KERNEL_IMPL = 'jit'
+
+# Prefer the ahead-of-time build (python build_kernels.py) to skip JIT compilation at startup,
+# but only if it was built from the current kernel sources
+try:
+    import trade_kernels
+except ImportError:
+    pass
+else:
+    if getattr(trade_kernels, 'kernel_version', lambda: None)() == executor_kernels.KERNEL_VERSION:
+        _slippage_kernel = trade_kernels.slippage_kernel
+        _update_profits = trade_kernels.update_profits
+        KERNEL_IMPL = 'aot'
+    else:
+        logging.getLogger(__name__).warning(
+            "trade_kernels build is stale (kernel_version mismatch) - rerun build_kernels.py; using JIT kernels")
+
+# Human-readable MT5 return codes (built once at import)
+_RETCODE_DESCRIPTIONS: Dict[int, str] = {
+    mt5.TRADE_RETCODE_DONE: "Request completed",
+    mt5.TRADE_RETCODE_REQUOTE: "Requote",
+    mt5.TRADE_RETCODE_REJECT: "Request rejected",
+    mt5.TRADE_RETCODE_CANCEL: "Request canceled",
+    mt5.TRADE_RETCODE_PLACED: "Order placed",
+    mt5.TRADE_RETCODE_MARKET_CLOSED: "Market closed",
+    mt5.TRADE_RETCODE_NO_MONEY: "Insufficient funds",
+    mt5.TRADE_RETCODE_PRICE_CHANGED: "Price changed",
+    mt5.TRADE_RETCODE_PRICE_OFF: "Off quotes",
+    mt5.TRADE_RETCODE_INVALID_STOPS: "Invalid stops",
+    mt5.TRADE_RETCODE_TRADE_DISABLED: "Trade disabled",
+    mt5.TRADE_RETCODE_INVALID_VOLUME: "Invalid volume",
+    mt5.TRADE_RETCODE_CONNECTION: "No connection",
+    mt5.TRADE_RETCODE_ONLY_REAL: "Only real accounts allowed",
+    mt5.TRADE_RETCODE_LIMIT_ORDERS: "Orders limit reached",
+    mt5.TRADE_RETCODE_LIMIT_VOLUME: "Volume limit reached",
+    mt5.TRADE_RETCODE_INVALID_ORDER: "Invalid order",
+    mt5.TRADE_RETCODE_POSITION_CLOSED: "Position closed",
+    # Additional important codes
+    10004: "Requote",
+    10006: "Request rejected",
+    10007: "Request canceled by trader",
+    10008: "Order placed",
+    10009: "Request completed",
+    10010: "Request completed partially",
+    10011: "Request processing error",
+    10012: "Request canceled by timeout",
+    10013: "Invalid request",
+    10014: "Invalid volume in the request",
+    10015: "Invalid price in the request",
+    10016: "Invalid stops in the request",
+    10017: "Trade is disabled",
+    10018: "Market is closed",
+    10019: "There is not enough money to complete the request",
+    10020: "Prices changed",
+    10021: "There are no quotes to process the request",
+    10022: "Invalid order expiration date",
+    10023: "Order state changed",
+    10024: "Too frequent requests",
+    10025: "No changes in request",
+    10026: "Autotrading disabled by server",
+    10027: "Autotrading disabled by client terminal",
+    10028: "Request locked for processing",
+    10029: "Order or position frozen",
+    10030: "Invalid order filling type",  # THE PROBLEMATIC ONE!
+    10031: "No connection with the trade server",
+    10032: "Operation is allowed only for live accounts",
+    10033: "The number of pending orders has reached the limit",
+    10034: "The volume of orders and positions for the symbol has reached the limit",
+    10035: "Incorrect or prohibited order type",
+    10036: "Position with the specified POSITION_IDENTIFIER has already been closed",
+}
+
+# Retcodes where MT5 already quoted a fresh price - resubmit at once with a refreshed price
+_IMMEDIATE_RETRY_RETCODES = frozenset({
+    mt5.TRADE_RETCODE_REQUOTE,
+    mt5.TRADE_RETCODE_PRICE_CHANGED,
+    mt5.TRADE_RETCODE_PRICE_OFF,
+})
+_MAX_RETRY_DELAY = 5.0  # seconds
 
 class OrderType(Enum):
     """MT5 order types"""
@@ -35,7 +157,7 @@ class OrderStatus(Enum):
     REJECTED = "REJECTED"
     PARTIAL = "PARTIAL"
 
-@dataclass
+@dataclass(**_SLOTS)
 class ExecutionResult:
     """Order execution result"""
     success: bool
@@ -48,7 +170,7 @@ class ExecutionResult:
     execution_time: datetime
     slippage_pips: float = 0.0
 
-@dataclass
+@dataclass(**_SLOTS)
 class Position:
     """Active position tracking"""
     position_id: int
@@ -76,6 +198,108 @@ class Position:
         else:
             self.profit = (self.open_price - price) * self.volume * 100000
 
+_POSITION_BUILDER_SOURCE = """lambda signal, position_size, result: Position(
+    position_id=result.position_id,
+    symbol=signal.symbol,
+    type={position_type!r},
+    volume=position_size.lot_size,
+    open_price=result.price,
+    current_price=result.price,
+    stop_loss=signal.stop_loss,
+    take_profit=signal.take_profit,
+    swap=0.0,
+    profit=0.0,
+    comment=f"EW_{{signal.wave_pattern}}_{{signal.current_wave}}",
+    open_time=result.execution_time,
+    wave_pattern=signal.wave_pattern,
+    signal_confidence=signal.confidence
+)"""
+
+def _make_position_builder(position_type: str):
+    """Generate a Position factory with the position type baked in as a constant"""
+    code = compile(_POSITION_BUILDER_SOURCE.format(position_type=position_type),
+                   f"<position_builder_{position_type}>", "eval")
+    return eval(code, {'Position': Position})
+
+class _PositionArrays:
+    """
+    Structure-of-arrays mirror of the active positions
+    Lets monitor_positions evaluate the whole book with a few NumPy operations
+    """
+    
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.row_of: Dict[int, int] = {}  # position_id -> row
+        self.ids: List[int] = []          # row -> position_id
+        self.symbols: List[str] = []      # row -> symbol
+        self.positions: List['Position'] = []  # row -> Position, contiguous for iteration
+        self.px = np.zeros(capacity)
+        self.open = np.zeros(capacity)
+        self.sl = np.zeros(capacity)
+        self.tp = np.zeros(capacity)
+        self.vol = np.zeros(capacity)
+        self.profit = np.zeros(capacity)
+        self.sign = np.zeros(capacity, dtype=np.int8)  # +1 buy, -1 sell
+    
+    def _grow(self):
+        capacity = max(16, 2 * self.px.size)
+        for name in ('px', 'open', 'sl', 'tp', 'vol', 'profit', 'sign'):
+            setattr(self, name, np.resize(getattr(self, name), capacity))
+    
+    def add(self, position: 'Position'):
+        """Insert or overwrite the row for a position"""
+        row = self.row_of.get(position.position_id)
+        if row is None:
+            if self.size == self.px.size:
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.row_of[position.position_id] = row
+            self.ids.append(position.position_id)
+            self.symbols.append(position.symbol)
+            self.positions.append(position)
+        else:
+            self.symbols[row] = position.symbol
+            self.positions[row] = position
+        self.px[row] = position.current_price
+        self.open[row] = position.open_price
+        self.sl[row] = position.stop_loss
+        self.tp[row] = position.take_profit
+        self.vol[row] = position.volume
+        self.profit[row] = position.profit
+        self.sign[row] = 1 if position.type == 'buy' else -1
+    
+    def remove(self, position_id: int):
+        """Drop a row by moving the last row into its slot"""
+        row = self.row_of.pop(position_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            for arr in (self.px, self.open, self.sl, self.tp, self.vol, self.profit, self.sign):
+                arr[row] = arr[last]
+            self.ids[row] = self.ids[last]
+            self.symbols[row] = self.symbols[last]
+            self.positions[row] = self.positions[last]
+            self.row_of[self.ids[row]] = row
+        self.ids.pop()
+        self.symbols.pop()
+        self.positions.pop()
+        self.size = last
+    
+    def load(self, positions: List['Position']):
+        """Replace all rows with the given positions"""
+        self.clear()
+        for position in positions:
+            self.add(position)
+    
+    def clear(self):
+        self.size = 0
+        self.row_of.clear()
+        self.ids.clear()
+        self.symbols.clear()
+        self.positions.clear()
+
 class TradeExecutor:
     """
     Professional trade execution engine
@@ -86,7 +310,19 @@ class TradeExecutor:
         self.logger = logging.getLogger(__name__)
         self.mt5_connected = False
         self.active_positions = {}  # position_id -> Position
+        self._positions_view = MappingProxyType(self.active_positions)  # read-only live view
         self.pending_orders = {}    # order_id -> order_info
+        self._active_symbols = set()  # symbols with an open Elliott Wave position
+        
+        # Background order submission (see execute_signal_async)
+        self._order_pool: Optional[ThreadPoolExecutor] = None
+        self._tracking_lock = threading.RLock()
+        self._inflight_symbols = set()
+        
+        # Specialized Position factories (no per-fill type branch)
+        self._mk_buy_pos = _make_position_builder('buy')
+        self._mk_sell_pos = _make_position_builder('sell')
+        self._arrays = _PositionArrays()  # SoA mirror of active_positions for monitoring
         
         # Initialize dynamic price validator
         self.price_validator = DynamicPriceValidator()
@@ -96,15 +332,33 @@ class TradeExecutor:
         self.retry_attempts = 3     # Number of retry attempts
         self.retry_delay = 1.0      # Delay between retries (seconds)
         
+        # Tick snapshot shared by back-to-back position updates
+        self.tick_cache_ttl = 0.05  # seconds
+        self._tick_cache = {}       # symbol -> tick
+        self._tick_cache_time = 0.0
+        
+        # Slippage pip multiplier per symbol (classified on first fill)
+        self._slip_mult: Dict[str, float] = {}
+        
         # Magic number for Elliott Wave EA
         self.magic_number = 202501  # Elliott Wave 2025-01
+        
+        # Market deal request fields shared by every open/close order
+        # Use safe filling mode for older MT5 versions (FOK when available)
+        self._deal_template = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "deviation": int(self.max_slippage),
+            "magic": self.magic_number,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_FOK if hasattr(mt5, 'ORDER_FILLING_FOK') else mt5.ORDER_FILLING_RETURN,
+        }
     
     def connect(self) -> bool:
         """Connect to MT5 terminal"""
         try:
             if not mt5.initialize():
                 error = mt5.last_error()
-                self.logger.error(f"MT5 initialization failed: {error}")
+                self.logger.error("MT5 initialization failed: %s", error)
                 return False
             
             # Verify connection
@@ -115,19 +369,32 @@ class TradeExecutor:
                 return False
             
             self.mt5_connected = True
-            self.logger.info(f"Trade Executor connected to account {account_info.login}")
+            self.logger.info("Trade Executor connected to account %s", account_info.login)
+            self.logger.info("Numeric kernels: %s", KERNEL_IMPL)
             
             # Load existing positions
             self._load_existing_positions()
             
+            # Classify every tradable symbol once so fills only do a dict lookup
+            self._precompute_slippage_multipliers()
+            
+            # Worker threads for non-blocking order submission
+            if self._order_pool is None:
+                self._order_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ew-order")
+            
             return True
             
         except Exception as e:
-            self.logger.error(f"MT5 connection error: {e}")
+            self.logger.error("MT5 connection error: %s", e)
             return False
     
     def disconnect(self):
         """Disconnect from MT5"""
+        if self._order_pool is not None:
+            # Let in-flight orders finish before the terminal goes away
+            self._order_pool.shutdown(wait=True)
+            self._order_pool = None
+        
         if self.mt5_connected:
             mt5.shutdown()
             self.mt5_connected = False
@@ -146,7 +413,7 @@ class TradeExecutor:
             return float(account_info.balance)
             
         except Exception as e:
-            self.logger.error(f"Error getting account balance: {e}")
+            self.logger.error("Error getting account balance: %s", e)
             return None
     
     def get_account_info(self) -> Optional[Dict]:
@@ -172,7 +439,7 @@ class TradeExecutor:
             }
             
         except Exception as e:
-            self.logger.error(f"Error getting account info: {e}")
+            self.logger.error("Error getting account info: %s", e)
             return None
     
     def execute_signal(self, signal: TradingSignal, position_size: PositionSize) -> ExecutionResult:
@@ -183,29 +450,20 @@ class TradeExecutor:
             signal: Trading signal from signal generator
             position_size: Position size from risk manager
         """
+        now = datetime.now()  # One timestamp for all pre-submission rejections
         try:
             if not self.mt5_connected:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=0, error_code=-1, error_message="MT5 not connected",
-                    execution_time=datetime.now()
-                )
+                return self._fail(0, -1, "MT5 not connected", execution_time=now)
 
             if not position_size.is_valid:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=0, error_code=-1, error_message=f"Invalid position size: {position_size.reason}",
-                    execution_time=datetime.now()
-                )
+                return self._fail(0, -1, f"Invalid position size: {position_size.reason}", execution_time=now)
             
             # CHECK FOR EXISTING POSITIONS - Prevent duplicates
             if self._has_existing_position(signal.symbol):
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=0, error_code=-2, error_message=f"Position already exists for {signal.symbol}",
-                    execution_time=datetime.now()
-                )            # DYNAMIC PRICE VALIDATION - Auto-fix order parameters
-            self.logger.info(f"🔍 Validating {signal.symbol} order parameters...")
+                return self._fail(0, -2, f"Position already exists for {signal.symbol}", execution_time=now)
+            
+            # DYNAMIC PRICE VALIDATION - Auto-fix order parameters
+            self.logger.info("🔍 Validating %s order parameters...", signal.symbol)
             validation = self.price_validator.validate_order(
                 symbol=signal.symbol,
                 entry_price=signal.entry_price,
@@ -214,11 +472,7 @@ class TradeExecutor:
             )
             
             if not validation.is_valid:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=0, error_code=-1, error_message=f"Price validation failed: {validation.error_message}",
-                    execution_time=datetime.now()
-                )
+                return self._fail(0, -1, f"Price validation failed: {validation.error_message}", execution_time=now)
             
             # Use validated/adjusted prices
             validated_sl = validation.adjusted_sl
@@ -226,12 +480,12 @@ class TradeExecutor:
             
             # Log adjustments if any were made
             if validated_sl != signal.stop_loss:
-                self.logger.info(f"🔧 {signal.symbol}: Stop Loss adjusted from {signal.stop_loss:.5f} to {validated_sl:.5f} "
-                               f"({validation.pip_distance_sl:.1f} pips)")
+                self.logger.info("🔧 %s: Stop Loss adjusted from %.5f to %.5f (%.1f pips)",
+                                 signal.symbol, signal.stop_loss, validated_sl, validation.pip_distance_sl)
             
             if validated_tp != signal.take_profit:
-                self.logger.info(f"🔧 {signal.symbol}: Take Profit adjusted from {signal.take_profit:.5f} to {validated_tp:.5f} "
-                               f"({validation.pip_distance_tp:.1f} pips)")
+                self.logger.info("🔧 %s: Take Profit adjusted from %.5f to %.5f (%.1f pips)",
+                                 signal.symbol, signal.take_profit, validated_tp, validation.pip_distance_tp)
             
             # Prepare order request
             if signal.signal_type == SignalType.BUY:
@@ -241,54 +495,36 @@ class TradeExecutor:
                 order_type = mt5.ORDER_TYPE_SELL
                 price = signal.entry_price
             else:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=0, error_code=-1, error_message=f"Unsupported signal type: {signal.signal_type}",
-                    execution_time=datetime.now()
-                )
+                return self._fail(0, -1, f"Unsupported signal type: {signal.signal_type}", execution_time=now)
             
             # Create order request with validated prices
-            # Use safe filling mode for older MT5 versions
-            safe_filling_mode = mt5.ORDER_FILLING_RETURN  # Most compatible mode
-            if hasattr(mt5, 'ORDER_FILLING_FOK'):
-                safe_filling_mode = mt5.ORDER_FILLING_FOK
-            
             # For some brokers, stocks don't allow SL/TP at market order time
             # Try without SL/TP first for stocks
-            symbol_info = mt5.symbol_info(signal.symbol)
             is_stock = any(suffix in signal.symbol for suffix in ['.OQ', '.N', '.P', '.DE'])
             
             # Force no-stops mode for all stocks due to broker restrictions
             if is_stock:
                 # Stocks: no SL/TP at order time
                 request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
+                    **self._deal_template,
                     "symbol": signal.symbol,
                     "volume": position_size.lot_size,
                     "type": order_type,
                     "price": price,
                     # No SL/TP for stocks
-                    "deviation": int(self.max_slippage),
-                    "magic": self.magic_number,
                     "comment": "EW_Signal_NoStops",
-                    "type_time": mt5.ORDER_TIME_GTC,
-                    "type_filling": safe_filling_mode,
                 }
-                self.logger.info(f"📈 {signal.symbol}: Using market order without stops (broker restriction)")
+                self.logger.info("📈 %s: Using market order without stops (broker restriction)", signal.symbol)
             else:
                 request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
+                    **self._deal_template,
                     "symbol": signal.symbol,
                     "volume": position_size.lot_size,
                     "type": order_type,
                     "price": price,
                     "sl": validated_sl,  # Use validated stop loss
                     "tp": validated_tp,  # Use validated take profit
-                    "deviation": int(self.max_slippage),
-                    "magic": self.magic_number,
                     "comment": "EW_Signal_Validated",
-                    "type_time": mt5.ORDER_TIME_GTC,
-                    "type_filling": safe_filling_mode,  # Safe filling mode
                 }
             
             # Execute order with retries
@@ -296,7 +532,7 @@ class TradeExecutor:
             
             # Special debugging for retcode 10030
             if not result.success and result.error_code == 10030:
-                self.logger.error(f"🚨 RETCODE 10030 DEBUG for {signal.symbol}:")
+                self.logger.error("🚨 RETCODE 10030 DEBUG for %s:", signal.symbol)
                 self._debug_symbol_info(signal.symbol)
                 self._debug_order_filling_modes(signal.symbol)
                 
@@ -307,31 +543,54 @@ class TradeExecutor:
                 # Track position
                 position = self._create_position_record(signal, position_size, result)
                 if position:
-                    self.active_positions[position.position_id] = position
-                    self.logger.info(f"✅ Position opened: {signal.symbol} {signal.signal_type.value} "
-                                   f"{position_size.lot_size} lots at {result.price:.5f}")
+                    self._track_position(position)
+                    self.logger.info("✅ Position opened: %s %s %s lots at %.5f",
+                                     signal.symbol, signal.signal_type.value, position_size.lot_size, result.price)
                 
                 # CRITICAL: Set SL/TP for stocks AFTER position opening
                 if is_stock and result.success:
-                    self.logger.info(f"🔒 Setting SL/TP for stock position {signal.symbol}...")
+                    self.logger.info("🔒 Setting SL/TP for stock position %s...", signal.symbol)
                     sl_tp_result = self._set_position_sl_tp(result.order, signal.symbol, validated_sl, validated_tp)
                     if sl_tp_result:
-                        self.logger.info(f"✅ SL/TP set: SL={validated_sl:.5f}, TP={validated_tp:.5f}")
+                        self.logger.info("✅ SL/TP set: SL=%.5f, TP=%.5f", validated_sl, validated_tp)
                     else:
-                        self.logger.error(f"❌ Failed to set SL/TP for {signal.symbol}")
+                        self.logger.error("❌ Failed to set SL/TP for %s", signal.symbol)
             
             return result
             
         except Exception as e:
-            self.logger.error(f"Order execution error: {e}")
-            return ExecutionResult(
-                success=False, order_id=None, position_id=None, price=None,
-                volume=0, error_code=-1, error_message=f"Execution error: {e}",
-                execution_time=datetime.now()
-            )
+            self.logger.error("Order execution error: %s", e)
+            return self._fail(0, -1, f"Execution error: {e}")
+    
+    def execute_signal_async(self, signal: TradingSignal, position_size: PositionSize) -> "Future[ExecutionResult]":
+        """
+        Submit a signal on a worker thread and return a Future with the ExecutionResult
+        The caller keeps running while MT5 processes the order (including retries)
+        """
+        with self._tracking_lock:
+            if self._order_pool is None or signal.symbol in self._inflight_symbols:
+                future = Future()
+                if self._order_pool is None:
+                    future.set_result(self._fail(0, -1, "MT5 not connected"))
+                else:
+                    future.set_result(self._fail(0, -2, f"Order already in flight for {signal.symbol}"))
+                return future
+            self._inflight_symbols.add(signal.symbol)
+        
+        future = self._order_pool.submit(self.execute_signal, signal, position_size)
+        future.add_done_callback(lambda _: self._clear_inflight(signal.symbol))
+        return future
+    
+    def _clear_inflight(self, symbol: str):
+        with self._tracking_lock:
+            self._inflight_symbols.discard(symbol)
     
     def _execute_order_with_retry(self, request: Dict) -> ExecutionResult:
         """Execute order with retry logic"""
+        # Requote retries refresh the price on a private copy; slippage is measured
+        # against the price originally requested so the requote drift is included
+        requested_price = request['price']
+        request = dict(request)
         
         for attempt in range(self.retry_attempts):
             try:
@@ -339,20 +598,16 @@ class TradeExecutor:
                 
                 if result is None:
                     error = mt5.last_error()
-                    self.logger.warning(f"Order attempt {attempt + 1} failed: {error}")
+                    self.logger.warning("Order attempt %s failed: %s", attempt + 1, error)
                     if attempt < self.retry_attempts - 1:
-                        time.sleep(self.retry_delay)
+                        time.sleep(self._retry_backoff(attempt))
                         continue
-                    return ExecutionResult(
-                        success=False, order_id=None, position_id=None, price=None,
-                        volume=request['volume'], error_code=error[0] if error else -1,
-                        error_message=error[1] if error else "Unknown error",
-                        execution_time=datetime.now()
-                    )
+                    return self._fail(request['volume'], error[0] if error else -1,
+                                      error[1] if error else "Unknown error")
                 
                 if result.retcode == mt5.TRADE_RETCODE_DONE:
                     # Calculate slippage
-                    slippage_pips = self._calculate_slippage(request['price'], result.price, request['symbol'])
+                    slippage_pips = self._calculate_slippage(requested_price, result.price, request['symbol'])
                     
                     return ExecutionResult(
                         success=True,
@@ -368,56 +623,60 @@ class TradeExecutor:
                 
                 else:
                     error_msg = self._get_retcode_description(result.retcode)
-                    self.logger.warning(f"Order attempt {attempt + 1} failed: {error_msg}")
+                    self.logger.warning("Order attempt %s failed: %s", attempt + 1, error_msg)
                     
                     if attempt < self.retry_attempts - 1:
-                        time.sleep(self.retry_delay)
+                        if result.retcode in _IMMEDIATE_RETRY_RETCODES:
+                            self._refresh_request_price(request)
+                        else:
+                            time.sleep(self._retry_backoff(attempt))
                         continue
                     
-                    return ExecutionResult(
-                        success=False, order_id=None, position_id=None, price=None,
-                        volume=request['volume'], error_code=result.retcode,
-                        error_message=error_msg, execution_time=datetime.now()
-                    )
+                    return self._fail(request['volume'], result.retcode, error_msg)
                     
             except Exception as e:
-                self.logger.error(f"Order execution exception: {e}")
+                self.logger.error("Order execution exception: %s", e)
                 if attempt < self.retry_attempts - 1:
-                    time.sleep(self.retry_delay)
+                    time.sleep(self._retry_backoff(attempt))
                     continue
                 
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=request['volume'], error_code=-1,
-                    error_message=f"Exception: {e}", execution_time=datetime.now()
-                )
+                return self._fail(request['volume'], -1, f"Exception: {e}")
         
+        return self._fail(request['volume'], -1, "All retry attempts failed")
+    
+    @staticmethod
+    def _fail(volume: float, error_code: int, error_message: str, position_id: Optional[int] = None,
+              execution_time: Optional[datetime] = None) -> ExecutionResult:
+        """Build a failed ExecutionResult (no order, no fill price)"""
         return ExecutionResult(
-            success=False, order_id=None, position_id=None, price=None,
-            volume=request['volume'], error_code=-1,
-            error_message="All retry attempts failed", execution_time=datetime.now()
+            success=False, order_id=None, position_id=position_id, price=None,
+            volume=volume, error_code=error_code, error_message=error_message,
+            execution_time=execution_time or datetime.now()
         )
     
+    def _retry_backoff(self, attempt: int) -> float:
+        """Exponential backoff with +/-20% jitter, capped at _MAX_RETRY_DELAY"""
+        return min(self.retry_delay * 2 ** attempt, _MAX_RETRY_DELAY) * random.uniform(0.8, 1.2)
+    
+    def _refresh_request_price(self, request: Dict):
+        """Update a requoted deal request with the current market price"""
+        tick = mt5.symbol_info_tick(request['symbol'])
+        if tick:
+            request['price'] = tick.ask if request['type'] == mt5.ORDER_TYPE_BUY else tick.bid
+    
     def close_position(self, position_id: int, reason: str = "Manual close") -> ExecutionResult:
         """Close an existing position"""
+        now = datetime.now()  # One timestamp for all pre-submission rejections
         try:
             if position_id not in self.active_positions:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=position_id, price=None,
-                    volume=0, error_code=-1, error_message="Position not found",
-                    execution_time=datetime.now()
-                )
+                return self._fail(0, -1, "Position not found", position_id=position_id, execution_time=now)
             
             position = self.active_positions[position_id]
             
             # Get current price
             tick = mt5.symbol_info_tick(position.symbol)
             if tick is None:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=position_id, price=None,
-                    volume=0, error_code=-1, error_message="Failed to get current price",
-                    execution_time=datetime.now()
-                )
+                return self._fail(0, -1, "Failed to get current price", position_id=position_id, execution_time=now)
             
             # Determine close price and order type
             if position.type == 'buy':
@@ -429,17 +688,13 @@ class TradeExecutor:
             
             # Create close request
             request = {
-                "action": mt5.TRADE_ACTION_DEAL,
+                **self._deal_template,
                 "symbol": position.symbol,
                 "volume": position.volume,
                 "type": order_type,
                 "position": position_id,
                 "price": close_price,
-                "deviation": int(self.max_slippage),
-                "magic": self.magic_number,
                 "comment": f"Close_{reason}",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK,  # Fill or Kill - works with demo account
             }
             
             # Execute close order
@@ -447,26 +702,22 @@ class TradeExecutor:
             
             if result.success:
                 # Remove from active positions
-                del self.active_positions[position_id]
-                self.logger.info(f"🔒 Position closed: {position.symbol} {position.type} "
-                               f"{position.volume} lots at {result.price:.5f} - {reason}")
+                self._untrack_position(position_id)
+                self.logger.info("🔒 Position closed: %s %s %s lots at %.5f - %s",
+                                 position.symbol, position.type, position.volume, result.price, reason)
             
             return result
             
         except Exception as e:
-            self.logger.error(f"Position close error: {e}")
-            return ExecutionResult(
-                success=False, order_id=None, position_id=position_id, price=None,
-                volume=0, error_code=-1, error_message=f"Close error: {e}",
-                execution_time=datetime.now()
-            )
+            self.logger.error("Position close error: %s", e)
+            return self._fail(0, -1, f"Close error: {e}", position_id=position_id)
     
     def update_position_sl_tp(self, position_id: int, new_sl: Optional[float] = None, 
                              new_tp: Optional[float] = None) -> bool:
         """Update stop loss and take profit for existing position"""
         try:
             if position_id not in self.active_positions:
-                self.logger.warning(f"Position {position_id} not found for SL/TP update")
+                self.logger.warning("Position %s not found for SL/TP update", position_id)
                 return False
             
             position = self.active_positions[position_id]
@@ -487,16 +738,20 @@ class TradeExecutor:
                     position.stop_loss = new_sl
                 if new_tp is not None:
                     position.take_profit = new_tp
+                with self._tracking_lock:
+                    # Skip the array refresh if a worker closed the position meanwhile
+                    if position_id in self.active_positions:
+                        self._arrays.add(position)
                 
-                self.logger.info(f"📊 Updated SL/TP for {position.symbol}: SL={new_sl}, TP={new_tp}")
+                self.logger.info("📊 Updated SL/TP for %s: SL=%s, TP=%s", position.symbol, new_sl, new_tp)
                 return True
             else:
                 error_msg = self._get_retcode_description(result.retcode) if result else "Unknown error"
-                self.logger.error(f"Failed to update SL/TP: {error_msg}")
+                self.logger.error("Failed to update SL/TP: %s", error_msg)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"SL/TP update error: {e}")
+            self.logger.error("SL/TP update error: %s", e)
             return False
     
     def get_position_status(self, position_id: int) -> Optional[Position]:
@@ -505,53 +760,90 @@ class TradeExecutor:
             position = self.active_positions[position_id]
             
             # Update current price
-            tick = mt5.symbol_info_tick(position.symbol)
+            tick = self._get_ticks([position.symbol]).get(position.symbol)
             if tick:
                 if position.type == 'buy':
                     position.update_current_price(tick.bid)
                 else:
                     position.update_current_price(tick.ask)
+                with self._tracking_lock:
+                    if position_id in self.active_positions:
+                        self._arrays.add(position)
             
             return position
         return None
     
-    def get_all_positions(self) -> Dict[int, Position]:
-        """Get all active positions"""
-        # Update current prices for all positions
-        for position in self.active_positions.values():
-            tick = mt5.symbol_info_tick(position.symbol)
-            if tick:
-                if position.type == 'buy':
-                    position.update_current_price(tick.bid)
-                else:
-                    position.update_current_price(tick.ask)
+    def get_all_positions(self) -> Mapping[int, Position]:
+        """
+        Get all active positions as a read-only live view
+        Use snapshot_positions() when positions may be closed while iterating
+        """
+        # Update current prices for all positions - one tick request per symbol
+        with self._tracking_lock:
+            symbols = set(self._arrays.symbols)
+        ticks = self._get_ticks(symbols)
         
-        return self.active_positions.copy()
+        # Rows may be swapped/removed by order workers, so size and rows are read under the lock
+        with self._tracking_lock:
+            arrays = self._arrays
+            n = arrays.size
+            updated = np.zeros(n, dtype=np.bool_)
+            for row in range(n):
+                tick = ticks.get(arrays.symbols[row])
+                if tick:
+                    arrays.px[row] = tick.bid if arrays.sign[row] > 0 else tick.ask
+                    updated[row] = True
+            
+            # Profits for the whole book in one kernel call, then mirror back onto the records
+            _update_profits(arrays.px[:n], arrays.open[:n], arrays.vol[:n], arrays.sign[:n],
+                            updated, arrays.profit[:n])
+            for row in np.nonzero(updated)[0]:
+                position = arrays.positions[row]
+                position.current_price = float(arrays.px[row])
+                position.profit = float(arrays.profit[row])
+        
+        return self._positions_view
+    
+    def snapshot_positions(self) -> Dict[int, Position]:
+        """Get a copy of all active positions with refreshed prices"""
+        return dict(self.get_all_positions())
+    
+    def _get_ticks(self, symbols) -> Dict[str, object]:
+        """Fetch the latest tick once per unique symbol, reusing a snapshot younger than tick_cache_ttl"""
+        now = time.monotonic()
+        if now - self._tick_cache_time >= self.tick_cache_ttl:
+            self._tick_cache = {}
+            self._tick_cache_time = now
+        
+        ticks = self._tick_cache
+        for symbol in symbols:
+            if symbol not in ticks:
+                ticks[symbol] = mt5.symbol_info_tick(symbol)
+        return ticks
     
     def monitor_positions(self) -> Dict[str, any]:
         """Monitor all positions and return status summary"""
-        total_positions = len(self.active_positions)
-        total_profit = sum(pos.profit for pos in self.active_positions.values())
-        
-        # Count by type
-        long_positions = sum(1 for pos in self.active_positions.values() if pos.type == 'buy')
-        short_positions = total_positions - long_positions
-        
-        # Find positions near SL/TP
-        positions_near_sl = []
-        positions_near_tp = []
-        
-        for pos in self.active_positions.values():
-            if pos.type == 'buy':
-                if pos.current_price <= pos.stop_loss * 1.002:  # Within 0.2%
-                    positions_near_sl.append(pos.symbol)
-                if pos.current_price >= pos.take_profit * 0.998:  # Within 0.2%
-                    positions_near_tp.append(pos.symbol)
-            else:
-                if pos.current_price >= pos.stop_loss * 0.998:
-                    positions_near_sl.append(pos.symbol)
-                if pos.current_price <= pos.take_profit * 1.002:
-                    positions_near_tp.append(pos.symbol)
+        with self._tracking_lock:
+            arrays = self._arrays
+            n = arrays.size
+            px = arrays.px[:n]
+            sl = arrays.sl[:n]
+            tp = arrays.tp[:n]
+            sign = arrays.sign[:n].astype(np.float64)  # +1 buy, -1 sell
+            is_long = sign > 0
+            
+            total_positions = n
+            total_profit = float(arrays.profit[:n].sum())
+            
+            # Count by type
+            long_positions = int(is_long.sum())
+            short_positions = total_positions - long_positions
+            
+            # Find positions near SL/TP (within 0.2%) - the sign folds buy/sell into one comparison
+            near_sl = sign * (px - sl) <= sl * 0.002
+            near_tp = sign * (tp - px) <= tp * 0.002
+            positions_near_sl = [arrays.symbols[i] for i in np.nonzero(near_sl)[0]]
+            positions_near_tp = [arrays.symbols[i] for i in np.nonzero(near_tp)[0]]
         
         # Check for positions without SL/TP
         self._fix_positions_without_sl_tp()
@@ -569,152 +861,103 @@ class TradeExecutor:
     def _load_existing_positions(self):
         """Load existing MT5 positions into tracking"""
         try:
-            # Clear existing tracking first
-            self.active_positions.clear()
+            # Broker round-trip and Position construction happen before the lock is taken
+            positions = mt5.positions_get() or ()
+            loaded = [
+                Position(
+                    position_id=pos.ticket,
+                    symbol=pos.symbol,
+                    type='buy' if pos.type == 0 else 'sell',
+                    volume=pos.volume,
+                    open_price=pos.price_open,
+                    current_price=pos.price_current,
+                    stop_loss=pos.sl,
+                    take_profit=pos.tp,
+                    swap=pos.swap,
+                    profit=pos.profit,
+                    comment=pos.comment,
+                    open_time=datetime.fromtimestamp(pos.time),
+                    wave_pattern="Unknown",  # Can't recover from comment
+                    signal_confidence=0.0
+                )
+                for pos in positions if pos.magic == self.magic_number
+            ]
             
-            positions = mt5.positions_get()
-            if positions:
-                loaded_count = 0
-                for pos in positions:
-                    if pos.magic == self.magic_number:  # Only Elliott Wave positions
-                        position = Position(
-                            position_id=pos.ticket,
-                            symbol=pos.symbol,
-                            type='buy' if pos.type == 0 else 'sell',
-                            volume=pos.volume,
-                            open_price=pos.price_open,
-                            current_price=pos.price_current,
-                            stop_loss=pos.sl,
-                            take_profit=pos.tp,
-                            swap=pos.swap,
-                            profit=pos.profit,
-                            comment=pos.comment,
-                            open_time=datetime.fromtimestamp(pos.time),
-                            wave_pattern="Unknown",  # Can't recover from comment
-                            signal_confidence=0.0
-                        )
-                        self.active_positions[pos.ticket] = position
-                        loaded_count += 1
-                        self.logger.info(f"📍 Loaded position: {pos.symbol} {pos.volume} lots (ID: {pos.ticket})")
-                
-                self.logger.info(f"Loaded {loaded_count} existing Elliott Wave positions")
+            # Clear and rebuild as one step so order workers never see a half-loaded book
+            with self._tracking_lock:
+                self.active_positions.clear()
+                self.active_positions.update((position.position_id, position) for position in loaded)
+                self._arrays.load(loaded)
+                self._active_symbols = {position.symbol for position in loaded}
+            
+            for position in loaded:
+                self.logger.info("📍 Loaded position: %s %s lots (ID: %s)",
+                                 position.symbol, position.volume, position.position_id)
+            if loaded:
+                self.logger.info("Loaded %s existing Elliott Wave positions", len(loaded))
             else:
                 self.logger.info("No existing positions found")
                 
         except Exception as e:
-            self.logger.error(f"Error loading existing positions: {e}")
+            self.logger.error("Error loading existing positions: %s", e)
     
     def _create_position_record(self, signal: TradingSignal, position_size: PositionSize, 
                                result: ExecutionResult) -> Optional[Position]:
         """Create position record from signal and execution result"""
         try:
-            return Position(
-                position_id=result.position_id,
-                symbol=signal.symbol,
-                type='buy' if signal.signal_type == SignalType.BUY else 'sell',
-                volume=position_size.lot_size,
-                open_price=result.price,
-                current_price=result.price,
-                stop_loss=signal.stop_loss,
-                take_profit=signal.take_profit,
-                swap=0.0,
-                profit=0.0,
-                comment=f"EW_{signal.wave_pattern}_{signal.current_wave}",
-                open_time=result.execution_time,
-                wave_pattern=signal.wave_pattern,
-                signal_confidence=signal.confidence
-            )
+            builder = self._mk_buy_pos if signal.signal_type is SignalType.BUY else self._mk_sell_pos
+            return builder(signal, position_size, result)
         except Exception as e:
-            self.logger.error(f"Error creating position record: {e}")
+            self.logger.error("Error creating position record: %s", e)
             return None
     
+    def _precompute_slippage_multipliers(self):
+        """Fill the per-symbol slippage multiplier table from the terminal's symbol list"""
+        try:
+            symbols = mt5.symbols_get()
+            if symbols:
+                self._slip_mult.update(
+                    (s.name, float(_SLIPPAGE_MULTIPLIERS[_slippage_class(s.name)])) for s in symbols
+                )
+        except Exception as e:
+            self.logger.warning("Could not precompute slippage multipliers: %s", e)
+    
     def _calculate_slippage(self, requested_price: float, executed_price: float, symbol: str) -> float:
         """Calculate slippage in pips"""
-        if 'JPY' in symbol:
-            return (executed_price - requested_price) * 100
-        elif symbol in ['XAUUSD']:
-            return (executed_price - requested_price) * 10
-        elif symbol.startswith('US') or symbol in ['NAS100']:
-            return executed_price - requested_price
-        else:
-            return (executed_price - requested_price) * 10000
+        mult = self._slip_mult.get(symbol)
+        if mult is None:
+            mult = self._slip_mult[symbol] = float(_SLIPPAGE_MULTIPLIERS[_slippage_class(symbol)])
+        return (executed_price - requested_price) * mult
+    
+    def calculate_slippage_batch(self, requested_prices, executed_prices, symbols: List[str]) -> np.ndarray:
+        """Calculate slippage in pips for many fills at once (post-trade analytics)"""
+        symbol_class = np.array([_slippage_class(symbol) for symbol in symbols], dtype=np.int64)
+        return _slippage_kernel(np.asarray(requested_prices, dtype=np.float64),
+                                np.asarray(executed_prices, dtype=np.float64),
+                                symbol_class, _SLIPPAGE_MULTIPLIERS)
     
     def _get_retcode_description(self, retcode: int) -> str:
         """Get human-readable description of MT5 return code"""
-        retcode_descriptions = {
-            mt5.TRADE_RETCODE_DONE: "Request completed",
-            mt5.TRADE_RETCODE_REQUOTE: "Requote",
-            mt5.TRADE_RETCODE_REJECT: "Request rejected",
-            mt5.TRADE_RETCODE_CANCEL: "Request canceled",
-            mt5.TRADE_RETCODE_PLACED: "Order placed",
-            mt5.TRADE_RETCODE_MARKET_CLOSED: "Market closed",
-            mt5.TRADE_RETCODE_NO_MONEY: "Insufficient funds",
-            mt5.TRADE_RETCODE_PRICE_CHANGED: "Price changed",
-            mt5.TRADE_RETCODE_PRICE_OFF: "Off quotes",
-            mt5.TRADE_RETCODE_INVALID_STOPS: "Invalid stops",
-            mt5.TRADE_RETCODE_TRADE_DISABLED: "Trade disabled",
-            mt5.TRADE_RETCODE_INVALID_VOLUME: "Invalid volume",
-            mt5.TRADE_RETCODE_CONNECTION: "No connection",
-            mt5.TRADE_RETCODE_ONLY_REAL: "Only real accounts allowed",
-            mt5.TRADE_RETCODE_LIMIT_ORDERS: "Orders limit reached",
-            mt5.TRADE_RETCODE_LIMIT_VOLUME: "Volume limit reached",
-            mt5.TRADE_RETCODE_INVALID_ORDER: "Invalid order",
-            mt5.TRADE_RETCODE_POSITION_CLOSED: "Position closed",
-            # Additional important codes
-            10004: "Requote",
-            10006: "Request rejected",
-            10007: "Request canceled by trader",
-            10008: "Order placed",
-            10009: "Request completed",
-            10010: "Request completed partially",
-            10011: "Request processing error",
-            10012: "Request canceled by timeout",
-            10013: "Invalid request",
-            10014: "Invalid volume in the request",
-            10015: "Invalid price in the request",
-            10016: "Invalid stops in the request",
-            10017: "Trade is disabled",
-            10018: "Market is closed",
-            10019: "There is not enough money to complete the request",
-            10020: "Prices changed",
-            10021: "There are no quotes to process the request",
-            10022: "Invalid order expiration date",
-            10023: "Order state changed",
-            10024: "Too frequent requests",
-            10025: "No changes in request",
-            10026: "Autotrading disabled by server",
-            10027: "Autotrading disabled by client terminal",
-            10028: "Request locked for processing",
-            10029: "Order or position frozen",
-            10030: "Invalid order filling type",  # THE PROBLEMATIC ONE!
-            10031: "No connection with the trade server",
-            10032: "Operation is allowed only for live accounts",
-            10033: "The number of pending orders has reached the limit",
-            10034: "The volume of orders and positions for the symbol has reached the limit",
-            10035: "Incorrect or prohibited order type",
-            10036: "Position with the specified POSITION_IDENTIFIER has already been closed",
-        }
-        
-        return retcode_descriptions.get(retcode, f"Unknown retcode: {retcode}")
+        return _RETCODE_DESCRIPTIONS.get(retcode, f"Unknown retcode: {retcode}")
     
     def _debug_symbol_info(self, symbol: str):
         """Debug symbol information for retcode 10030 troubleshooting"""
         try:
             symbol_info = mt5.symbol_info(symbol)
             if symbol_info:
-                self.logger.error(f"   Symbol: {symbol}")
-                self.logger.error(f"   Digits: {symbol_info.digits}")
-                self.logger.error(f"   Point: {symbol_info.point}")
-                self.logger.error(f"   Spread: {symbol_info.spread}")
-                self.logger.error(f"   Stops Level: {symbol_info.trade_stops_level}")
-                self.logger.info(f"   Trade Mode: {symbol_info.trade_mode}")
-                self.logger.info(f"   Filling Mode: {symbol_info.filling_mode}")
-                self.logger.info(f"   Expiration Mode: {symbol_info.expiration_mode}")
-                self.logger.info(f"   Min Volume: {symbol_info.volume_min}")
-                self.logger.info(f"   Max Volume: {symbol_info.volume_max}")
-                self.logger.info(f"   Volume Step: {symbol_info.volume_step}")
+                self.logger.error("   Symbol: %s", symbol)
+                self.logger.error("   Digits: %s", symbol_info.digits)
+                self.logger.error("   Point: %s", symbol_info.point)
+                self.logger.error("   Spread: %s", symbol_info.spread)
+                self.logger.error("   Stops Level: %s", symbol_info.trade_stops_level)
+                self.logger.info("   Trade Mode: %s", symbol_info.trade_mode)
+                self.logger.info("   Filling Mode: %s", symbol_info.filling_mode)
+                self.logger.info("   Expiration Mode: %s", symbol_info.expiration_mode)
+                self.logger.info("   Min Volume: %s", symbol_info.volume_min)
+                self.logger.info("   Max Volume: %s", symbol_info.volume_max)
+                self.logger.info("   Volume Step: %s", symbol_info.volume_step)
         except Exception as e:
-            self.logger.error(f"   Error getting symbol info: {e}")
+            self.logger.error("   Error getting symbol info: %s", e)
     
     def _debug_order_filling_modes(self, symbol: str):
         """Debug available order filling modes"""
@@ -722,21 +965,21 @@ class TradeExecutor:
             symbol_info = mt5.symbol_info(symbol)
             if symbol_info:
                 filling_mode = symbol_info.filling_mode
-                self.logger.info(f"   Available filling modes for {symbol}:")
+                self.logger.info("   Available filling modes for %s:", symbol)
                 
                 # Use safe attribute checks for older MT5 versions
                 if hasattr(mt5, 'SYMBOL_FILLING_FOK') and filling_mode & mt5.SYMBOL_FILLING_FOK:
-                    self.logger.info(f"   ✅ FOK (Fill or Kill)")
+                    self.logger.info("   ✅ FOK (Fill or Kill)")
                 if hasattr(mt5, 'SYMBOL_FILLING_IOC') and filling_mode & mt5.SYMBOL_FILLING_IOC:
-                    self.logger.info(f"   ✅ IOC (Immediate or Cancel)")
+                    self.logger.info("   ✅ IOC (Immediate or Cancel)")
                 if hasattr(mt5, 'SYMBOL_FILLING_RETURN') and filling_mode & mt5.SYMBOL_FILLING_RETURN:
-                    self.logger.info(f"   ✅ RETURN (Return)")
+                    self.logger.info("   ✅ RETURN (Return)")
                     
                 if filling_mode == 0:
-                    self.logger.warning(f"   ❌ No filling modes available!")
+                    self.logger.warning("   ❌ No filling modes available!")
                     
         except Exception as e:
-            self.logger.error(f"   Error getting filling modes: {e}")
+            self.logger.error("   Error getting filling modes: %s", e)
     
     def _retry_with_alternative_filling(self, original_request: Dict) -> ExecutionResult:
         """Retry order with alternative filling modes for retcode 10030"""
@@ -745,23 +988,13 @@ class TradeExecutor:
         # Skip problematic symbols that consistently fail
         problematic_symbols = ['AXSUSD', 'SHIBUSDT', 'DOGEUSDT']
         if symbol in problematic_symbols:
-            self.logger.warning(f"   ⚠️ {symbol} is known problematic symbol - skipping alternative retries")
-            return ExecutionResult(
-                success=False, order_id=None, position_id=None, price=None,
-                volume=original_request['volume'], error_code=10030,
-                error_message=f"{symbol} not supported by this broker",
-                execution_time=datetime.now()
-            )
+            self.logger.warning("   ⚠️ %s is known problematic symbol - skipping alternative retries", symbol)
+            return self._fail(original_request['volume'], 10030, f"{symbol} not supported by this broker")
         
         try:
             symbol_info = mt5.symbol_info(symbol)
             if not symbol_info:
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=original_request['volume'], error_code=10030,
-                    error_message="Cannot get symbol info for alternative filling",
-                    execution_time=datetime.now()
-                )
+                return self._fail(original_request['volume'], 10030, "Cannot get symbol info for alternative filling")
             
             # Safe filling modes with backward compatibility
             filling_modes = []
@@ -774,25 +1007,20 @@ class TradeExecutor:
             
             # Fallback for older MT5 versions
             if not filling_modes:
-                self.logger.warning(f"   ⚠️ No modern filling modes available in this MT5 version")
-                return ExecutionResult(
-                    success=False, order_id=None, position_id=None, price=None,
-                    volume=original_request['volume'], error_code=10030,
-                    error_message="MT5 version too old for alternative filling modes",
-                    execution_time=datetime.now()
-                )
+                self.logger.warning("   ⚠️ No modern filling modes available in this MT5 version")
+                return self._fail(original_request['volume'], 10030, "MT5 version too old for alternative filling modes")
             
             for filling_mode, mode_name in filling_modes:
                 # Check if this filling mode is supported by symbol
                 try:
                     if not (symbol_info.filling_mode & filling_mode):
-                        self.logger.warning(f"   ⚠️ {mode_name} not supported for {symbol}")
+                        self.logger.warning("   ⚠️ %s not supported for %s", mode_name, symbol)
                         continue
                 except:
                     # Fallback for any bit operation issues
                     pass
                 
-                self.logger.info(f"   🔄 Retrying {symbol} with {mode_name} filling mode...")
+                self.logger.info("   🔄 Retrying %s with %s filling mode...", symbol, mode_name)
                 
                 # Create new request with different filling mode
                 retry_request = original_request.copy()
@@ -802,49 +1030,71 @@ class TradeExecutor:
                 result = self._execute_order_with_retry(retry_request)
                 
                 if result.success:
-                    self.logger.info(f"   ✅ {symbol} successful with {mode_name} filling!")
+                    self.logger.info("   ✅ %s successful with %s filling!", symbol, mode_name)
                     return result
                 else:
-                    self.logger.warning(f"   ❌ {symbol} failed with {mode_name}: {result.error_message}")
+                    self.logger.warning("   ❌ %s failed with %s: %s", symbol, mode_name, result.error_message)
             
             # All filling modes failed
-            return ExecutionResult(
-                success=False, order_id=None, position_id=None, price=None,
-                volume=original_request['volume'], error_code=10030,
-                error_message="All alternative filling modes failed",
-                execution_time=datetime.now()
-            )
+            return self._fail(original_request['volume'], 10030, "All alternative filling modes failed")
             
         except Exception as e:
-            self.logger.error(f"Error in alternative filling retry: {e}")
-            return ExecutionResult(
-                success=False, order_id=None, position_id=None, price=None,
-                volume=original_request['volume'], error_code=10030,
-                error_message=f"Alternative filling error: {e}",
-                execution_time=datetime.now()
-            )
+            self.logger.error("Error in alternative filling retry: %s", e)
+            return self._fail(original_request['volume'], 10030, f"Alternative filling error: {e}")
 
+    def _track_position(self, position: Position):
+        """Register an opened position in all tracking structures"""
+        with self._tracking_lock:
+            self.active_positions[position.position_id] = position
+            self._arrays.add(position)
+            self._active_symbols.add(position.symbol)
+    
+    def _untrack_position(self, position_id: int):
+        """Remove a closed position from all tracking structures"""
+        with self._tracking_lock:
+            position = self.active_positions.pop(position_id)
+            self._arrays.remove(position_id)
+            if position.symbol not in self._arrays.symbols:
+                self._active_symbols.discard(position.symbol)
+    
     def _has_existing_position(self, symbol: str) -> bool:
         """Check if position already exists for this symbol"""
+        # Fast positive: a position this process opened or loaded is known without a broker request
+        if symbol in self._active_symbols:
+            self.logger.info("🔄 %s: Position already exists", symbol)
+            return True
+        # Authoritative check against the broker - catches same-magic positions opened by another
+        # instance, a restart race or by hand since the last monitoring cycle
         try:
-            # Get all current MT5 positions
             positions = mt5.positions_get(symbol=symbol)
             if positions:
-                # Check if any position has our magic number
                 for pos in positions:
                     if pos.magic == self.magic_number:
-                        self.logger.info(f"🔄 {symbol}: Position already exists (ID: {pos.ticket}, Volume: {pos.volume})")
+                        with self._tracking_lock:
+                            self._active_symbols.add(symbol)
+                        self.logger.info("🔄 %s: Position already exists (ID: %s, Volume: %s)",
+                                         symbol, pos.ticket, pos.volume)
                         return True
             return False
         except Exception as e:
-            self.logger.error(f"Error checking existing positions for {symbol}: {e}")
+            self.logger.error("Error checking existing positions for %s: %s", symbol, e)
             return False  # Assume no position on error to allow trading
 
+    def _sync_active_symbols(self, positions):
+        """Rebuild the held-symbol set from an MT5 positions snapshot"""
+        symbols = {pos.symbol for pos in positions if pos.magic == self.magic_number}
+        with self._tracking_lock:
+            self._active_symbols = symbols
+
     def _fix_positions_without_sl_tp(self):
         """Find and fix positions without Stop Loss or Take Profit"""
         try:
             # Get all current MT5 positions
             positions = mt5.positions_get()
+            
+            # Positions closed by the broker (SL/TP hit) drop out of the duplicate check here
+            if positions is not None:
+                self._sync_active_symbols(positions)
             if not positions:
                 return
             
@@ -856,7 +1106,8 @@ class TradeExecutor:
                 
                 # Check if position is missing SL or TP
                 if pos.sl == 0.0 or pos.tp == 0.0:
-                    self.logger.warning(f"🚨 Position {pos.symbol} missing SL/TP: SL={pos.sl}, TP={pos.tp}")
+                    self.logger.warning("🚨 Position %s missing SL/TP: SL=%s, TP=%s",
+                                        pos.symbol, pos.sl, pos.tp)
                     
                     # Try to calculate appropriate SL/TP based on current price and symbol
                     sl, tp = self._calculate_emergency_sl_tp(pos)
@@ -864,15 +1115,15 @@ class TradeExecutor:
                     if sl and tp:
                         if self._set_position_sl_tp(pos.ticket, pos.symbol, sl, tp):
                             positions_fixed += 1
-                            self.logger.info(f"🔧 Fixed SL/TP for {pos.symbol}: SL={sl:.5f}, TP={tp:.5f}")
+                            self.logger.info("🔧 Fixed SL/TP for %s: SL=%.5f, TP=%.5f", pos.symbol, sl, tp)
                         else:
-                            self.logger.error(f"❌ Failed to fix SL/TP for {pos.symbol}")
+                            self.logger.error("❌ Failed to fix SL/TP for %s", pos.symbol)
             
             if positions_fixed > 0:
-                self.logger.info(f"✅ Fixed {positions_fixed} positions without SL/TP")
+                self.logger.info("✅ Fixed %s positions without SL/TP", positions_fixed)
                 
         except Exception as e:
-            self.logger.error(f"Error fixing positions without SL/TP: {e}")
+            self.logger.error("Error fixing positions without SL/TP: %s", e)
 
     def _calculate_emergency_sl_tp(self, position) -> Tuple[Optional[float], Optional[float]]:
         """Calculate emergency SL/TP for position without them"""
@@ -901,7 +1152,7 @@ class TradeExecutor:
             return stop_loss, take_profit
             
         except Exception as e:
-            self.logger.error(f"Error calculating emergency SL/TP for {position.symbol}: {e}")
+            self.logger.error("Error calculating emergency SL/TP for %s: %s", position.symbol, e)
             return None, None
 
     def _set_position_sl_tp(self, position_id: int, symbol: str, stop_loss: float, take_profit: float) -> bool:
@@ -923,19 +1174,19 @@ class TradeExecutor:
             
             if result is None:
                 error = mt5.last_error()
-                self.logger.error(f"❌ Failed to set SL/TP for {symbol}: {error}")
+                self.logger.error("❌ Failed to set SL/TP for %s: %s", symbol, error)
                 return False
             
             if result.retcode == mt5.TRADE_RETCODE_DONE:
-                self.logger.info(f"✅ SL/TP successfully set for {symbol} (Position {position_id})")
+                self.logger.info("✅ SL/TP successfully set for %s (Position %s)", symbol, position_id)
                 return True
             else:
                 error_msg = self._get_retcode_description(result.retcode)
-                self.logger.error(f"❌ SL/TP modification failed for {symbol}: {error_msg}")
+                self.logger.error("❌ SL/TP modification failed for %s: %s", symbol, error_msg)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Exception setting SL/TP for {symbol}: {e}")
+            self.logger.error("Exception setting SL/TP for %s: %s", symbol, e)
             return False
 
 if __name__ == "__main__":